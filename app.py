@@ -5,8 +5,95 @@ AI图像生成提示词变奏创意助手 - Web界面
 
 import streamlit as st
 import json
+import os
 from prompt_generator import PromptGenerator
 from prompt_pyramid import PROMPT_PYRAMID, VARIATION_STRATEGIES
+from instrumentation import Profiler
+from cache import AnalysisCache
+from cooccurrence import COOCCURRENCE_ENV, CooccurrenceMatrix
+from exporters import iter_export_bytes
+
+
+# 金字塔浏览器每页显示的元素数
+BROWSER_PAGE_SIZE = 48
+
+# 导出选项 → (导出格式, 按钮文字, 文件名, MIME 类型)
+EXPORT_FORMATS = {
+    "JSON": ("json", "⬇️ 下载JSON文件", "prompt_variations.json", "application/json"),
+    "JSONL": ("jsonl", "⬇️ 下载JSONL文件", "prompt_variations.jsonl", "application/x-ndjson"),
+    "纯文本": ("text", "⬇️ 下载文本文件", "prompt_variations.txt", "text/plain"),
+    "Markdown": ("markdown", "⬇️ 下载Markdown文件", "prompt_variations.md", "text/markdown"),
+}
+
+
+@st.cache_resource
+def get_base_generator():
+    """所有会话共享的生成器模板：金字塔索引、元素匹配器、编码器与模糊识别索引只构建一次"""
+    generator = PromptGenerator()
+    generator.build_fuzzy_matcher()
+    return generator
+
+
+@st.cache_resource
+def get_browser_layout(_index):
+    """金字塔浏览器的预计算布局（所有会话共享）
+
+    返回 (tree, rows)：tree[维度][子维度][类别] 为该类别的元素元组；
+    rows 为全部元素的 (元素, 维度, 子维度, 类别, 检索用小写文本)，供搜索过滤。
+    """
+    tree = {}
+    rows = []
+    for dim_id, dim in enumerate(_index.dimensions):
+        subdimensions = tree[dim] = {}
+        s0, s1 = _index.subdimension_range(dim_id)
+        for sub_id in range(s0, s1):
+            subdim = _index.subdimensions[sub_id]
+            categories = subdimensions[subdim] = {}
+            c0, c1 = _index.category_range(sub_id)
+            for cat_id in range(c0, c1):
+                category = _index.categories[cat_id]
+                e0, e1 = _index.element_range(cat_id)
+                elements = categories[category] = tuple(_index.elements[e0:e1])
+                rows.extend((element, dim, subdim, category, element.casefold()) for element in elements)
+    return tree, rows
+
+
+@st.cache_resource
+def get_analysis_cache():
+    """所有会话共享的分析结果缓存（线程安全）"""
+    return AnalysisCache()
+
+
+@st.cache_resource
+def get_cooccurrence(path, _index):
+    """按路径加载并缓存共现矩阵（几 MB，所有会话共享）"""
+    return CooccurrenceMatrix.load(path, _index)
+
+
+def get_generator():
+    """当前会话的生成器：由共享模板派生，拥有独立的随机数生成器，跨重跑保留"""
+    generator = st.session_state.get("generator")
+    if generator is None:
+        generator = st.session_state["generator"] = get_base_generator().spawn()
+        generator.enable_analysis_cache(get_analysis_cache())
+        cooccurrence_path = os.environ.get(COOCCURRENCE_ENV)
+        if cooccurrence_path and os.path.exists(cooccurrence_path):
+            generator.set_cooccurrence(get_cooccurrence(cooccurrence_path, generator.index))
+    return generator
+
+
+def session_result(name, key, compute, refresh=False):
+    """会话内按输入保存的结果，每个页面只保留最近一次
+
+    refresh 为 True（点击了生成按钮）时调用 compute 重新生成；否则输入 key 与上次相同时
+    直接返回保存的结果，切换选项卡、单选框等交互引起的重跑不会重新生成。输入变化后返回 None。
+    """
+    saved = st.session_state.get(name)
+    if refresh:
+        saved = st.session_state[name] = (key, compute())
+    if saved is not None and saved[0] == key:
+        return saved[1]
+    return None
 
 
 def main():
@@ -19,7 +106,7 @@ def main():
     st.title("🎨 AI图像生成提示词变奏创意助手")
     st.markdown("### 基于金字塔理论和MECE法则的完整提示词变奏系统")
     
-    generator = PromptGenerator()
+    generator = get_generator()
     
     with st.sidebar:
         st.header("📚 系统说明")
@@ -43,6 +130,18 @@ def main():
             "选择工作模式：",
             ["📖 浏览金字塔结构", "✨ 生成随机提示词", "🔄 提示词变奏", "🔍 分析提示词", "📦 完整方案生成"]
         )
+        
+        st.divider()
+        
+        profiling_enabled = st.checkbox("📈 性能统计", value=False)
+        stats_panel = st.container()
+    
+    if profiling_enabled:
+        if "profiler" not in st.session_state:
+            st.session_state["profiler"] = Profiler()
+        generator.enable_profiling(st.session_state["profiler"])
+    else:
+        generator.disable_profiling()
     
     if mode == "📖 浏览金字塔结构":
         show_pyramid_structure(generator)
@@ -58,17 +157,67 @@ def main():
     
     else:  # 完整方案生成
         show_complete_solution(generator)
+    
+    if profiling_enabled:
+        with stats_panel:
+            show_stats_panel(st.session_state["profiler"])
+
+
+def show_stats_panel(profiler):
+    """侧边栏性能统计面板（页面渲染完成后填充，包含本次运行的调用）"""
+    snapshot = profiler.snapshot()
+    
+    if not snapshot["方法"]:
+        st.caption("暂无调用记录")
+        return
+    
+    st.dataframe(
+        [{"方法": name, **stats} for name, stats in snapshot["方法"].items()],
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ 导出快照",
+            data=json.dumps(snapshot, ensure_ascii=False, indent=2),
+            file_name="generator_stats.json",
+            mime="application/json"
+        )
+    with col2:
+        if st.button("🔄 重置统计"):
+            profiler.reset()
+            st.rerun()
 
 
 def show_pyramid_structure(generator):
-    """显示金字塔结构浏览"""
+    """显示金字塔结构浏览：一次只渲染选中类别的一页元素，或搜索结果的一页"""
     st.header("📖 金字塔结构浏览")
     
-    dimensions = generator.get_all_dimensions()
+    tree, rows = get_browser_layout(generator.index)
+    
+    query = st.text_input(
+        "🔎 搜索元素：",
+        placeholder="输入关键词，在全部维度中查找元素"
+    ).strip().casefold()
+    
+    if query:
+        matches = [row for row in rows if query in row[4]]
+        st.caption(f"找到 {len(matches)} 个元素")
+        page = paginate(matches, f"browser_search_{query}")
+        if page:
+            st.dataframe(
+                [{"元素": element, "维度": dim, "子维度": subdim, "类别": category}
+                 for element, dim, subdim, category, _ in page],
+                hide_index=True,
+                use_container_width=True
+            )
+        return
     
     selected_dimension = st.selectbox(
         "选择要浏览的维度：",
-        dimensions
+        list(tree)
     )
     
     if selected_dimension:
@@ -77,27 +226,33 @@ def show_pyramid_structure(generator):
         st.subheader(selected_dimension)
         st.info(f"**描述：** {dim_info.get('描述', '')}")
         
-        subdimensions = generator.get_subdimensions(selected_dimension)
+        subdimensions = tree[selected_dimension]
+        subdim = st.radio("子维度：", list(subdimensions), horizontal=True)
         
-        tabs = st.tabs(subdimensions)
+        categories = subdimensions[subdim]
+        category = st.radio("类别：", list(categories), horizontal=True)
         
-        for tab, subdim in zip(tabs, subdimensions):
-            with tab:
-                options = generator.get_options(selected_dimension, subdim)
-                
-                for category, elements in options.items():
-                    st.markdown(f"**{category}**")
-                    
-                    cols = st.columns(4)
-                    for idx, element in enumerate(elements):
-                        with cols[idx % 4]:
-                            st.button(
-                                element, 
-                                key=f"{selected_dimension}_{subdim}_{category}_{element}",
-                                use_container_width=True
-                            )
-                    
-                    st.divider()
+        elements = categories[category]
+        st.markdown(f"**{category}**（{len(elements)} 个元素）")
+        show_element_grid(paginate(elements, f"browser_{selected_dimension}_{subdim}_{category}"))
+
+
+def paginate(items, key):
+    """只返回当前页的条目；超过一页时显示页码控件（key 随浏览位置变化，切换后回到第一页）"""
+    pages = max(1, -(-len(items) // BROWSER_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"页码（共 {pages} 页）", min_value=1, max_value=pages, value=1, key=key)
+    start = (page - 1) * BROWSER_PAGE_SIZE
+    return items[start:start + BROWSER_PAGE_SIZE]
+
+
+def show_element_grid(elements, columns=4):
+    """按行优先把元素排成 columns 列，每列一次 markdown 渲染"""
+    cols = st.columns(columns)
+    for i, col in enumerate(cols):
+        with col:
+            st.markdown("\n".join(f"- `{element}`" for element in elements[i::columns]))
 
 
 def show_random_generation(generator):
@@ -117,12 +272,18 @@ def show_random_generation(generator):
     with col2:
         include_quality = st.checkbox("包含质量词", value=True)
     
-    if st.button("🎲 生成随机提示词", type="primary", use_container_width=True):
-        result = generator.generate_random_prompt(
+    generate = st.button("🎲 生成随机提示词", type="primary", use_container_width=True)
+    
+    def compute():
+        return generator.generate_random_prompt(
             include_quality=include_quality,
             dimensions_count=dimensions_count
         )
-        
+    
+    key = (dimensions_count, include_quality)
+    result = session_result("random_result", key, compute, refresh=generate)
+    
+    if result is not None:
         st.success("✅ 生成成功！")
         
         st.subheader("📝 生成的提示词")
@@ -139,6 +300,7 @@ def show_random_generation(generator):
         
         with col2:
             if st.button("🔄 再生成一次"):
+                session_result("random_result", key, compute, refresh=True)
                 st.rerun()
 
 
@@ -171,24 +333,30 @@ def show_variation_generation(generator):
             for method in strategy_info["方法"]:
                 st.markdown(f"- {method}")
     
-    if st.button("🎨 生成变奏", type="primary", use_container_width=True):
-        if not base_prompt:
-            st.warning("请先输入基础提示词！")
-        else:
-            strategy_name = strategy.split(".")[1] if "." in strategy else strategy
-            variations = generator.generate_variations(base_prompt, strategy_name, count)
-            
-            st.success(f"✅ 成功生成 {len(variations)} 个变奏！")
-            
-            for idx, var in enumerate(variations, 1):
-                with st.expander(f"变奏 {idx}"):
-                    st.markdown(f"**提示词：**")
-                    st.code(var["变奏"], language=None)
-                    
-                    st.markdown("**变奏信息：**")
-                    for key, value in var.items():
-                        if key != "变奏":
-                            st.markdown(f"- **{key}**: {value}")
+    generate = st.button("🎨 生成变奏", type="primary", use_container_width=True)
+    if generate and not base_prompt:
+        st.warning("请先输入基础提示词！")
+        generate = False
+    
+    strategy_name = strategy.split(".")[1] if "." in strategy else strategy
+    variations = session_result(
+        "variation_result", (base_prompt, strategy_name, count),
+        lambda: generator.generate_variations(base_prompt, strategy_name, count),
+        refresh=generate
+    )
+    
+    if variations is not None:
+        st.success(f"✅ 成功生成 {len(variations)} 个变奏！")
+        
+        for idx, var in enumerate(variations, 1):
+            with st.expander(f"变奏 {idx}"):
+                st.markdown(f"**提示词：**")
+                st.code(var["变奏"], language=None)
+                
+                st.markdown("**变奏信息：**")
+                for key, value in var.items():
+                    if key != "变奏":
+                        st.markdown(f"- **{key}**: {value}")
 
 
 def show_prompt_analysis(generator):
@@ -201,37 +369,59 @@ def show_prompt_analysis(generator):
         height=150
     )
     
-    if st.button("🔬 分析提示词", type="primary", use_container_width=True):
-        if not prompt:
-            st.warning("请先输入提示词！")
+    # 开关保存在会话状态中，只作用于本会话派生的生成器
+    fuzzy = st.checkbox("模糊识别", key="fuzzy_matching", help="识别错别字、大小写与全半角不同的元素写法")
+    
+    generate = st.button("🔬 分析提示词", type="primary", use_container_width=True)
+    if generate and not prompt:
+        st.warning("请先输入提示词！")
+        generate = False
+    
+    def compute():
+        if fuzzy:
+            generator.enable_fuzzy_matching()
         else:
-            analysis = generator.analyze_prompt(prompt)
-            
-            st.success("✅ 分析完成！")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.metric("覆盖维度数", len(analysis["覆盖维度"]))
-            
-            with col2:
-                st.metric("建议补充数", len(analysis["建议补充"]))
-            
-            if analysis["识别的元素"]:
-                st.subheader("✅ 已识别的元素")
-                for dim, elements in analysis["识别的元素"].items():
-                    with st.expander(dim):
-                        for elem in elements:
-                            st.markdown(f"- **{elem['子维度']}** / {elem['类别']}: `{elem['元素']}`")
-            
-            if analysis["建议补充"]:
-                st.subheader("💡 建议补充的维度")
-                for suggestion in analysis["建议补充"]:
-                    with st.expander(suggestion["维度"]):
-                        st.markdown(f"**说明：** {suggestion['描述']}")
-                        st.markdown(f"**示例：** {suggestion['示例']}")
-            else:
-                st.success("🎉 恭喜！你的提示词已经覆盖了所有维度！")
+            generator.disable_fuzzy_matching()
+        return generator.analyze_prompt(prompt)
+    
+    analysis = session_result("analysis_result", (prompt, fuzzy), compute, refresh=generate)
+    
+    if analysis is not None:
+        st.success("✅ 分析完成！")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.metric("覆盖维度数", len(analysis["覆盖维度"]))
+        
+        with col2:
+            st.metric("建议补充数", len(analysis["建议补充"]))
+        
+        if analysis["识别的元素"]:
+            st.subheader("✅ 已识别的元素")
+            for dim, elements in analysis["识别的元素"].items():
+                with st.expander(dim):
+                    for elem in elements:
+                        line = f"- **{elem['子维度']}** / {elem['类别']}: `{elem['元素']}`"
+                        if "置信度" in elem:
+                            line += f"（模糊识别：「{elem['原文']}」，置信度 {elem['置信度']:.0%}）"
+                        st.markdown(line)
+        
+        if analysis["建议补充"]:
+            st.subheader("💡 建议补充的维度")
+            for suggestion in analysis["建议补充"]:
+                with st.expander(suggestion["维度"]):
+                    st.markdown(f"**说明：** {suggestion['描述']}")
+                    st.markdown(f"**示例：** {suggestion['示例']}")
+                    if "推荐" in suggestion:
+                        ranked = "、".join(f"`{item['元素']}` ({item['得分']:.0%})" for item in suggestion["推荐"])
+                        st.markdown(f"**推荐（按共现概率）：** {ranked}")
+        else:
+            st.success("🎉 恭喜！你的提示词已经覆盖了所有维度！")
+        
+        cache_stats = generator.analysis_cache.stats()
+        st.caption(f"分析缓存：{cache_stats['条目数']} 条，命中率 {cache_stats['命中率']:.0%}"
+                   f"（命中 {cache_stats['命中']} / 未命中 {cache_stats['未命中']}）")
 
 
 def show_complete_solution(generator):
@@ -251,155 +441,110 @@ def show_complete_solution(generator):
         placeholder="例如：赛博朋克风格的猫"
     )
     
-    if st.button("🚀 生成完整方案", type="primary", use_container_width=True):
-        if not base_idea:
-            st.warning("请先输入核心创意！")
-        else:
-            with st.spinner("正在生成完整方案..."):
-                result = generator.generate_complete_prompt_set(base_idea)
+    generate = st.button("🚀 生成完整方案", type="primary", use_container_width=True)
+    if generate and not base_idea:
+        st.warning("请先输入核心创意！")
+        generate = False
+    
+    def compute():
+        with st.spinner("正在生成完整方案..."):
+            return {"结果": generator.generate_complete_prompt_set(base_idea), "导出": {}}
+    
+    entry = session_result("complete_result", base_idea, compute, refresh=generate)
+    
+    if entry is not None:
+        result = entry["结果"]
+        
+        st.success("✅ 完整方案生成成功！")
+        
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
+            "📊 概览", "📝 提示词", "🔍 分析", "🎨 变奏方案", "📥 导出"
+        ])
+        
+        with tab1:
+            st.subheader("📊 方案统计")
+            col1, col2, col3 = st.columns(3)
             
-            st.success("✅ 完整方案生成成功！")
+            with col1:
+                st.metric("覆盖维度", result["统计"]["覆盖维度数"])
+            with col2:
+                st.metric("补充建议", result["统计"]["建议补充数"])
+            with col3:
+                st.metric("总变奏数", result["统计"]["总变奏数"])
             
-            tab1, tab2, tab3, tab4, tab5 = st.tabs([
-                "📊 概览", "📝 提示词", "🔍 分析", "🎨 变奏方案", "📥 导出"
-            ])
+            st.divider()
             
-            with tab1:
-                st.subheader("📊 方案统计")
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.metric("覆盖维度", result["统计"]["覆盖维度数"])
-                with col2:
-                    st.metric("补充建议", result["统计"]["建议补充数"])
-                with col3:
-                    st.metric("总变奏数", result["统计"]["总变奏数"])
-                
-                st.divider()
-                
-                st.markdown("**原始想法：**")
-                st.info(result["原始想法"])
-                
-                st.markdown("**增强后：**")
-                st.success(result["增强提示词"])
+            st.markdown("**原始想法：**")
+            st.info(result["原始想法"])
             
-            with tab2:
-                st.subheader("📝 完整提示词")
-                
-                st.markdown("**正向提示词：**")
-                st.code(result["完整正向提示词"], language=None)
-                
-                st.markdown("**负向提示词：**")
-                st.code(result["负向提示词"], language=None)
-                
-                if st.button("📋 复制正向提示词"):
-                    st.toast("正向提示词已复制！")
-                
-                if st.button("📋 复制负向提示词"):
-                    st.toast("负向提示词已复制！")
+            st.markdown("**增强后：**")
+            st.success(result["增强提示词"])
+        
+        with tab2:
+            st.subheader("📝 完整提示词")
             
-            with tab3:
-                st.subheader("🔍 详细分析")
-                
-                analysis = result["分析结果"]
-                
-                if analysis["识别的元素"]:
-                    st.markdown("**已包含的元素：**")
-                    for dim, elements in analysis["识别的元素"].items():
-                        with st.expander(dim):
-                            for elem in elements:
-                                st.markdown(f"- {elem['子维度']} / {elem['类别']}: `{elem['元素']}`")
-                
-                if analysis["建议补充"]:
-                    st.markdown("**补充的元素：**")
-                    for sugg in analysis["建议补充"]:
-                        st.markdown(f"- **{sugg['维度']}**: {sugg['示例']}")
+            st.markdown("**正向提示词：**")
+            st.code(result["完整正向提示词"], language=None)
             
-            with tab4:
-                st.subheader("🎨 变奏方案")
-                
-                for strategy_name, variations in result["变奏方案"].items():
-                    with st.expander(f"{strategy_name} ({len(variations)}个变奏)"):
-                        for idx, var in enumerate(variations, 1):
-                            st.markdown(f"**变奏 {idx}：**")
-                            st.code(var["变奏"], language=None)
-                            st.caption(f"策略：{var.get('策略', strategy_name)}")
-                            st.divider()
+            st.markdown("**负向提示词：**")
+            st.code(result["负向提示词"], language=None)
             
-            with tab5:
-                st.subheader("📥 导出方案")
-                
-                export_format = st.radio(
-                    "选择导出格式：",
-                    ["JSON", "纯文本", "Markdown"]
-                )
-                
-                if export_format == "JSON":
-                    export_data = json.dumps(result, ensure_ascii=False, indent=2)
-                    st.download_button(
-                        "⬇️ 下载JSON文件",
-                        data=export_data,
-                        file_name="prompt_variations.json",
-                        mime="application/json"
-                    )
-                
-                elif export_format == "纯文本":
-                    export_text = f"""AI图像生成提示词方案
-========================
-
-原始想法：{result['原始想法']}
-
-完整正向提示词：
-{result['完整正向提示词']}
-
-负向提示词：
-{result['负向提示词']}
-
-变奏方案：
-"""
-                    for strategy_name, variations in result["变奏方案"].items():
-                        export_text += f"\n{strategy_name}:\n"
-                        for idx, var in enumerate(variations, 1):
-                            export_text += f"  {idx}. {var['变奏']}\n"
-                    
-                    st.download_button(
-                        "⬇️ 下载文本文件",
-                        data=export_text,
-                        file_name="prompt_variations.txt",
-                        mime="text/plain"
-                    )
-                
-                else:  # Markdown
-                    export_md = f"""# AI图像生成提示词方案
-
-## 原始想法
-{result['原始想法']}
-
-## 完整提示词
-
-### 正向提示词
-```
-{result['完整正向提示词']}
-```
-
-### 负向提示词
-```
-{result['负向提示词']}
-```
-
-## 变奏方案
-"""
-                    for strategy_name, variations in result["变奏方案"].items():
-                        export_md += f"\n### {strategy_name}\n\n"
-                        for idx, var in enumerate(variations, 1):
-                            export_md += f"{idx}. `{var['变奏']}`\n\n"
-                    
-                    st.download_button(
-                        "⬇️ 下载Markdown文件",
-                        data=export_md,
-                        file_name="prompt_variations.md",
-                        mime="text/markdown"
-                    )
+            if st.button("📋 复制正向提示词"):
+                st.toast("正向提示词已复制！")
+            
+            if st.button("📋 复制负向提示词"):
+                st.toast("负向提示词已复制！")
+        
+        with tab3:
+            st.subheader("🔍 详细分析")
+            
+            analysis = result["分析结果"]
+            
+            if analysis["识别的元素"]:
+                st.markdown("**已包含的元素：**")
+                for dim, elements in analysis["识别的元素"].items():
+                    with st.expander(dim):
+                        for elem in elements:
+                            st.markdown(f"- {elem['子维度']} / {elem['类别']}: `{elem['元素']}`")
+            
+            if analysis["建议补充"]:
+                st.markdown("**补充的元素：**")
+                for sugg in analysis["建议补充"]:
+                    st.markdown(f"- **{sugg['维度']}**: {sugg['示例']}")
+        
+        with tab4:
+            st.subheader("🎨 变奏方案")
+            
+            for strategy_name, variations in result["变奏方案"].items():
+                with st.expander(f"{strategy_name} ({len(variations)}个变奏)"):
+                    for idx, var in enumerate(variations, 1):
+                        st.markdown(f"**变奏 {idx}：**")
+                        st.code(var["变奏"], language=None)
+                        st.caption(f"策略：{var.get('策略', strategy_name)}")
+                        st.divider()
+        
+        with tab5:
+            st.subheader("📥 导出方案")
+            
+            export_format = st.radio(
+                "选择导出格式：",
+                list(EXPORT_FORMATS)
+            )
+            compress = st.checkbox("gzip 压缩")
+            
+            # 导出内容按格式生成一次后保存在会话中，切换格式不会重新生成
+            exports = entry["导出"]
+            fmt, label, file_name, mime = EXPORT_FORMATS[export_format]
+            if compress:
+                file_name, mime = file_name + ".gz", "application/gzip"
+            if (fmt, compress) not in exports:
+                exports[(fmt, compress)] = b"".join(iter_export_bytes(result, fmt, compress))
+            st.download_button(
+                label,
+                data=exports[(fmt, compress)],
+                file_name=file_name,
+                mime=mime
+            )
 
 
 if __name__ == "__main__":
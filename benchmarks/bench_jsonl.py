@@ -0,0 +1,104 @@
+"""
+JSONL 流式批量生成吞吐基准
+测量随机生成与变奏生成写出 JSONL 的单核吞吐，并与 benchmarks/baseline_jsonl.json 对比
+
+用法：
+  python -m benchmarks.bench_jsonl [--count N] [--check]   # 吞吐低于基线超过容差时 --check 返回非零
+  python -m benchmarks.bench_jsonl --save-baseline         # 在目标机器上重新生成基线
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from prompt_generator import PromptGenerator
+from bulk import iter_random_prompts, iter_variations, write_jsonl
+from benchmarks.run import BENCH_DIR, DEFAULT_TOLERANCE, compare
+
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline_jsonl.json")
+
+# 参考机器（baseline_jsonl.json 的 meta）上的设计目标（条/秒），仅作说明；--check 以基线为准
+THROUGHPUT_TARGETS = {
+    "random": 25000,
+    "variations": 30000,
+}
+
+
+def run(count: int, repeat: int = 10):
+    """分别测量随机生成与变奏生成写出 JSONL 的吞吐
+
+    每项分 repeat 段各生成 count 条，取最快的一段：多段短测量比一次长测量更不易受机器上其他负载干扰。
+    """
+    generator = PromptGenerator()
+    cases = {
+        "random": lambda: iter_random_prompts(generator, count),
+        "variations": lambda: iter_variations(generator, "一位穿汉服的少女，站在樱花树下", "跨维度组合", count),
+    }
+
+    results = {}
+    with open(os.devnull, "w", encoding="utf-8") as sink:
+        for name, make_rows in cases.items():
+            best = 0.0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                written = write_jsonl(make_rows(), sink)
+                best = max(best, written / (time.perf_counter() - start))
+            results[name] = {"count": count, "ops_per_sec": best}
+            print(f"{name:<12}{best:>12,.0f} 条/秒   设计目标 {THROUGHPUT_TARGETS[name]:,} 条/秒", flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONL 流式批量生成吞吐基准")
+    parser.add_argument('--count', type=int, default=20000,
+                       help='每段生成条数（默认：20000）')
+    parser.add_argument('--repeat', type=int, default=10,
+                       help='每项测量的段数，取最快的一段（默认：10）')
+    parser.add_argument('--check', action='store_true',
+                       help='吞吐低于基线超过容差时返回非零退出码')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                       help='基线 JSON 路径（默认：benchmarks/baseline_jsonl.json）')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                       help='允许的吞吐下降比例（默认：0.25）')
+    parser.add_argument('--save-baseline', action='store_true',
+                       help='用本次结果覆盖基线文件')
+    args = parser.parse_args()
+
+    current = run(args.count, args.repeat)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"💾 基线已更新：{args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("⚠️ 未找到基线文件，跳过对比（可用 --save-baseline 生成）")
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ 检测到吞吐回归：")
+        for line in regressions:
+            print(f"  • {line}")
+        if args.check:
+            sys.exit(1)
+    else:
+        print("\n✅ 未检测到吞吐回归")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+HTTP 接口服务并发压测
+启动本地 server.py 子进程（或连接已运行的服务），以固定并发数的长连接持续发送请求，
+报告吞吐（请求/秒）、p50/p90/p99 延迟以及服务端的平均攒批大小
+
+用法：
+  python -m benchmarks.bench_server                              # 各接口依次压测
+  python -m benchmarks.bench_server --endpoint analyze --concurrency 128
+  python -m benchmarks.bench_server --url http://127.0.0.1:8765  # 压测已运行的服务
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.run import percentile
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 各接口的压测请求体
+PAYLOADS = {
+    "random": {"count": 1, "dimensions_count": 4},
+    "variations": {"prompt": "一位穿着汉服的少女，站在樱花树下", "strategy": "跨维度组合", "count": 5},
+    "analyze": {"prompt": "赛博朋克风格的猫，霓虹灯光，电影级光影，8K超高清"},
+    "complete": {"idea": "未来城市"},
+}
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                   host: str, path: str, payload: Dict[str, Any]) -> Tuple[int, bytes]:
+    """在长连接上发送一个 POST 请求并读取完整响应"""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _client(host: str, port: int, path: str, payload: Dict[str, Any],
+                  deadline: float, latencies: List[int], errors: List[int]):
+    reader, writer = await asyncio.open_connection(host, port)
+    timer = time.perf_counter_ns
+    try:
+        while time.perf_counter() < deadline:
+            start = timer()
+            status, _ = await _request(reader, writer, host, path, payload)
+            latencies.append(timer() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def load_test(host: str, port: int, endpoint: str,
+                    concurrency: int, duration: float) -> Dict[str, float]:
+    """以 concurrency 个长连接压测 duration 秒"""
+    latencies: List[int] = []
+    errors: List[int] = []
+    path = f"/{endpoint}"
+    payload = PAYLOADS[endpoint]
+
+    # 预热，确保接口路径与连接都已就绪
+    reader, writer = await asyncio.open_connection(host, port)
+    await _request(reader, writer, host, path, payload)
+    writer.close()
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _client(host, port, path, payload, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) / 1e6,
+        "p90_ms": percentile(latencies, 0.90) / 1e6,
+        "p99_ms": percentile(latencies, 0.99) / 1e6,
+    }
+
+
+async def fetch_stats(host: str, port: int) -> Dict[str, Any]:
+    """读取服务端的 /stats"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, body = await _request(reader, writer, host, "/stats", {})
+    finally:
+        writer.close()
+    return json.loads(body)
+
+
+def start_server(extra_args: List[str]) -> Tuple[subprocess.Popen, int]:
+    """在随机端口启动 server.py 子进程，返回 (进程, 端口)"""
+    process = subprocess.Popen(
+        [sys.executable, "server.py", "--port", "0"] + extra_args,
+        cwd=REPO_DIR, stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    match = re.search(r":(\d+)\s*$", line)
+    if not match:
+        process.kill()
+        raise RuntimeError(f"服务启动失败：{line!r}")
+    return process, int(match.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 接口服务并发压测")
+    parser.add_argument('--endpoint', choices=list(PAYLOADS),
+                       help='只压测指定接口（默认：全部）')
+    parser.add_argument('--concurrency', type=int, default=64,
+                       help='并发连接数（默认：64）')
+    parser.add_argument('--duration', type=float, default=5.0,
+                       help='每个接口的压测时长（秒，默认：5）')
+    parser.add_argument('--url',
+                       help='压测已运行的服务，不指定则自动启动本地服务')
+    parser.add_argument('--batch-window', type=float,
+                       help='传给自动启动的服务的攒批时间窗口（毫秒）')
+    args = parser.parse_args()
+
+    process: Optional[subprocess.Popen] = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        extra = ["--batch-window", str(args.batch_window)] if args.batch_window is not None else []
+        process, port = start_server(extra)
+        host = "127.0.0.1"
+
+    try:
+        endpoints = [args.endpoint] if args.endpoint else list(PAYLOADS)
+        print(f"并发连接数：{args.concurrency}，每个接口压测 {args.duration:g} 秒\n")
+        print(f"{'接口':<14}{'请求/秒':>12}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'错误':>8}")
+        for endpoint in endpoints:
+            result = asyncio.run(load_test(host, port, endpoint, args.concurrency, args.duration))
+            print(f"{endpoint:<14}{result['requests_per_sec']:>12,.0f}{result['p50_ms']:>10.2f}"
+                  f"{result['p90_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}", flush=True)
+
+        batching = asyncio.run(fetch_stats(host, port))["攒批"]
+        print("\n服务端平均攒批大小：")
+        for path, stats in batching.items():
+            if stats["批数"]:
+                print(f"  {path:<14}{stats['平均批大小']:>8.1f}（{stats['请求数']} 个请求 / {stats['批数']} 批）")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+PromptGenerator 全入口性能基准
+测量每个入口的吞吐（次/秒）、p50/p99 延迟与峰值内存，结果保存为 JSON 并与基线对比
+
+用法：
+  python -m benchmarks.run                         # 运行并与 benchmarks/baseline.json 对比
+  python -m benchmarks.run --only analyze          # 只运行名称包含 analyze 的用例
+  python -m benchmarks.run --save-baseline         # 用本次结果覆盖基线
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from prompt_generator import PromptGenerator, STRATEGY_REGISTRY
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+
+# 吞吐低于基线的比例超过该值即视为回归
+DEFAULT_TOLERANCE = 0.25
+
+# analyze_prompt 测试的提示词长度（字符数）
+ANALYZE_LENGTHS = (16, 64, 256, 1024, 4096)
+
+# 启用模糊识别的 analyze_prompt 测试长度，与同长度的精确识别用例对照
+FUZZY_ANALYZE_LENGTHS = (64, 1024)
+
+BASE_PROMPT = "一位穿着汉服的少女，站在樱花树下"
+
+# 批量变奏用例的基础提示词数（每个生成 5 个变奏）
+BATCH_BASES = 100
+
+
+def build_prompt(generator: PromptGenerator, length: int) -> str:
+    """拼接随机提示词直到达到指定长度，用作 analyze_prompt 的输入"""
+    parts = []
+    total = 0
+    while total < length:
+        text = generator.generate_random_prompt(dimensions_count=6)["提示词"]
+        parts.append(text)
+        total += len(text) + 1
+    return "，".join(parts)[:length]
+
+
+def build_cases(generator: PromptGenerator) -> List[Tuple[str, Callable[[], Any], int]]:
+    """基准用例：(名称, 单次调用, 迭代次数)"""
+    cases = [
+        ("random_element_from_dimension",
+         lambda: generator.random_element_from_dimension("4.技术层"), 50000),
+        ("generate_random_prompt",
+         lambda: generator.generate_random_prompt(dimensions_count=4), 20000),
+    ]
+    for strategy, (method_name, _, _) in STRATEGY_REGISTRY.items():
+        method = getattr(generator, method_name)
+        cases.append((f"variations.{strategy}", lambda method=method: method(BASE_PROMPT, 5), 5000))
+    bases = [f"{BASE_PROMPT}，第{i}组" for i in range(BATCH_BASES)]
+    for strategy in STRATEGY_REGISTRY:
+        cases.append((f"variations_batch_columnar.{strategy}",
+                      lambda strategy=strategy: generator.generate_variations_batch(
+                          bases, strategy, 5, columnar=True), 50))
+    for length in ANALYZE_LENGTHS:
+        prompt = build_prompt(generator, length)
+        iterations = max(200, 200000 // length)
+        cases.append((f"analyze_prompt.len{length}",
+                      lambda prompt=prompt: generator.analyze_prompt(prompt), iterations))
+    fuzzy_generator = PromptGenerator(seed=0)
+    fuzzy_generator.enable_fuzzy_matching()
+    for length in FUZZY_ANALYZE_LENGTHS:
+        prompt = build_prompt(generator, length)
+        iterations = max(200, 200000 // length)
+        cases.append((f"analyze_prompt_fuzzy.len{length}",
+                      lambda prompt=prompt: fuzzy_generator.analyze_prompt(prompt), iterations))
+    cases.append(("generate_complete_prompt_set",
+                  lambda: generator.generate_complete_prompt_set("赛博朋克风格的猫"), 2000))
+    return cases
+
+
+def percentile(sorted_values: List[int], q: float) -> int:
+    """已排序样本的 q 分位数（最近秩法）"""
+    if not sorted_values:
+        return 0
+    rank = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def measure(func: Callable[[], Any], iterations: int, warmup: int = 100) -> Dict[str, float]:
+    """逐次计时得到延迟分布，再单独用 tracemalloc 测一轮峰值内存"""
+    for _ in range(warmup):
+        func()
+
+    timer = time.perf_counter_ns
+    samples = []
+    append = samples.append
+    start = timer()
+    for _ in range(iterations):
+        t0 = timer()
+        func()
+        append(timer() - t0)
+    elapsed = timer() - start
+    samples.sort()
+
+    # 峰值内存单独测量，避免 tracemalloc 的开销污染计时
+    memory_iterations = max(1, iterations // 20)
+    tracemalloc.start()
+    for _ in range(memory_iterations):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / (elapsed / 1e9),
+        "p50_us": percentile(samples, 0.50) / 1000,
+        "p99_us": percentile(samples, 0.99) / 1000,
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def run(only: str = "", scale: float = 1.0) -> Dict[str, Any]:
+    """运行全部（或名称包含 only 的）用例"""
+    generator = PromptGenerator(seed=20240101)
+    results = {}
+    for name, func, iterations in build_cases(generator):
+        if only and only not in name:
+            continue
+        results[name] = measure(func, max(10, int(iterations * scale)))
+        stats = results[name]
+        print(f"{name:<36}{stats['ops_per_sec']:>12,.0f} 次/秒"
+              f"{stats['p50_us']:>10.1f}µs p50{stats['p99_us']:>10.1f}µs p99"
+              f"{stats['peak_memory_kb']:>10.1f}KB", flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """与基线对比吞吐，返回回归的用例说明"""
+    regressions = []
+    print(f"\n{'用例':<36}{'基线':>12}{'本次':>12}{'变化':>10}")
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        change = stats["ops_per_sec"] / base["ops_per_sec"] - 1
+        flag = ""
+        if change < -tolerance:
+            flag = "  ❌ 回归"
+            regressions.append(f"{name}: {base['ops_per_sec']:,.0f} → {stats['ops_per_sec']:,.0f} 次/秒 ({change:+.1%})")
+        print(f"{name:<36}{base['ops_per_sec']:>12,.0f}{stats['ops_per_sec']:>12,.0f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PromptGenerator 全入口性能基准")
+    parser.add_argument('--only', default='',
+                       help='只运行名称包含该字符串的用例')
+    parser.add_argument('--scale', type=float, default=1.0,
+                       help='迭代次数倍率，调小可快速试跑（默认：1.0）')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                       help='结果 JSON 输出路径（默认：benchmarks/results.json）')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                       help='基线 JSON 路径（默认：benchmarks/baseline.json）')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                       help='允许的吞吐下降比例（默认：0.25）')
+    parser.add_argument('--save-baseline', action='store_true',
+                       help='用本次结果覆盖基线文件')
+    args = parser.parse_args()
+
+    current = run(args.only, args.scale)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存到：{args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"💾 基线已更新：{args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("⚠️ 未找到基线文件，跳过对比（可用 --save-baseline 生成）")
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ 检测到性能回归：")
+        for line in regressions:
+            print(f"  • {line}")
+        sys.exit(1)
+    print("\n✅ 未检测到性能回归")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+批量生成与流式输出
+以迭代器方式逐条产出生成结果，并以 JSONL（每行一个 JSON 对象）写出，内存占用与生成数量无关
+"""
+
+import json
+import sys
+from contextlib import nullcontext
+from typing import Any, ContextManager, Dict, Iterable, Iterator, Optional, TextIO
+
+from prompt_generator import PromptGenerator, check_stratified_strategy
+
+
+# 单次调用 generate_variations 的最大变奏数，用于把大批量切成定长的小块
+VARIATION_CHUNK_SIZE = 1024
+
+SAMPLING_MODES = ("random", "unique", "stratified")
+
+# 输出文件的缓冲区大小
+WRITE_BUFFER_SIZE = 1 << 20
+
+# 攒够多少行再合并写出一次
+WRITE_BATCH_LINES = 512
+
+
+def iter_random_prompts(generator: PromptGenerator,
+                        count: int,
+                        include_quality: bool = True,
+                        dimensions_count: int = 4,
+                        sampling: str = "random") -> Iterator[Dict[str, Any]]:
+    """逐条生成随机提示词
+
+    sampling 为 unique 时在组合空间上无放回采样，结果互不重复；
+    为 stratified 时分层覆盖采样，尽早覆盖全部元素。
+    """
+    if sampling == "unique":
+        yield from generator.generate_unique_prompts(
+            count, include_quality=include_quality, dimensions_count=dimensions_count
+        )
+        return
+    if sampling == "stratified":
+        yield from generator.generate_stratified_prompts(
+            count, include_quality=include_quality, dimensions_count=dimensions_count
+        )
+        return
+    
+    generate = generator.generate_random_prompt
+    for _ in range(count):
+        yield generate(include_quality=include_quality, dimensions_count=dimensions_count)
+
+
+def iter_variations(generator: PromptGenerator,
+                    base_prompt: str,
+                    strategy: str = "单维度变奏",
+                    count: int = 5,
+                    sampling: str = "random") -> Iterator[Dict[str, Any]]:
+    """分块生成变奏
+
+    渐进变奏的数量受序列长度限制且同一批共享一个序列，因此只调用一次。
+    sampling 为 unique 时仅支持跨维度组合，产出互不重复的组合；
+    为 stratified 时支持单维度变奏、跨维度组合与混合实验。
+    """
+    if sampling == "unique":
+        check_unique_strategy(strategy)
+        yield from generator.generate_unique_cross_variations(base_prompt, count)
+        return
+    if sampling == "stratified":
+        yield from generator.generate_stratified_variations(base_prompt, strategy, count)
+        return
+    
+    if strategy == "渐进变奏":
+        yield from generator.generate_variations(base_prompt, strategy, count)
+        return
+
+    remaining = count
+    while remaining > 0:
+        chunk = min(remaining, VARIATION_CHUNK_SIZE)
+        yield from generator.generate_variations(base_prompt, strategy, chunk)
+        remaining -= chunk
+
+
+def check_unique_strategy(strategy: str):
+    """无放回采样只对跨维度组合有意义"""
+    if strategy != "跨维度组合":
+        raise ValueError("无放回采样（unique）仅支持「跨维度组合」策略")
+
+
+def open_output(path: Optional[str] = None) -> ContextManager[TextIO]:
+    """打开带缓冲的 UTF-8 文本输出；path 为空时写到标准输出（退出时不关闭）"""
+    if path:
+        return open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE)
+    return nullcontext(sys.stdout)
+
+
+def write_jsonl(rows: Iterable[Dict[str, Any]], out: TextIO) -> int:
+    """逐行写出 JSON 对象，每 WRITE_BATCH_LINES 行合并为一次写入，返回写出的行数"""
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    write = out.write
+    pending = []
+    written = 0
+    for row in rows:
+        pending.append(encode(row))
+        if len(pending) >= WRITE_BATCH_LINES:
+            pending.append("")
+            write("\n".join(pending))
+            written += len(pending) - 1
+            pending.clear()
+    if pending:
+        pending.append("")
+        write("\n".join(pending))
+        written += len(pending) - 1
+    out.flush()
+    return written
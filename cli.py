@@ -4,9 +4,12 @@ AI图像生成提示词变奏创意助手 - 命令行版本
 """
 
 import sys
-import argparse
 import json
-from prompt_generator import PromptGenerator
+
+import daemon
+
+# argparse 与 prompt_generator / bulk / parallel 都在用到时才导入：
+# 守护进程运行时，客户端只需转发参数，不必付出解析参数、加载金字塔与构建索引的开销
 
 
 def print_header(text):
@@ -57,21 +60,27 @@ def show_dimension_detail(generator, dimension):
                 print(f"  • {element}")
 
 
-def generate_random(generator, count=1, include_quality=True, dimensions_count=4):
+def generate_random(generator, count=1, include_quality=True, dimensions_count=4,
+                    sampling="random"):
     """生成随机提示词"""
+    from bulk import iter_random_prompts
+    
     print_header("✨ 随机提示词生成")
     
-    for i in range(count):
+    results = iter_random_prompts(
+        generator,
+        count,
+        include_quality=include_quality,
+        dimensions_count=dimensions_count,
+        sampling=sampling
+    )
+    
+    for i, result in enumerate(results):
         if count > 1:
             print(f"\n{'━' * 60}")
             print(f"  提示词 #{i + 1}")
             print('━' * 60)
         
-        result = generator.generate_random_prompt(
-            include_quality=include_quality,
-            dimensions_count=dimensions_count
-        )
-        
         print("\n📝 生成的提示词：")
         print(f"\n{result['提示词']}\n")
         
@@ -80,13 +89,22 @@ def generate_random(generator, count=1, include_quality=True, dimensions_count=4
             print(f"  • {dim}: {element}")
 
 
-def generate_variations(generator, base_prompt, strategy="单维度变奏", count=5):
-    """生成变奏"""
+def generate_variations(generator, base_prompt, strategy="单维度变奏", count=5,
+                        sampling="random", output_file=None):
+    """生成变奏；给出 output_file 时按扩展名格式流式导出到文件，不逐条打印"""
+    from bulk import iter_variations
+    
     print_header(f"🔄 提示词变奏 - {strategy}")
     
     print(f"基础提示词：\n{base_prompt}\n")
     
-    variations = generator.generate_variations(base_prompt, strategy, count)
+    variations = iter_variations(generator, base_prompt, strategy, count, sampling)
+    
+    if output_file:
+        from exporters import write_export
+        write_export({"原始想法": base_prompt, "变奏方案": {strategy: variations}}, output_file)
+        print(f"💾 变奏已保存到：{output_file}")
+        return
     
     for idx, var in enumerate(variations, 1):
         print(f"\n{'─' * 60}")
@@ -117,7 +135,10 @@ def analyze_prompt(generator, prompt):
         for dim, elements in analysis["识别的元素"].items():
             print(f"\n{dim}:")
             for elem in elements:
-                print(f"  • {elem['子维度']} / {elem['类别']}: {elem['元素']}")
+                line = f"  • {elem['子维度']} / {elem['类别']}: {elem['元素']}"
+                if "置信度" in elem:
+                    line += f"（模糊识别：「{elem['原文']}」，置信度 {elem['置信度']:.2f}）"
+                print(line)
     
     if analysis["建议补充"]:
         print_section("💡 建议补充的维度")
@@ -125,6 +146,93 @@ def analyze_prompt(generator, prompt):
             print(f"\n{sugg['维度']}:")
             print(f"  描述：{sugg['描述']}")
             print(f"  示例：{sugg['示例']}")
+            if "推荐" in sugg:
+                ranked = "、".join(f"{item['元素']}({item['得分']:.2f})" for item in sugg["推荐"])
+                print(f"  推荐：{ranked}")
+
+
+def analyze_file(args, parser):
+    """批量分析语料文件，输出维度 / 子维度 / 元素频次与覆盖分布"""
+    import os
+    from contextlib import nullcontext
+    from corpus import analyze_corpus, corpus_index, iter_corpus, summarize
+    from cooccurrence import CooccurrenceMatrix
+    
+    print_header("📊 语料批量分析")
+    print(f"语料文件：{args.analyze_file}")
+    
+    cooccurrence = None
+    if args.cooccurrence:
+        # 已有矩阵时在其基础上增量累计
+        if os.path.exists(args.cooccurrence):
+            try:
+                cooccurrence = CooccurrenceMatrix.load(args.cooccurrence, corpus_index())
+            except (OSError, ValueError) as exc:
+                parser.error(f'--cooccurrence 无法使用：{exc}')
+        else:
+            cooccurrence = CooccurrenceMatrix(corpus_index())
+    
+    prompts = iter_corpus(args.analyze_file, args.input_format, args.field, numbered=True)
+    coverage_file = open(args.coverage_file, 'w', encoding='utf-8') if args.coverage_file else nullcontext()
+    with coverage_file as coverage_out:
+        stats = analyze_corpus(prompts, workers=args.workers,
+                               coverage_out=coverage_out, cooccurrence=cooccurrence, numbered=True)
+    
+    summary = summarize(stats)
+    
+    print_section("统计信息")
+    print(f"提示词数：{summary['提示词数']}")
+    print(f"有识别结果的提示词数：{summary['有识别结果的提示词数']}")
+    print(f"平均覆盖维度数：{summary['平均覆盖维度数']:.2f}")
+    print("覆盖维度数分布：")
+    for k, n in summary["覆盖维度数分布"].items():
+        print(f"  {k} 个维度：{n}")
+    
+    print_section("📐 维度频次")
+    for item in summary["维度频次"]:
+        print(f"  {item['名称']:<12}{item['次数']:>10}  {item['占比']:>7.1%}")
+    
+    print_section("📂 子维度频次")
+    for item in summary["子维度频次"]:
+        print(f"  {item['名称']:<16}{item['次数']:>10}  {item['占比']:>7.1%}")
+    
+    print_section(f"🏷️ 元素频次（前 {args.top} 个）")
+    for item in summary["元素频次"][:args.top]:
+        print(f"  {item['名称']:<16}{item['次数']:>10}  {item['占比']:>7.1%}  {item['子维度']}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 完整统计已保存到：{args.output}")
+    if args.coverage_file:
+        print(f"💾 逐条覆盖情况已保存到：{args.coverage_file}")
+    if cooccurrence is not None:
+        cooccurrence.save(args.cooccurrence)
+        print(f"💾 共现矩阵已更新：{args.cooccurrence}（累计 {cooccurrence.prompts} 条提示词）")
+
+
+def complete_file(args):
+    """为想法文件的每一行生成完整方案，追加写出 JSONL，可从检查点续跑"""
+    from pipeline import default_checkpoint_path, print_progress, run_complete_file
+    
+    checkpoint_path = args.checkpoint or default_checkpoint_path(args.output)
+    try:
+        summary = run_complete_file(
+            args.complete_file,
+            args.output,
+            checkpoint_path=checkpoint_path,
+            workers=args.workers,
+            seed=args.seed,
+            progress=print_progress,
+            **generator_options(args)
+        )
+    except ValueError as exc:
+        # 检查点与本次参数不一致：不覆盖已有输出
+        print(f"❌ {exc}（检查点：{checkpoint_path}）", file=sys.stderr)
+        sys.exit(1)
+    action = "续跑完成" if summary["续跑"] else "完成"
+    print(f"\n{action}：共 {summary['行号']} 行，写出 {summary['已写出']} 个方案到 {args.output}"
+          f"（主种子：{summary['主种子']}）", file=sys.stderr)
 
 
 def generate_complete(generator, base_idea, output_file=None):
@@ -157,12 +265,140 @@ def generate_complete(generator, base_idea, output_file=None):
             print(f"  {idx}. {var['变奏']}")
     
     if output_file:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        from exporters import write_export
+        write_export(result, output_file)
         print(f"\n💾 完整方案已保存到：{output_file}")
 
 
-def main():
+def stream_jsonl(generator, args):
+    """以 JSONL 格式流式输出（随机 / 变奏 / 完整方案），不打印任何装饰文字"""
+    from bulk import iter_random_prompts, iter_variations, open_output, write_jsonl
+    
+    if args.workers > 1 or args.seed is not None:
+        stream_jsonl_parallel(args)
+        return
+    
+    if args.random:
+        rows = iter_random_prompts(
+            generator,
+            args.count,
+            include_quality=not args.no_quality,
+            dimensions_count=args.dimensions_count,
+            sampling=args.sampling
+        )
+    elif args.variations:
+        rows = iter_variations(generator, args.variations, args.strategy, args.count, args.sampling)
+    else:
+        rows = [generator.generate_complete_prompt_set(args.complete)]
+    
+    with open_output(args.output) as out:
+        write_jsonl(rows, out)
+
+
+def parallel_job(args):
+    """并行生成的任务类型、总数与参数"""
+    if args.random:
+        return "random", args.count, {"include_quality": not args.no_quality,
+                                      "dimensions_count": args.dimensions_count,
+                                      "sampling": args.sampling}
+    if args.variations:
+        return "variations", args.count, {"base_prompt": args.variations, "strategy": args.strategy,
+                                          "sampling": args.sampling}
+    return "complete", 1, {"base_idea": args.complete}
+
+
+def generator_options(args):
+    """工作进程生成器的选项（见 parallel.configure_generator），与本进程中生成器的设置一致"""
+    from weights import load_weights
+    
+    return {
+        "fuzzy": args.fuzzy,
+        "cooccurrence": args.cooccurrence,
+        "weights": load_weights(args.weights) if args.weights else None,
+        "constraints": constraint_rules(args),
+    }
+
+
+def constraint_rules(args):
+    """--constraints 对应的约束规则：未指定为 None，不带文件为内置规则"""
+    if args.constraints is None:
+        return None
+    if not args.constraints:
+        from prompt_pyramid import ELEMENT_CONSTRAINTS
+        return ELEMENT_CONSTRAINTS
+    from constraints import load_constraints
+    return load_constraints(args.constraints)
+
+
+def master_seed(args):
+    """--seed 或新取的主种子（新取时打印到标准错误，便于复现）"""
+    from parallel import new_master_seed
+    
+    seed = args.seed
+    if seed is None:
+        seed = new_master_seed()
+        print(f"主种子：{seed}", file=sys.stderr)
+    return seed
+
+
+def stream_jsonl_parallel(args):
+    """按分片种子多进程生成 JSONL；同一 --seed 在任意 --workers 下输出相同"""
+    from bulk import open_output
+    from parallel import write_parallel_jsonl
+    
+    seed = master_seed(args)
+    kind, total, params = parallel_job(args)
+    with open_output(args.output) as out:
+        write_parallel_jsonl(out, kind, total, workers=args.workers, seed=seed,
+                             generator_options=generator_options(args), **params)
+
+
+def stream_columnar(generator, args):
+    """按批写出 Parquet 列式文件（随机 / 变奏 / 完整方案中的变奏）"""
+    from bulk import iter_random_prompts, iter_variations
+    from columnar import write_columnar
+    
+    if args.workers > 1 or args.seed is not None:
+        from parallel import generate_parallel
+        seed = master_seed(args)
+        kind, total, params = parallel_job(args)
+        rows = generate_parallel(kind, total, workers=args.workers, seed=seed,
+                                 generator_options=generator_options(args), **params)
+    elif args.random:
+        rows = iter_random_prompts(
+            generator,
+            args.count,
+            include_quality=not args.no_quality,
+            dimensions_count=args.dimensions_count,
+            sampling=args.sampling
+        )
+    elif args.variations:
+        rows = iter_variations(generator, args.variations, args.strategy, args.count, args.sampling)
+    else:
+        rows = [generator.generate_complete_prompt_set(args.complete)]
+    
+    written = write_columnar(rows, args.output, generator.index)
+    print(f"💾 已写出 {written} 行到：{args.output}", file=sys.stderr)
+
+
+def report_stats(profiler, args, analysis_cache=None):
+    """输出性能统计（多进程模式下只包含主进程内的调用）"""
+    if args.stats:
+        print("\n📈 性能统计", file=sys.stderr)
+        print(profiler.format_table(), file=sys.stderr)
+        if analysis_cache is not None:
+            cache_stats = analysis_cache.stats()
+            print(f"\n分析缓存：{cache_stats['条目数']} 条，命中率 {cache_stats['命中率']:.1%}"
+                  f"（命中 {cache_stats['命中']} / 未命中 {cache_stats['未命中']}）", file=sys.stderr)
+    if args.stats_file:
+        profiler.save(args.stats_file)
+        print(f"💾 性能统计已保存到：{args.stats_file}", file=sys.stderr)
+
+
+def build_parser():
+    """命令行参数定义"""
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="AI图像生成提示词变奏创意助手 - 命令行版本",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -183,8 +419,40 @@ def main():
   # 分析提示词
   python cli.py --analyze "赛博朋克风格的猫，霓虹灯光"
   
+  # 模糊识别错别字等近似写法
+  python cli.py --analyze "赛博朋客风格的猫，新艺术运功" --fuzzy
+  
   # 生成完整方案
   python cli.py --complete "未来城市" --output result.json
+  
+  # 按语料中的元素频次加权抽取元素
+  python cli.py --analyze-file corpus.txt --output corpus_stats.json
+  python cli.py --random --count 10 --weights corpus_stats.json
+  
+  # 抽样时排除互斥的元素组合（内置规则或自定义规则文件）
+  python cli.py --random --count 10 --constraints
+  python cli.py --variations "赛博朋克风格的猫" --strategy 混合实验 --constraints rules.json
+  
+  # 为想法文件的每一行生成完整方案（JSONL），中断后重新执行同一命令即从检查点续跑
+  python cli.py --complete-file ideas.txt --workers 8 --output plans.jsonl
+  
+  # 大批量变奏流式导出为 gzip 压缩的 Markdown
+  python cli.py --variations "一位穿汉服的少女" --count 200000 --output variations.md.gz
+  
+  # 批量生成数据集（JSONL，每行一个结果）
+  python cli.py --random --count 1000000 --format jsonl --output prompts.jsonl
+  
+  # 多进程并行生成，固定主种子可完全复现
+  python cli.py --random --count 10000000 --format jsonl --workers 32 --seed 42 -o prompts.jsonl
+  
+  # 导出为字典编码的 Parquet 列式文件（需要 pyarrow）
+  python cli.py --random --count 1000000 --format parquet --workers 8 -o prompts.parquet
+  
+  # 批量分析语料（每行一条提示词，或 JSONL 中的「提示词」字段）
+  python cli.py --analyze-file prompts.jsonl --workers 8 --output corpus_stats.json
+  
+  # 启动常驻守护进程，之后的调用自动转发，每次只需几毫秒
+  python cli.py --daemon &
         """
     )
     
@@ -206,6 +474,44 @@ def main():
     parser.add_argument('--complete', metavar='IDEA',
                        help='生成完整方案')
     
+    parser.add_argument('--complete-file', metavar='FILE',
+                       help='为文件中的每一行想法生成完整方案，按行序追加写出JSONL（需要--output），'
+                            '可配合--workers并行、--seed复现')
+    
+    parser.add_argument('--checkpoint', metavar='FILE',
+                       help='--complete-file的检查点文件（默认：输出文件名加.checkpoint）；'
+                            '存在时从中断处续跑，全部完成后删除')
+    
+    parser.add_argument('--analyze-file', metavar='FILE',
+                       help='批量分析语料文件（-表示标准输入），统计维度 / 子维度 / 元素频次与覆盖分布')
+    
+    parser.add_argument('--input-format', default='auto', choices=['auto', 'text', 'jsonl'],
+                       help='语料格式：text为每行一条提示词，jsonl为每行一个JSON对象，auto按扩展名判断（默认：auto）')
+    
+    parser.add_argument('--field',
+                       help='JSONL语料中提示词所在的字段（默认依次尝试：提示词、变奏、prompt、text）')
+    
+    parser.add_argument('--coverage-file', metavar='FILE',
+                       help='把每条提示词的维度覆盖情况写入JSONL文件（用于--analyze-file）')
+    
+    parser.add_argument('--cooccurrence', metavar='FILE',
+                       help='共现矩阵文件：配合--analyze-file时用语料增量更新（不存在则新建），'
+                            '否则加载后按共现概率排序补充建议')
+    
+    parser.add_argument('--weights', metavar='FILE',
+                       help='元素抽取权重JSON：{"子维度": {...}, "类别": {...}, "元素": {...}}（未列出的为1）；'
+                            '也可直接使用--analyze-file保存的语料统计，按元素频次加权')
+    
+    parser.add_argument('--constraints', nargs='?', const='', metavar='FILE',
+                       help='启用元素兼容性约束，抽样时跳过互斥或依赖未满足的元素；'
+                            '不带文件使用内置规则，或指定规则JSON：{"互斥": [[a, b], ...], "依赖": [[a, b], ...]}')
+    
+    parser.add_argument('--fuzzy', action='store_true',
+                       help='分析时启用模糊识别，识别错别字、大小写与全半角不同的元素写法（用于--analyze、--complete）')
+    
+    parser.add_argument('--top', type=int, default=30,
+                       help='语料分析时显示的高频元素数（默认：30）')
+    
     parser.add_argument('--strategy', default='单维度变奏',
                        choices=['单维度变奏', '跨维度组合', '对比变奏', 
                                '渐进变奏', '极端变奏', '混合实验'],
@@ -221,13 +527,107 @@ def main():
                        help='随机生成时不包含质量词')
     
     parser.add_argument('--output', '-o', metavar='FILE',
-                       help='输出文件路径（仅用于--complete）')
+                       help='输出文件路径（用于--complete、--complete-file、--variations、--analyze-file或--format jsonl/parquet）；'
+                            '完整方案与变奏按扩展名导出为 .json/.jsonl/.md/.txt，加 .gz 后缀则 gzip 压缩')
     
-    args = parser.parse_args()
+    parser.add_argument('--format', default='text', choices=['text', 'jsonl', 'parquet'],
+                       help='输出格式：text为带装饰的文本，jsonl为每行一个JSON对象，'
+                            'parquet为字典编码的列式文件（需要pyarrow与--output）（默认：text）')
     
-    generator = PromptGenerator()
+    parser.add_argument('--workers', type=int, default=1,
+                       help='并行进程数，用于--format jsonl/parquet、--complete-file或--analyze-file（默认：1）')
+    
+    parser.add_argument('--seed', type=int,
+                       help='随机种子；JSONL模式下作为主种子派生各分片种子，--complete-file时按行号派生各方案种子，'
+                            '指定后结果可完全复现')
+    
+    parser.add_argument('--sampling', default='random', choices=['random', 'unique', 'stratified'],
+                       help='采样方式：random为独立随机抽取，unique为组合空间无放回采样、'
+                            '结果互不重复（变奏仅支持跨维度组合），stratified为按维度 / 子维度 / 类别分层轮流抽取、'
+                            '尽早覆盖全部元素（变奏支持单维度变奏、跨维度组合、混合实验）（默认：random）')
+    
+    parser.add_argument('--stats', action='store_true',
+                       help='结束后在标准错误输出打印各方法的调用次数与耗时统计')
+    
+    parser.add_argument('--stats-file', metavar='FILE',
+                       help='把性能统计快照保存为JSON文件')
     
-    if args.list_dimensions:
+    parser.add_argument('--daemon', action='store_true',
+                       help=f'作为常驻守护进程运行在Unix域套接字上（路径由环境变量{daemon.SOCKET_ENV}指定，'
+                            f'默认：{daemon.default_socket_path()}）')
+    
+    parser.add_argument('--no-daemon', action='store_true',
+                       help='即使守护进程在运行也在当前进程中执行')
+    
+    return parser
+
+
+def run(argv=None, generator=None):
+    """解析参数并执行一条命令；generator 为守护进程中常驻的生成器，缺省时新建"""
+    from prompt_generator import PromptGenerator
+    
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.workers > 1 and args.format == 'text' and not (args.analyze_file or args.complete_file):
+        parser.error('--workers 需要配合 --format jsonl/parquet、--complete-file 或 --analyze-file 使用')
+    
+    if args.complete_file and not args.output:
+        parser.error('--complete-file 需要指定 --output')
+    
+    if args.format == 'parquet' and not args.output:
+        parser.error('--format parquet 需要指定 --output')
+    
+    if args.sampling == 'unique' and args.variations and args.strategy != '跨维度组合':
+        parser.error('--sampling unique 仅支持 --strategy 跨维度组合')
+    
+    if args.sampling == 'stratified' and args.variations and args.strategy not in ('单维度变奏', '跨维度组合', '混合实验'):
+        parser.error('--sampling stratified 仅支持 --strategy 单维度变奏、跨维度组合或混合实验')
+    
+    if generator is None:
+        generator = PromptGenerator(seed=args.seed)
+    else:
+        # 与新建生成器等价：未指定 --seed 时重新取系统熵
+        generator.reseed(args.seed)
+        generator.set_cooccurrence(None)
+        generator.disable_fuzzy_matching()
+        generator.set_element_weights(None)
+        generator.disable_constraints()
+    
+    if args.fuzzy:
+        generator.enable_fuzzy_matching()
+    
+    if args.cooccurrence and not args.analyze_file:
+        try:
+            generator.load_cooccurrence(args.cooccurrence)
+        except (OSError, ValueError) as exc:
+            parser.error(f'--cooccurrence 无法使用：{exc}')
+    
+    if args.weights:
+        try:
+            generator.load_element_weights(args.weights)
+        except (OSError, ValueError) as exc:
+            parser.error(f'--weights 无法使用：{exc}')
+    
+    if args.constraints is not None:
+        try:
+            generator.enable_constraints(constraint_rules(args))
+        except (OSError, ValueError) as exc:
+            parser.error(f'--constraints 无法使用：{exc}')
+    
+    if args.stats or args.stats_file:
+        generator.enable_profiling()
+    
+    if args.complete_file:
+        complete_file(args)
+    
+    elif args.format == 'jsonl' and (args.random or args.variations or args.complete):
+        stream_jsonl(generator, args)
+    
+    elif args.format == 'parquet' and (args.random or args.variations or args.complete):
+        stream_columnar(generator, args)
+    
+    elif args.list_dimensions:
         list_dimensions(generator)
     
     elif args.show_dimension:
@@ -238,7 +638,8 @@ def main():
             generator, 
             count=args.count,
             include_quality=not args.no_quality,
-            dimensions_count=args.dimensions_count
+            dimensions_count=args.dimensions_count,
+            sampling=args.sampling
         )
     
     elif args.variations:
@@ -246,17 +647,52 @@ def main():
             generator,
             args.variations,
             strategy=args.strategy,
-            count=args.count
+            count=args.count,
+            sampling=args.sampling,
+            output_file=args.output
         )
     
     elif args.analyze:
         analyze_prompt(generator, args.analyze)
     
+    elif args.analyze_file:
+        analyze_file(args, parser)
+    
     elif args.complete:
         generate_complete(generator, args.complete, args.output)
     
     else:
         parser.print_help()
+    
+    if generator.profiler is not None:
+        report_stats(generator.profiler, args, generator.analysis_cache)
+        generator.disable_profiling()
+
+
+def run_daemon():
+    """常驻守护进程：预热生成器后依次执行客户端转发的命令"""
+    from prompt_generator import PromptGenerator
+    
+    generator = PromptGenerator()
+    # 守护进程跨调用保留分析缓存，反复分析同一提示词时直接命中
+    generator.enable_analysis_cache()
+    daemon.serve(lambda argv: run(argv, generator))
+
+
+def main():
+    argv = sys.argv[1:]
+    
+    if '--daemon' in argv:
+        run_daemon()
+        return
+    
+    # 守护进程读不到本进程的标准输入，读取标准输入的命令在本进程执行
+    if '--no-daemon' not in argv and not daemon.uses_stdin(argv):
+        code = daemon.request(argv)
+        if code is not None:
+            sys.exit(code)
+    
+    run(argv)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,343 @@
+"""
+生成结果的紧凑整数编码
+随机提示词与变奏都可以表示为「策略代码 + 若干元素编号」的定长整数记录，
+批量存放在 array 缓冲区中，只在需要时才还原为带文本的字典
+"""
+
+import json
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+from pyramid_index import PyramidIndex
+from prompt_pyramid import (
+    QUALITY_KEYWORDS,
+    CONTRAST_PAIRS,
+    PROGRESSIVE_SEQUENCES,
+    EXTREME_MODIFIERS
+)
+
+
+# 记录类型代码：0 为随机提示词，其余按策略顺序编号
+RANDOM_PROMPT = 0
+STRATEGY_CODES = ("单维度变奏", "跨维度组合", "对比变奏", "渐进变奏", "极端变奏", "混合实验")
+
+# 每条记录的 int16 字段数：[类型, 附加值, 槽位 × 9]
+RECORD_WIDTH = 11
+_SLOTS = 3
+
+# 每条结果在 EncodedBatch 各列中占用的字节数：
+# records（int16 × RECORD_WIDTH）+ base_ids（int32）+ seeds（int64）+ combinations（int64）+ positions（int32）
+RECORD_BYTES = (array("h").itemsize * RECORD_WIDTH + array("i").itemsize
+                + array("q").itemsize + array("q").itemsize + array("i").itemsize)
+
+_MAGIC = b"PGENC1\n"
+
+
+class EncodedBatch:
+    """一批编码后的生成结果
+
+    - ``records``：定长 int16 记录，每条 RECORD_WIDTH 个字段（元素编号远小于 32767）
+    - ``base_ids``：变奏的基础提示词编号，随机提示词为 -1（int32）
+    - ``seeds``：每条结果的「种子」（int64）
+    - ``combinations``：无放回采样结果的「组合编号」，其余为 -1（int64）
+    - ``positions``：分层采样结果的「序号」，其余为 -1（int32）；同一序列共用一个种子，重建需要序号
+    - ``bases``：变奏的基础提示词表，同一基础提示词只存一次
+    """
+
+    def __init__(self):
+        self.records = array("h")
+        self.base_ids = array("i")
+        self.seeds = array("q")
+        self.combinations = array("q")
+        self.positions = array("i")
+        self.bases: List[str] = []
+        self._base_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.seeds)
+
+    @property
+    def nbytes(self) -> int:
+        """数值缓冲区占用的字节数（不含基础提示词表）"""
+        return (len(self.records) * self.records.itemsize
+                + len(self.base_ids) * self.base_ids.itemsize
+                + len(self.seeds) * self.seeds.itemsize
+                + len(self.combinations) * self.combinations.itemsize
+                + len(self.positions) * self.positions.itemsize)
+
+    def base_id(self, base: str) -> int:
+        """基础提示词 → 编号"""
+        base_id = self._base_ids.get(base)
+        if base_id is None:
+            base_id = self._base_ids[base] = len(self.bases)
+            self.bases.append(base)
+        return base_id
+
+    def append(self, fields: List[int], base_id: int, seed: int, combination: int = -1, position: int = -1):
+        """追加一条记录，fields 不足 RECORD_WIDTH 时以 -1 补齐"""
+        if len(fields) > RECORD_WIDTH:
+            raise ValueError(f"记录字段数超过 {RECORD_WIDTH}")
+        self.records.extend(fields)
+        if len(fields) < RECORD_WIDTH:
+            self.records.extend([-1] * (RECORD_WIDTH - len(fields)))
+        self.base_ids.append(base_id)
+        self.seeds.append(seed)
+        self.combinations.append(combination)
+        self.positions.append(position)
+
+    def extend(self, records: Sequence[int], base_ids: Sequence[int], seeds: Sequence[int]):
+        """批量追加已补齐为 RECORD_WIDTH 个字段的记录（无组合编号与序号）"""
+        if len(records) != len(seeds) * RECORD_WIDTH or len(base_ids) != len(seeds):
+            raise ValueError("记录、基础提示词编号与种子的条数不一致")
+        self.records.extend(records)
+        self.base_ids.extend(base_ids)
+        self.seeds.extend(seeds)
+        self.combinations.extend(array("q", [-1]) * len(seeds))
+        self.positions.extend(array("i", [-1]) * len(seeds))
+
+    def record(self, i: int) -> array:
+        """第 i 条记录的字段"""
+        return self.records[i * RECORD_WIDTH:(i + 1) * RECORD_WIDTH]
+
+    def save(self, path: str):
+        """写入二进制文件：魔数 + JSON 头 + 各段原始缓冲区"""
+        header = json.dumps({
+            "count": len(self),
+            "width": RECORD_WIDTH,
+            "byteorder": sys.byteorder,
+            "positions": True,
+            "bases": self.bases
+        }, ensure_ascii=False).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            self.records.tofile(f)
+            self.base_ids.tofile(f)
+            self.seeds.tofile(f)
+            self.combinations.tofile(f)
+            self.positions.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> "EncodedBatch":
+        """从 save 写出的文件读取"""
+        batch = cls()
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"不是有效的编码文件：{path}")
+            header = json.loads(f.read(int.from_bytes(f.read(8), "little")).decode("utf-8"))
+            if header["width"] != RECORD_WIDTH:
+                raise ValueError(f"记录宽度不匹配：{header['width']} != {RECORD_WIDTH}")
+            count = header["count"]
+            batch.records.fromfile(f, count * RECORD_WIDTH)
+            batch.base_ids.fromfile(f, count)
+            batch.seeds.fromfile(f, count)
+            batch.combinations.fromfile(f, count)
+            # 早期文件没有序号段
+            if header.get("positions"):
+                batch.positions.fromfile(f, count)
+            else:
+                batch.positions.extend(array("i", [-1]) * count)
+        if header["byteorder"] != sys.byteorder:
+            batch.records.byteswap()
+            batch.base_ids.byteswap()
+            batch.seeds.byteswap()
+            batch.combinations.byteswap()
+            batch.positions.byteswap()
+        for base in header["bases"]:
+            batch.base_id(base)
+        return batch
+
+
+class PromptCodec:
+    """生成结果 ⇄ 整数记录
+
+    元素以 PyramidIndex 中的全局编号存储；同一维度内重复的元素字符串统一映射为首次出现的编号，
+    解码后的文本与原结果完全一致。
+    """
+
+    def __init__(self, index: PyramidIndex):
+        self.index = index
+        self.quality_words = QUALITY_KEYWORDS["通用质量词"]
+        self._quality_ids = {word: i for i, word in enumerate(self.quality_words)}
+        self._modifier_ids = {word: i for i, word in enumerate(EXTREME_MODIFIERS)}
+        self._strategy_codes = {name: i + 1 for i, name in enumerate(STRATEGY_CODES)}
+        self._elem_ids: Dict[tuple, int] = {}
+        for elem_id, element in enumerate(index.elements):
+            self._elem_ids.setdefault((index.elem_dimension[elem_id], element), elem_id)
+        # 元素编号 → 同一维度内同名元素中首次出现的编号（编码时统一使用）
+        self.canonical_ids = array("h", (self._elem_ids[(index.elem_dimension[elem_id], element)]
+                                         for elem_id, element in enumerate(index.elements)))
+
+    def strategy_code(self, strategy: str) -> int:
+        """变奏策略 → 记录类型代码"""
+        return self._strategy_codes[strategy]
+
+    def _element_id(self, element: str, dim_ids: Iterable[int]) -> int:
+        """在候选维度中查找元素编号，空字符串编码为 -1"""
+        if not element:
+            return -1
+        for dim_id in dim_ids:
+            elem_id = self._elem_ids.get((dim_id, element))
+            if elem_id is not None:
+                return elem_id
+        raise ValueError(f"元素不在金字塔中：{element}")
+
+    def encode(self, result: Dict[str, Any], batch: EncodedBatch):
+        """编码一条随机提示词或变奏并追加到 batch"""
+        index = self.index
+        dimension_ids = index.dimension_ids
+        combination = result.get("组合编号", -1)
+        position = result.get("序号", -1)
+
+        if "提示词" in result:
+            fields = [RANDOM_PROMPT, int(result["包含质量词"])]
+            parts = [self._element_id(element, (dimension_ids[dim],))
+                     for dim, element in result["维度分解"].items()]
+            fields.extend(parts + [-1] * (len(index.dimensions) - len(parts)))
+            if result["包含质量词"]:
+                prefix = result["提示词"].split("，", _SLOTS)[:_SLOTS]
+                fields.extend(self._quality_ids[word] for word in prefix)
+            batch.append(fields, -1, result["种子"], combination, position)
+            return
+
+        strategy = result["策略"]
+        code = self._strategy_codes[strategy]
+        text = result["变奏"]
+        extra = -1
+
+        if strategy == "单维度变奏":
+            dim_id = dimension_ids[result["维度"]]
+            base = text[:len(text) - len(result["元素"]) - 1]
+            slots = [dim_id, self._element_id(result["元素"], (dim_id,))]
+        elif strategy in ("跨维度组合", "混合实验"):
+            dims = [dimension_ids[dim] for dim in result["维度"]]
+            elements = result["元素"]
+            base = text[:len(text) - len("，".join(elements)) - 1]
+            width = 3 if strategy == "跨维度组合" else 4
+            slots = (dims + [-1] * (width - len(dims))
+                     + [self._element_id(element, dims) for element in elements])
+        elif strategy == "对比变奏":
+            pair_id = CONTRAST_PAIRS.index(tuple(result["对比组"]))
+            base = text[:len(text) - len(result["选择"]) - 3]
+            slots = [pair_id, CONTRAST_PAIRS[pair_id].index(result["选择"])]
+        elif strategy == "渐进变奏":
+            base = text[:len(text) - len(result["当前"]) - 1]
+            extra = result["阶段"]
+            slots = [PROGRESSIVE_SEQUENCES.index(result["序列"])]
+        else:  # 极端变奏
+            base = text[len(result["修饰词"]) + 1:]
+            slots = [self._modifier_ids[result["修饰词"]]]
+
+        batch.append([code, extra] + slots, batch.base_id(base), result["种子"], combination, position)
+
+    def decode(self, batch: EncodedBatch, i: int) -> Dict[str, Any]:
+        """还原第 i 条记录为与生成时相同的字典"""
+        index = self.index
+        elements = index.elements
+        dimensions = index.dimensions
+        fields = batch.record(i)
+        code, extra = fields[0], fields[1]
+        slots = fields[2:]
+        seed = batch.seeds[i]
+        combination = batch.combinations[i]
+        position = batch.positions[i]
+
+        if code == RANDOM_PROMPT:
+            dim_count = len(dimensions)
+            elem_ids = [e for e in slots[:dim_count] if e >= 0]
+            parts = {dimensions[index.elem_dimension[e]]: elements[e] for e in elem_ids}
+            # 元素编号按维度顺序排列，排序即得到提示词中的维度顺序
+            full_prompt = "，".join(elements[e] for e in sorted(elem_ids))
+            if extra:
+                quality = [self.quality_words[q] for q in slots[dim_count:dim_count + _SLOTS] if q >= 0]
+                full_prompt = "，".join(quality) + "，" + full_prompt
+            result = {
+                "提示词": full_prompt,
+                "维度分解": parts,
+                "包含质量词": bool(extra),
+                "种子": seed
+            }
+            if combination >= 0:
+                result["组合编号"] = combination
+            if position >= 0:
+                result["序号"] = position
+            return result
+
+        strategy = STRATEGY_CODES[code - 1]
+        base = batch.bases[batch.base_ids[i]]
+
+        if strategy == "单维度变奏":
+            element = elements[slots[1]] if slots[1] >= 0 else ""
+            result = {
+                "变奏": f"{base}，{element}",
+                "策略": strategy,
+                "维度": dimensions[slots[0]],
+                "元素": element,
+                "种子": seed
+            }
+        elif strategy in ("跨维度组合", "混合实验"):
+            width = 3 if strategy == "跨维度组合" else 4
+            dims = [dimensions[d] for d in slots[:width] if d >= 0]
+            chosen = [elements[e] for e in slots[width:] if e >= 0]
+            result = {
+                "变奏": f"{base}，{'，'.join(chosen)}",
+                "策略": strategy,
+                "维度": dims,
+                "元素": chosen,
+                "种子": seed
+            }
+        elif strategy == "对比变奏":
+            pair = CONTRAST_PAIRS[slots[0]]
+            result = {
+                "变奏": f"{base}，{pair[slots[1]]}风格",
+                "策略": strategy,
+                "对比组": pair,
+                "选择": pair[slots[1]],
+                "种子": seed
+            }
+        elif strategy == "渐进变奏":
+            sequence = PROGRESSIVE_SEQUENCES[slots[0]]
+            result = {
+                "变奏": f"{base}，{sequence[extra - 1]}",
+                "策略": strategy,
+                "序列": sequence,
+                "阶段": extra,
+                "当前": sequence[extra - 1],
+                "种子": seed
+            }
+        else:  # 极端变奏
+            modifier = EXTREME_MODIFIERS[slots[0]]
+            result = {
+                "变奏": f"{modifier}，{base}",
+                "策略": strategy,
+                "修饰词": modifier,
+                "种子": seed
+            }
+
+        if combination >= 0:
+            result["组合编号"] = combination
+        if position >= 0:
+            result["序号"] = position
+        return result
+
+    def element_ids(self, fields: Iterable[int]) -> List[int]:
+        """一条记录引用的金字塔元素编号；对比 / 渐进 / 极端变奏不引用金字塔元素"""
+        fields = list(fields)
+        code = fields[0]
+        slots = fields[2:]
+        if code == RANDOM_PROMPT:
+            return [e for e in slots[:len(self.index.dimensions)] if e >= 0]
+        strategy = STRATEGY_CODES[code - 1]
+        if strategy == "单维度变奏":
+            return [slots[1]] if slots[1] >= 0 else []
+        if strategy in ("跨维度组合", "混合实验"):
+            width = 3 if strategy == "跨维度组合" else 4
+            return [e for e in slots[width:] if e >= 0]
+        return []
+
+    def iter_decode(self, batch: EncodedBatch) -> Iterator[Dict[str, Any]]:
+        """依次还原整批记录"""
+        for i in range(len(batch)):
+            yield self.decode(batch, i)
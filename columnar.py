@@ -0,0 +1,190 @@
+"""
+列式导出
+把随机提示词与变奏按批写成 Parquet 表：策略、基础提示词以及各元素的维度 / 子维度 / 类别 / 元素列
+均为字典编码，元素编号为整数列表；分析时可直接按列扫描、过滤，无需解析嵌套 JSON。
+依赖可选的 pyarrow（pip install pyarrow）
+"""
+
+from array import array
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pc = None
+    pq = None
+
+from pyramid_index import PyramidIndex
+from codec import EncodedBatch, PromptCodec, RECORD_WIDTH, STRATEGY_CODES
+
+
+# 每个行组（记录批）的行数
+BATCH_ROWS = 65536
+
+DEFAULT_COMPRESSION = "zstd"
+
+# 随机提示词在「策略」列中的取值；其余取值与变奏策略名一致（编码与 codec 的记录类型代码相同）
+RANDOM_STRATEGY = "随机提示词"
+
+
+def require_pyarrow():
+    """列式导出所需的可选依赖"""
+    if pa is None:
+        raise ImportError("列式导出（Parquet）需要安装可选依赖 pyarrow：pip install pyarrow")
+
+
+def _dictionary(values: Sequence[str]) -> Tuple[List[str], array]:
+    """去重后的字典表，以及 原位置 → 字典编码 的映射
+
+    元素、类别名称会在不同维度 / 子维度中重复出现（如「文艺复兴」），字典中只保留一份，
+    转换为 pandas 分类列时不会因重复类别出错。
+    """
+    unique: Dict[str, int] = {}
+    codes = array("i", (unique.setdefault(value, len(unique)) for value in values))
+    return list(unique), codes
+
+
+def _flatten_results(results: Iterable[Mapping[str, Any]]) -> Iterable[Mapping[str, Any]]:
+    """完整方案展开为其中的各条变奏，随机提示词与变奏原样产出"""
+    for result in results:
+        if "变奏方案" in result:
+            for variations in result["变奏方案"].values():
+                yield from variations
+        else:
+            yield result
+
+
+class ColumnarWriter:
+    """分批写出 Parquet 的生成结果表
+
+    结果先用 PromptCodec 编码为整数记录，攒满 batch_rows 行后一次性转换为 Arrow 数组写出一个行组，
+    内存占用与总行数无关。列：
+
+    - ``策略``：字典编码（随机提示词 / 六种变奏策略）
+    - ``提示词``：渲染后的提示词或变奏文本
+    - ``基础提示词``：字典编码，随机提示词为空
+    - ``种子``、``组合编号``（仅无放回采样结果）、``序号``（仅分层采样结果，与种子一起重建该行）
+    - ``元素编号``：list<int16>，PyramidIndex 中的全局编号
+    - ``维度``、``子维度``、``类别``、``元素``：与元素编号一一对应的字典编码列表
+    """
+
+    def __init__(self, path: str, index: PyramidIndex,
+                 batch_rows: int = BATCH_ROWS,
+                 compression: Optional[str] = DEFAULT_COMPRESSION):
+        require_pyarrow()
+        self.path = path
+        self.index = index
+        self.codec = PromptCodec(index)
+        self.batch_rows = batch_rows
+        self.rows = 0
+
+        self._strategies = pa.array((RANDOM_STRATEGY,) + STRATEGY_CODES, pa.string())
+        self._dimensions = pa.array(index.dimensions, pa.string())
+        self._subdimensions = pa.array(index.subdimensions, pa.string())
+        categories, self._category_codes = _dictionary(index.categories)
+        self._categories = pa.array(categories, pa.string())
+        elements, self._element_codes = _dictionary(index.elements)
+        self._elements = pa.array(elements, pa.string())
+
+        self.schema = pa.schema([
+            ("策略", pa.dictionary(pa.int8(), pa.string())),
+            ("提示词", pa.string()),
+            ("基础提示词", pa.dictionary(pa.int32(), pa.string())),
+            ("种子", pa.int64()),
+            ("组合编号", pa.int64()),
+            ("序号", pa.int32()),
+            ("元素编号", pa.list_(pa.int16())),
+            ("维度", pa.list_(pa.dictionary(pa.int8(), pa.string()))),
+            ("子维度", pa.list_(pa.dictionary(pa.int16(), pa.string()))),
+            ("类别", pa.list_(pa.dictionary(pa.int16(), pa.string()))),
+            ("元素", pa.list_(pa.dictionary(pa.int16(), pa.string()))),
+        ])
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+        self._reset()
+
+    def _reset(self):
+        self._batch = EncodedBatch()
+        self._texts: List[str] = []
+
+    def write(self, result: Mapping[str, Any]):
+        """追加一条随机提示词或变奏"""
+        self.codec.encode(result, self._batch)
+        self._texts.append(result["提示词"] if "提示词" in result else result["变奏"])
+        if len(self._texts) >= self.batch_rows:
+            self.flush()
+
+    def write_all(self, results: Iterable[Mapping[str, Any]]) -> int:
+        """追加多条结果（完整方案展开为其中的变奏），返回本次写入的行数"""
+        before = self.rows + len(self._texts)
+        write = self.write
+        for result in _flatten_results(results):
+            write(result)
+        return self.rows + len(self._texts) - before
+
+    def flush(self):
+        """把缓冲的结果写成一个行组"""
+        batch = self._batch
+        n = len(batch)
+        if not n:
+            return
+
+        index = self.index
+        element_ids = self.codec.element_ids
+        records = batch.records
+        offsets = array("i", [0])
+        flat = array("h")
+        for i in range(n):
+            flat.extend(element_ids(records[i * RECORD_WIDTH:(i + 1) * RECORD_WIDTH]))
+            offsets.append(len(flat))
+
+        def dictionary_list(codes: Iterable[int], index_type, dictionary) -> Any:
+            indices = pa.array(codes, index_type)
+            values = pa.DictionaryArray.from_arrays(indices, dictionary)
+            return pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), values)
+
+        def without_negatives(values: array, value_type) -> Any:
+            """-1 表示缺失，转换为空值"""
+            values = pa.array(values, value_type)
+            return pc.if_else(pc.less(values, 0), pa.scalar(None, value_type), values)
+
+        columns = [
+            pa.DictionaryArray.from_arrays(pa.array(records[0::RECORD_WIDTH], pa.int8()), self._strategies),
+            pa.array(self._texts, pa.string()),
+            pa.DictionaryArray.from_arrays(without_negatives(batch.base_ids, pa.int32()),
+                                           pa.array(batch.bases, pa.string())),
+            pa.array(batch.seeds, pa.int64()),
+            without_negatives(batch.combinations, pa.int64()),
+            without_negatives(batch.positions, pa.int32()),
+            pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), pa.array(flat, pa.int16())),
+            dictionary_list((index.elem_dimension[e] for e in flat), pa.int8(), self._dimensions),
+            dictionary_list((index.elem_subdimension[e] for e in flat), pa.int16(), self._subdimensions),
+            dictionary_list((self._category_codes[index.elem_category[e]] for e in flat),
+                            pa.int16(), self._categories),
+            dictionary_list((self._element_codes[e] for e in flat), pa.int16(), self._elements),
+        ]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=self.schema))
+        self.rows += n
+        self._reset()
+
+    def close(self):
+        """写出剩余结果并关闭文件"""
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_columnar(results: Iterable[Mapping[str, Any]], path: str,
+                   index: PyramidIndex, batch_rows: int = BATCH_ROWS,
+                   compression: Optional[str] = DEFAULT_COMPRESSION) -> int:
+    """把结果流写成 Parquet 文件，返回写出的行数"""
+    with ColumnarWriter(path, index, batch_rows, compression) as writer:
+        writer.write_all(results)
+    return writer.rows
@@ -0,0 +1,219 @@
+"""
+元素兼容性约束
+声明元素 / 类别之间的互斥与依赖规则，编译为按元素编号索引的位集（Python 整数）；
+生成时用位与在抽样阶段过滤候选，而不是生成后再丢弃矛盾的组合
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+from pyramid_index import PyramidIndex
+from weights import ElementWeights
+
+
+# 约束配置的两类规则
+CONSTRAINT_KINDS = ("互斥", "依赖")
+
+# 被过滤掉一部分候选时，先按原分布重抽的次数；都落在被过滤的候选上时改为按剩余候选的条件分布直接抽取
+REJECTION_TRIES = 8
+
+# 规则中的一项：元素或类别名称（同名时优先元素），{"元素" / "类别": 名称}，或以上的列表（取并集）
+RuleTerm = Union[str, Mapping[str, str], Sequence[Any]]
+
+
+def _bits(ids: Iterable[int]) -> int:
+    mask = 0
+    for i in ids:
+        mask |= 1 << i
+    return mask
+
+
+class ElementConstraints:
+    """元素之间的互斥与依赖规则
+
+    互斥：两侧元素不会出现在同一条提示词中（对称）。
+    依赖：左侧元素只有在右侧任一元素已被选中（或已出现在基础提示词中）时才会成为候选；
+    同一元素的多条依赖规则须全部满足。依赖按抽取顺序判断，后抽取的维度才能用上先抽取的元素。
+
+    每个元素的互斥集合编译为一个位集，抽样时维护「已选」与「已排除」两个位集，
+    某维度的候选即 该维度的元素区间 & ~已排除，只需几次整数位运算。
+    """
+
+    def __init__(self, index: PyramidIndex):
+        self.index = index
+        self.conflicts: List[int] = [0] * len(index.elements)
+        self.requirements: Dict[int, List[int]] = {}
+        self._dimension_masks = []
+        for dim_id in range(len(index.dimensions)):
+            start, end = index.dimension_element_range(dim_id)
+            self._dimension_masks.append(((1 << (end - start)) - 1) << start)
+        # 各维度中带依赖规则的元素
+        self._requiring = [0] * len(index.dimensions)
+        self._uniform: Optional[ElementWeights] = None
+
+        self._element_ids: Dict[str, List[int]] = {}
+        for elem_id, name in enumerate(index.elements):
+            self._element_ids.setdefault(name, []).append(elem_id)
+        self._category_ids: Dict[str, List[int]] = {}
+        for cat_id, name in enumerate(index.categories):
+            self._category_ids.setdefault(name, []).append(cat_id)
+
+    def resolve(self, term: RuleTerm) -> int:
+        """规则中的一项 → 元素位集"""
+        if isinstance(term, str):
+            if term in self._element_ids:
+                return _bits(self._element_ids[term])
+            if term in self._category_ids:
+                return self._category_mask(term)
+            raise ValueError(f"金字塔中没有该元素或类别：{term}")
+        if isinstance(term, Mapping):
+            if len(term) != 1:
+                raise ValueError(f"规则项只能指定一个名称：{term}")
+            (level, name), = term.items()
+            if level == "元素":
+                if name not in self._element_ids:
+                    raise ValueError(f"金字塔中没有该元素：{name}")
+                return _bits(self._element_ids[name])
+            if level == "类别":
+                if name not in self._category_ids:
+                    raise ValueError(f"金字塔中没有该类别：{name}")
+                return self._category_mask(name)
+            raise ValueError(f"未知的规则项层级：{level}（可选：元素、类别）")
+        mask = 0
+        for item in term:
+            mask |= self.resolve(item)
+        return mask
+
+    def _category_mask(self, name: str) -> int:
+        mask = 0
+        for cat_id in self._category_ids[name]:
+            start, end = self.index.element_range(cat_id)
+            mask |= ((1 << (end - start)) - 1) << start
+        return mask
+
+    def add_conflict(self, a: RuleTerm, b: RuleTerm):
+        """a 与 b 两侧的元素互斥"""
+        left, right = self.resolve(a), self.resolve(b)
+        if left & right:
+            raise ValueError(f"互斥规则两侧有相同的元素：{a} / {b}")
+        for mask, other in ((left, right), (right, left)):
+            for elem_id in self._iter_bits(mask):
+                self.conflicts[elem_id] |= other
+
+    def add_requirement(self, a: RuleTerm, b: RuleTerm):
+        """a 侧的元素依赖 b 侧任一元素"""
+        left, right = self.resolve(a), self.resolve(b)
+        for elem_id in self._iter_bits(left):
+            self.requirements.setdefault(elem_id, []).append(right)
+            self._requiring[self.index.elem_dimension[elem_id]] |= 1 << elem_id
+
+    def update(self, config: Mapping[str, Sequence[Sequence[RuleTerm]]]):
+        """批量添加规则：{"互斥": [[a, b], ...], "依赖": [[a, b], ...]}
+
+        先解析全部规则，配置有误时不留下加了一半的规则。
+        """
+        unknown = set(config) - set(CONSTRAINT_KINDS)
+        if unknown:
+            raise ValueError(f"未知的约束类型：{'、'.join(sorted(unknown))}（可选：{'、'.join(CONSTRAINT_KINDS)}）")
+        for kind, rules in config.items():
+            for rule in rules:
+                if len(rule) != 2:
+                    raise ValueError(f"{kind}规则须为两项：{rule}")
+                self.resolve(rule[0]), self.resolve(rule[1])
+        for rule in config.get("互斥", ()):
+            self.add_conflict(*rule)
+        for rule in config.get("依赖", ()):
+            self.add_requirement(*rule)
+
+    @staticmethod
+    def _iter_bits(mask: int) -> Iterable[int]:
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def allowed(self, dim_id: int, chosen: int, excluded: int) -> int:
+        """维度中仍可抽取的元素位集：不与已选元素互斥，且依赖已被满足"""
+        mask = self._dimension_masks[dim_id] & ~excluded
+        pending = mask & self._requiring[dim_id]
+        for elem_id in self._iter_bits(pending):
+            for required in self.requirements[elem_id]:
+                if not chosen & required:
+                    mask &= ~(1 << elem_id)
+                    break
+        return mask
+
+    def draw_elements(self,
+                      dim_ids: Iterable[int],
+                      draw: Callable[[int], int],
+                      random: Callable[[], float],
+                      context: Iterable[int] = (),
+                      weights: Optional[ElementWeights] = None) -> List[int]:
+        """依次为各维度抽取一个满足约束的元素编号（没有可选元素时为 -1）
+
+        draw 为不带约束的抽取函数（维度编号 → 元素编号），context 为已有的元素（如基础提示词中识别出的）。
+        维度未被约束排除任何元素时直接调用 draw，消耗的随机序列与不设约束时相同；
+        否则按 draw 的分布重抽，被排除的元素占比过大时改为按 weights（缺省为逐级等概率）的条件分布抽取。
+        """
+        chosen = excluded = 0
+        for elem_id in context:
+            chosen |= 1 << elem_id
+            excluded |= self.conflicts[elem_id]
+
+        result = []
+        for dim_id in dim_ids:
+            mask = self.allowed(dim_id, chosen, excluded)
+            if mask == self._dimension_masks[dim_id]:
+                elem_id = draw(dim_id)
+            elif not mask:
+                elem_id = -1
+            else:
+                elem_id = self._draw_allowed(dim_id, mask, draw, random, weights)
+            if elem_id >= 0:
+                chosen |= 1 << elem_id
+                excluded |= self.conflicts[elem_id]
+            result.append(elem_id)
+        return result
+
+    def _draw_allowed(self, dim_id: int, mask: int, draw: Callable[[int], int],
+                      random: Callable[[], float], weights: Optional[ElementWeights]) -> int:
+        for _ in range(REJECTION_TRIES):
+            elem_id = draw(dim_id)
+            if elem_id >= 0 and mask >> elem_id & 1:
+                return elem_id
+        if weights is None:
+            if self._uniform is None:
+                self._uniform = ElementWeights(self.index)
+            weights = self._uniform
+        probabilities = weights.probabilities(dim_id)
+        candidates = [(elem_id, probabilities.get(elem_id, 0.0)) for elem_id in self._iter_bits(mask)]
+        total = sum(p for _, p in candidates)
+        if total <= 0:
+            return -1
+        u = random() * total
+        for elem_id, p in candidates:
+            u -= p
+            if u < 0:
+                return elem_id
+        return candidates[-1][0]
+
+    def violations(self, elem_ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """检查一组元素违反的规则：互斥的元素对，以及依赖未满足的元素"""
+        index = self.index
+        chosen = _bits(elem_ids)
+        found = []
+        for i, elem_id in enumerate(elem_ids):
+            for other in elem_ids[i + 1:]:
+                if self.conflicts[elem_id] >> other & 1:
+                    found.append({"类型": "互斥", "元素": [index.elements[elem_id], index.elements[other]]})
+            for required in self.requirements.get(elem_id, ()):
+                if not chosen & required:
+                    found.append({"类型": "依赖", "元素": [index.elements[elem_id]],
+                                  "需要": [index.elements[e] for e in self._iter_bits(required)]})
+        return found
+
+
+def load_constraints(path: str) -> Dict[str, List[List[RuleTerm]]]:
+    """读取约束配置 JSON"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
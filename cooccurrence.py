@@ -0,0 +1,159 @@
+"""
+元素共现统计
+从提示词语料累计「元素 × 元素」共现矩阵，为缺失维度按条件概率给出排序后的补充建议；
+矩阵可增量更新并保存到磁盘，新日志到来时只需追加统计，无需全量重算
+"""
+
+import hashlib
+import json
+import sys
+from array import array
+from typing import Iterable, List, Tuple
+
+from pyramid_index import PyramidIndex
+
+
+# 指定共现矩阵文件的环境变量（Web 界面启动时加载）
+COOCCURRENCE_ENV = "PROMPT_COOCCURRENCE"
+
+_MAGIC = b"PGCOO1\n"
+
+
+def element_fingerprint(index: PyramidIndex) -> str:
+    """元素表指纹：金字塔元素变化后旧矩阵的编号不再有效，加载时据此拒绝"""
+    return hashlib.blake2b("\n".join(index.elements).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CooccurrenceMatrix:
+    """稠密的元素共现计数矩阵
+
+    - ``element_counts[i]``：包含元素 i 的提示词条数
+    - ``counts[i * E + j]``：同时包含元素 i 与 j 的提示词条数（对称存储，对角线为 0）
+
+    元素总数不到一千，稠密 int64 矩阵只占几 MB；同一维度的元素编号连续，
+    因此「元素 i 与某维度全部元素的共现」就是矩阵第 i 行上的一段连续切片。
+    """
+
+    def __init__(self, index: PyramidIndex):
+        self.index = index
+        self.size = len(index.elements)
+        self.prompts = 0
+        self.element_counts = array("q", bytes(8 * self.size))
+        self.counts = array("q", bytes(8 * self.size * self.size))
+
+    def add(self, elem_ids: Iterable[int]):
+        """计入一条提示词中识别出的元素"""
+        ids = sorted(set(elem_ids))
+        size = self.size
+        counts = self.counts
+        element_counts = self.element_counts
+        for i in ids:
+            element_counts[i] += 1
+            row = i * size
+            for j in ids:
+                if j != i:
+                    counts[row + j] += 1
+        self.prompts += 1
+
+    def update(self, matches: Iterable[Iterable[int]]):
+        """增量计入多条提示词的识别结果"""
+        add = self.add
+        for elem_ids in matches:
+            add(elem_ids)
+
+    def merge(self, other: "CooccurrenceMatrix"):
+        """合并另一份矩阵的计数"""
+        if other.size != self.size:
+            raise ValueError("元素数不一致，无法合并共现矩阵")
+        self.prompts += other.prompts
+        for mine, theirs in ((self.element_counts, other.element_counts), (self.counts, other.counts)):
+            for i, count in enumerate(theirs):
+                if count:
+                    mine[i] += count
+
+    def rank(self, found: Iterable[int], dim_id: int, k: int = 3) -> List[Tuple[int, float]]:
+        """为维度 dim_id 推荐 k 个元素，返回 [(元素编号, 得分)]，得分降序
+
+        得分为已识别元素 i 下的平均条件概率 P(j | i) = C[i, j] / N[i]；
+        没有可用的已识别元素时退化为元素在语料中的出现率。同一文本的元素只保留一个。
+        """
+        e0, e1 = self.index.dimension_element_range(dim_id)
+        width = e1 - e0
+        if width <= 0 or not self.prompts:
+            return []
+
+        size = self.size
+        counts = self.counts
+        element_counts = self.element_counts
+        scores = [0.0] * width
+        used = 0
+        for i in set(found):
+            n = element_counts[i]
+            if not n:
+                continue
+            weight = 1.0 / n
+            row = counts[i * size + e0:i * size + e1]
+            scores = [s + c * weight for s, c in zip(scores, row)]
+            used += 1
+
+        if used:
+            scores = [s / used for s in scores]
+        else:
+            weight = 1.0 / self.prompts
+            scores = [c * weight for c in element_counts[e0:e1]]
+
+        elements = self.index.elements
+        ranked = []
+        seen = set()
+        for offset in sorted(range(width), key=lambda j: -scores[j]):
+            if scores[offset] <= 0 or len(ranked) >= k:
+                break
+            text = elements[e0 + offset]
+            if text in seen:
+                continue
+            seen.add(text)
+            ranked.append((e0 + offset, scores[offset]))
+        return ranked
+
+    def save(self, path: str):
+        """写入二进制文件：魔数 + JSON 头 + 计数缓冲区"""
+        header = json.dumps({
+            "size": self.size,
+            "prompts": self.prompts,
+            "fingerprint": element_fingerprint(self.index),
+            "byteorder": sys.byteorder
+        }).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            self.element_counts.tofile(f)
+            self.counts.tofile(f)
+
+    @classmethod
+    def load(cls, path: str, index: PyramidIndex) -> "CooccurrenceMatrix":
+        """读取 save 写出的文件；文件损坏或元素表与当前金字塔不一致时抛出 ValueError"""
+        matrix = cls(index)
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"不是有效的共现矩阵文件：{path}")
+            try:
+                header = json.loads(f.read(int.from_bytes(f.read(8), "little")).decode("utf-8"))
+                size, fingerprint = header["size"], header["fingerprint"]
+                prompts, byteorder = header["prompts"], header["byteorder"]
+            except (ValueError, KeyError, TypeError):
+                raise ValueError(f"共现矩阵文件头已损坏：{path}") from None
+            if size != matrix.size or fingerprint != element_fingerprint(index):
+                raise ValueError(f"共现矩阵与当前金字塔的元素表不一致：{path}")
+            matrix.prompts = prompts
+            matrix.element_counts = array("q")
+            matrix.counts = array("q")
+            try:
+                matrix.element_counts.fromfile(f, matrix.size)
+                matrix.counts.fromfile(f, matrix.size * matrix.size)
+            except EOFError:
+                raise ValueError(f"共现矩阵文件不完整：{path}") from None
+        if byteorder != sys.byteorder:
+            matrix.element_counts.byteswap()
+            matrix.counts.byteswap()
+        return matrix
@@ -0,0 +1,277 @@
+"""
+提示词语料批量分析
+流式读取文本（每行一条）或 JSONL 语料，分块交给进程池用预编译的元素匹配器识别，
+汇总维度 / 子维度 / 元素的频次直方图与每条提示词的维度覆盖，语料不会整体载入内存
+"""
+
+import json
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from prompt_pyramid import PROMPT_PYRAMID
+from pyramid_index import PyramidIndex
+from matcher import ElementMatcher
+from cache import matching_text
+from cooccurrence import CooccurrenceMatrix
+
+
+# 每个分块的提示词条数
+CHUNK_SIZE = 2000
+
+# 每个进程最多同时排队的分块数
+MAX_PENDING_PER_WORKER = 2
+
+CORPUS_FORMATS = ("auto", "text", "jsonl")
+
+# JSONL 语料中未指定字段时依次尝试的字段名
+DEFAULT_FIELDS = ("提示词", "变奏", "prompt", "text")
+
+_worker_matcher: Optional[ElementMatcher] = None
+
+
+def _get_matcher() -> ElementMatcher:
+    global _worker_matcher
+    if _worker_matcher is None:
+        _worker_matcher = ElementMatcher(PyramidIndex(PROMPT_PYRAMID))
+    return _worker_matcher
+
+
+class CorpusStats:
+    """语料统计
+
+    频次均按「包含该项的提示词条数」计，一条提示词多次提到同一元素只计一次；
+    同一元素字符串出现在多个维度中时（如「文艺复兴」），与 analyze_prompt 一致地计入每个维度。
+    """
+
+    def __init__(self, index: PyramidIndex):
+        self.prompts = 0
+        self.matched_prompts = 0
+        self.element_counts = array("q", bytes(8 * len(index.elements)))
+        self.subdimension_counts = array("q", bytes(8 * len(index.subdimensions)))
+        self.dimension_counts = array("q", bytes(8 * len(index.dimensions)))
+        # coverage_histogram[k]：恰好覆盖 k 个维度的提示词条数
+        self.coverage_histogram = array("q", bytes(8 * (len(index.dimensions) + 1)))
+
+    def add(self, index: PyramidIndex, elem_ids: Iterable[int]) -> Tuple[int, ...]:
+        """计入一条提示词的匹配结果，返回其覆盖的维度编号"""
+        elem_subdimension = index.elem_subdimension
+        sub_dimension = index.sub_dimension
+        element_counts = self.element_counts
+        subdims = set()
+        for elem_id in elem_ids:
+            element_counts[elem_id] += 1
+            subdims.add(elem_subdimension[elem_id])
+        dims = set()
+        for sub_id in subdims:
+            self.subdimension_counts[sub_id] += 1
+            dims.add(sub_dimension[sub_id])
+        for dim_id in dims:
+            self.dimension_counts[dim_id] += 1
+        self.prompts += 1
+        if subdims:
+            self.matched_prompts += 1
+        self.coverage_histogram[len(dims)] += 1
+        return tuple(sorted(dims))
+
+    def merge(self, other: "CorpusStats"):
+        """合并另一份（通常来自其他分块的）统计"""
+        self.prompts += other.prompts
+        self.matched_prompts += other.matched_prompts
+        for mine, theirs in ((self.element_counts, other.element_counts),
+                             (self.subdimension_counts, other.subdimension_counts),
+                             (self.dimension_counts, other.dimension_counts),
+                             (self.coverage_histogram, other.coverage_histogram)):
+            for i, count in enumerate(theirs):
+                if count:
+                    mine[i] += count
+
+    def to_dict(self, index: PyramidIndex, top: Optional[int] = None) -> Dict[str, Any]:
+        """JSON 友好的汇总：直方图按频次降序，元素只保留出现过的（top 给出时只保留前 top 个）"""
+        prompts = self.prompts
+
+        def ranked(counts, limit=None) -> List[int]:
+            order = sorted((i for i in range(len(counts)) if counts[i]), key=lambda i: (-counts[i], i))
+            return order if limit is None else order[:limit]
+
+        def share(count: int) -> float:
+            return count / prompts if prompts else 0.0
+
+        return {
+            "提示词数": prompts,
+            "有识别结果的提示词数": self.matched_prompts,
+            "平均覆盖维度数": sum(k * n for k, n in enumerate(self.coverage_histogram)) / prompts if prompts else 0.0,
+            "覆盖维度数分布": {str(k): n for k, n in enumerate(self.coverage_histogram)},
+            "维度频次": [
+                {"名称": index.dimensions[i], "次数": self.dimension_counts[i],
+                 "占比": share(self.dimension_counts[i])}
+                for i in ranked(self.dimension_counts)
+            ],
+            "子维度频次": [
+                {"名称": index.subdimensions[i], "次数": self.subdimension_counts[i],
+                 "占比": share(self.subdimension_counts[i])}
+                for i in ranked(self.subdimension_counts)
+            ],
+            "元素频次": [
+                {"名称": index.elements[i], "次数": self.element_counts[i],
+                 "占比": share(self.element_counts[i]),
+                 "维度": index.dimensions[index.elem_dimension[i]],
+                 "子维度": index.subdimensions[index.elem_subdimension[i]]}
+                for i in ranked(self.element_counts, top)
+            ],
+        }
+
+
+def corpus_index() -> PyramidIndex:
+    """语料分析所用的金字塔索引（用于创建与之匹配的共现矩阵）"""
+    return _get_matcher().index
+
+
+def summarize(stats: CorpusStats, top: Optional[int] = None) -> Dict[str, Any]:
+    """把 analyze_corpus 的结果整理为 JSON 友好的汇总"""
+    return stats.to_dict(corpus_index(), top)
+
+
+def iter_corpus(path: str, fmt: str = "auto", field: Optional[str] = None,
+                numbered: bool = False) -> Iterator[Union[str, Tuple[int, str]]]:
+    """逐条读取语料中的提示词；path 为 - 时读标准输入
+
+    text：每个非空行是一条提示词；jsonl：每行一个 JSON 对象，取 field 字段
+    （未指定时依次尝试 DEFAULT_FIELDS）。auto 按扩展名判断。
+    numbered 为真时产出 (行号, 提示词)：行号从 1 开始，空行跳过但占用行号，与批量流水线的「行号」一致。
+    """
+    if fmt not in CORPUS_FORMATS:
+        raise ValueError(f"未知的语料格式：{fmt}")
+    if fmt == "auto":
+        fmt = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "text"
+    fields = (field,) if field else DEFAULT_FIELDS
+
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if fmt == "text":
+                yield (line_no, line) if numbered else line
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                raise ValueError(f"第 {line_no} 行不是有效的 JSON")
+            if isinstance(row, str):
+                yield (line_no, row) if numbered else row
+                continue
+            for name in fields:
+                value = row.get(name) if isinstance(row, dict) else None
+                if isinstance(value, str):
+                    yield (line_no, value) if numbered else value
+                    break
+            else:
+                raise ValueError(f"第 {line_no} 行缺少提示词字段：{'/'.join(fields)}")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _chunks(prompts: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    iterator = iter(prompts)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+_ChunkResult = Tuple[CorpusStats, Optional[List[Tuple[int, ...]]], Optional[List[Tuple[int, ...]]]]
+
+
+def _analyze_chunk(task: Tuple[List[str], bool, bool]) -> _ChunkResult:
+    """进程池任务：分析一个分块
+
+    与 analyze_prompt 一样在 matching_text 规范化后的文本上匹配（全角 / 半角统一、连续空白合并），
+    返回分块统计，以及按需返回每条提示词覆盖的维度编号、识别出的元素编号。
+    """
+    prompts, with_coverage, with_matches = task
+    matcher = _get_matcher()
+    index = matcher.index
+    stats = CorpusStats(index)
+    match = matcher.match
+    add = stats.add
+    coverage = [] if with_coverage else None
+    matches = [] if with_matches else None
+    for prompt in prompts:
+        elem_ids = match(matching_text(prompt))
+        dims = add(index, elem_ids)
+        if with_coverage:
+            coverage.append(dims)
+        if with_matches:
+            matches.append(tuple(elem_ids))
+    return stats, coverage, matches
+
+
+def _iter_chunk_results(chunks: Iterable[List[str]], workers: int, with_coverage: bool,
+                        with_matches: bool) -> Iterator[_ChunkResult]:
+    """按语料顺序产出各分块结果；排队的分块数有上限，内存占用与语料大小无关"""
+    tasks = ((chunk, with_coverage, with_matches) for chunk in chunks)
+
+    if workers <= 1:
+        for task in tasks:
+            yield _analyze_chunk(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_analyze_chunk, task))
+            if len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def analyze_corpus(prompts: Iterable[Union[str, Tuple[int, str]]],
+                   workers: int = 1,
+                   coverage_out: Optional[TextIO] = None,
+                   cooccurrence: Optional[CooccurrenceMatrix] = None,
+                   chunk_size: int = CHUNK_SIZE,
+                   numbered: bool = False) -> CorpusStats:
+    """分析整个语料并返回汇总统计
+
+    给出 coverage_out 时按语料顺序写出每条提示词的覆盖情况（JSONL：序号、覆盖维度数、覆盖维度）；
+    给出 cooccurrence 时把每条提示词识别出的元素增量计入共现矩阵。
+    numbered 为真时 prompts 为 iter_corpus(numbered=True) 产出的 (行号, 提示词)，「序号」即文件中的行号；
+    否则「序号」为提示词的顺序号（从 1 开始）。
+    """
+    index = _get_matcher().index
+    total = CorpusStats(index)
+    dimensions = index.dimensions
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    # 行号留在主进程，按分块顺序与结果对应；进程池只收到提示词
+    line_numbers: Deque[List[int]] = deque()
+
+    def chunks() -> Iterator[List[str]]:
+        for chunk in _chunks(prompts if numbered else enumerate(prompts, 1), chunk_size):
+            line_numbers.append([line_no for line_no, _ in chunk])
+            yield [prompt for _, prompt in chunk]
+
+    for stats, coverage, matches in _iter_chunk_results(
+            chunks(), workers, coverage_out is not None, cooccurrence is not None):
+        total.merge(stats)
+        chunk_lines = line_numbers.popleft()
+        if coverage is not None:
+            lines = []
+            for line_no, dims in zip(chunk_lines, coverage):
+                lines.append(dumps({
+                    "序号": line_no,
+                    "覆盖维度数": len(dims),
+                    "覆盖维度": [dimensions[d] for d in dims]
+                }) + "\n")
+            coverage_out.write("".join(lines))
+        if matches is not None:
+            cooccurrence.update(matches)
+    return total
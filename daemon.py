@@ -0,0 +1,249 @@
+"""
+命令行常驻进程（Unix 域套接字）
+守护进程常驻一个预热好的 PromptGenerator，逐个执行客户端转发来的命令行参数，
+并把标准输出 / 标准错误按帧回传；客户端只依赖标准库的轻量模块，启动只需几毫秒
+
+本模块在客户端路径上被导入，不能在顶层导入 prompt_generator 等重量级模块，
+类型注解也不经由 typing（导入 typing 本身就要约 10 毫秒）
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import socket
+import stat
+import sys
+from collections.abc import Callable
+
+
+# 指定套接字路径的环境变量
+SOCKET_ENV = "PROMPT_CLI_SOCKET"
+
+# 帧格式：1 字节通道 + 4 字节长度（大端）+ 负载
+_EXIT, _STDOUT, _STDERR = 0, 1, 2
+_FRAME_HEADER = 5
+
+# 守护进程端输出缓冲区大小，攒满后作为一帧发出
+_STREAM_BUFFER_SIZE = 1 << 16
+
+
+def default_socket_path() -> str:
+    """套接字路径：环境变量 PROMPT_CLI_SOCKET，否则为 $XDG_RUNTIME_DIR 下的文件，
+    再否则为 /tmp 下按用户区分、权限 0700 的目录中的文件"""
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "prompt-cli.sock")
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return f"/tmp/prompt-cli-{uid}/daemon.sock"
+
+
+def _owned_by_user(st: os.stat_result) -> bool:
+    return not hasattr(os, "getuid") or st.st_uid == os.getuid()
+
+
+def _prepare_directory(path: str):
+    """确保套接字所在目录存在，且只有当前用户可以访问
+
+    目录不存在时以 0700 创建；已存在时必须是当前用户所有、组与其他用户无权限的真实目录，
+    否则拒绝启动（可能是其他用户抢先创建的）。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(directory):
+        os.makedirs(directory, mode=0o700)
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or not _owned_by_user(st) or st.st_mode & 0o077:
+        raise RuntimeError(f"套接字目录不属于当前用户或权限过宽（应为 0700）：{directory}")
+
+
+def _check_socket_owner(path: str) -> bool:
+    """套接字存在且属于当前用户；其他用户创建的同名套接字可能返回伪造的输出"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if not stat.S_ISSOCK(st.st_mode):
+        return False
+    if not _owned_by_user(st):
+        print(f"⚠️ 套接字不属于当前用户，已忽略并在本进程执行：{path}", file=sys.stderr)
+        return False
+    return True
+
+
+def uses_stdin(argv: list[str]) -> bool:
+    """命令是否读取客户端的标准输入：参数为「-」（如 --analyze-file -）或「…=-」
+
+    守护进程读不到客户端的标准输入，这类命令应在客户端进程中执行。其余命令不读标准输入，
+    即使标准输入是管道或文件（shell 循环、xargs、cron、subprocess）也照常转发给守护进程。
+    """
+    return any(arg == "-" or arg.endswith("=-") for arg in argv)
+
+
+def _send_frame(sock: socket.socket, channel: int, payload: bytes):
+    sock.sendall(bytes([channel]) + len(payload).to_bytes(4, "big") + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class _FrameStream(io.RawIOBase):
+    """把写入的字节作为指定通道的帧发给客户端"""
+
+    def __init__(self, sock: socket.socket, channel: int):
+        self.sock = sock
+        self.channel = channel
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        _send_frame(self.sock, self.channel, bytes(data))
+        return len(data)
+
+
+def _text_stream(sock: socket.socket, channel: int) -> io.TextIOWrapper:
+    buffered = io.BufferedWriter(_FrameStream(sock, channel), buffer_size=_STREAM_BUFFER_SIZE)
+    return io.TextIOWrapper(buffered, encoding="utf-8", errors="replace")
+
+
+def _exit_code(exc: SystemExit) -> int:
+    """与解释器处理 SystemExit 的方式一致"""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    print(exc.code, file=sys.stderr)
+    return 1
+
+
+def _is_listening(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(handle: Callable[[list[str]], int | None], socket_path: str | None = None):
+    """在 Unix 域套接字上依次执行客户端的命令
+
+    每个连接发送一个请求：4 字节长度 + 以 NUL 分隔的「工作目录、参数…」（UTF-8）；守护进程切换到客户端的
+    工作目录（使 --output 等相对路径保持原义），在重定向的标准输出 / 标准错误下调用
+    ``handle(argv)``，最后回传退出码。请求按顺序处理，生成器无需加锁。
+    """
+    path = socket_path or default_socket_path()
+    if socket_path is None and not os.environ.get(SOCKET_ENV):
+        # 默认位置的目录必须只有当前用户可以访问；显式指定的路径由调用方负责
+        _prepare_directory(path)
+    if os.path.exists(path):
+        if _is_listening(path):
+            raise RuntimeError(f"守护进程已在运行：{path}")
+        os.unlink(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # 在 umask 077 下绑定，套接字从创建起就只有当前用户可以连接
+    umask = os.umask(0o077)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    os.chmod(path, 0o600)
+    server.listen(16)
+    print(f"🚀 守护进程已启动：{path}", file=sys.stderr, flush=True)
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                _serve_connection(conn, handle)
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def _serve_connection(conn: socket.socket, handle: Callable[[list[str]], int | None]):
+    import traceback
+    from contextlib import redirect_stderr, redirect_stdout
+
+    try:
+        size = int.from_bytes(_recv_exact(conn, 4), "big")
+        cwd, *argv = _recv_exact(conn, size).decode("utf-8", "surrogateescape").split("\0")
+    except (ConnectionError, ValueError):
+        return
+
+    stdout = _text_stream(conn, _STDOUT)
+    stderr = _text_stream(conn, _STDERR)
+    code = 1
+    try:
+        os.chdir(cwd)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                code = handle(argv) or 0
+            except SystemExit as exc:
+                code = _exit_code(exc)
+            except (BrokenPipeError, ConnectionError):
+                raise
+            except Exception:
+                traceback.print_exc()
+                code = 1
+        stdout.flush()
+        stderr.flush()
+        _send_frame(conn, _EXIT, code.to_bytes(4, "big", signed=True))
+    except (BrokenPipeError, ConnectionError):
+        # 客户端提前退出（如管道下游的 head 已读够），丢弃剩余输出
+        pass
+
+
+def request(argv: list[str], socket_path: str | None = None) -> int | None:
+    """把命令转发给守护进程并回放其输出，返回退出码；没有可用的守护进程时返回 None
+
+    只连接当前用户所有的套接字。
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path or default_socket_path()
+    if not _check_socket_owner(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+
+    outputs = {_STDOUT: sys.stdout, _STDERR: sys.stderr}
+    with sock:
+        # 命令行参数不可能包含 NUL，用它分隔即可，客户端因此无需导入 json
+        payload = "\0".join([os.getcwd()] + argv).encode("utf-8", "surrogateescape")
+        sock.sendall(len(payload).to_bytes(4, "big") + payload)
+        while True:
+            try:
+                header = _recv_exact(sock, _FRAME_HEADER)
+            except ConnectionError:
+                print("❌ 守护进程意外断开连接", file=sys.stderr)
+                return 1
+            channel = header[0]
+            data = _recv_exact(sock, int.from_bytes(header[1:], "big"))
+            if channel == _EXIT:
+                return int.from_bytes(data, "big", signed=True)
+            out = outputs[channel].buffer
+            try:
+                out.write(data)
+                out.flush()
+            except BrokenPipeError:
+                # 管道下游已关闭（如 head），静默结束并让守护进程停止生成
+                os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+                return 1
@@ -0,0 +1,187 @@
+"""
+方案导出
+把完整方案（或只含变奏的方案）增量写成 JSON / JSONL / Markdown / 纯文本，可选 gzip 压缩；
+变奏可以是惰性迭代器，导出时逐条编码、分块产出，内存占用与变奏数量无关
+"""
+
+import json
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional
+
+from bulk import WRITE_BUFFER_SIZE
+
+
+EXPORT_FORMATS = ("json", "jsonl", "markdown", "text")
+
+# 文件扩展名 → 导出格式（.gz 后缀表示压缩，先去掉再判断）
+FORMAT_EXTENSIONS = {
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".txt": "text",
+}
+
+# 产出的文本块大小（字符数）：小片段先攒到这个大小再交给调用方
+CHUNK_CHARS = 64 * 1024
+
+# JSON 导出中逐项展开的容器层数：方案 → 变奏方案 → 各策略的变奏列表；
+# 更深的值（单条变奏等）整体交给 json.dumps 编码。惰性迭代器在任何层级都逐项展开。
+STREAM_DEPTH = 3
+
+JSON_INDENT = 2
+
+_dumps = json.JSONEncoder(ensure_ascii=False, indent=JSON_INDENT).encode
+
+
+def format_from_path(path: str, default: str = "json") -> str:
+    """按扩展名推断导出格式（忽略 .gz 后缀）"""
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for extension, fmt in FORMAT_EXTENSIONS.items():
+        if name.endswith(extension):
+            return fmt
+    return default
+
+
+def _iter_json(value: Any, depth: int = 0) -> Iterator[str]:
+    """与 json.dumps(value, ensure_ascii=False, indent=2) 输出相同的增量编码"""
+    if isinstance(value, Mapping) and depth < STREAM_DEPTH:
+        items = iter(value.items())
+        opening, closing = "{", "}"
+    elif isinstance(value, (list, tuple)) and depth < STREAM_DEPTH or isinstance(value, Iterator):
+        items = iter(value)
+        opening, closing = "[", "]"
+    else:
+        text = _dumps(value)
+        yield text.replace("\n", "\n" + " " * (JSON_INDENT * depth)) if depth else text
+        return
+
+    separator = "\n" + " " * (JSON_INDENT * (depth + 1))
+    first = True
+    for item in items:
+        if first:
+            yield opening + separator
+            first = False
+        else:
+            yield "," + separator
+        if opening == "{":
+            key, item = item
+            yield _dumps(str(key)) + ": "
+        yield from _iter_json(item, depth + 1)
+    if first:
+        yield opening + closing
+    else:
+        yield "\n" + " " * (JSON_INDENT * depth) + closing
+
+
+def _iter_variations(result: Mapping[str, Any]) -> Iterator[Dict[str, Any]]:
+    """逐条产出方案中的全部变奏（补全「策略」字段）"""
+    for strategy_name, variations in result.get("变奏方案", {}).items():
+        for var in variations:
+            if "策略" not in var:
+                var = {**var, "策略": strategy_name}
+            yield var
+
+
+def _iter_jsonl(result: Mapping[str, Any]) -> Iterator[str]:
+    """每条变奏一行 JSON 对象"""
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    for var in _iter_variations(result):
+        yield encode(var) + "\n"
+
+
+def _iter_text(result: Mapping[str, Any]) -> Iterator[str]:
+    yield "AI图像生成提示词方案\n========================\n"
+    if "原始想法" in result:
+        yield f"\n原始想法：{result['原始想法']}\n"
+    if "完整正向提示词" in result:
+        yield f"\n完整正向提示词：\n{result['完整正向提示词']}\n"
+    if "负向提示词" in result:
+        yield f"\n负向提示词：\n{result['负向提示词']}\n"
+    yield "\n变奏方案：\n"
+    for strategy_name, variations in result.get("变奏方案", {}).items():
+        yield f"\n{strategy_name}:\n"
+        for idx, var in enumerate(variations, 1):
+            yield f"  {idx}. {var['变奏']}\n"
+
+
+def _iter_markdown(result: Mapping[str, Any]) -> Iterator[str]:
+    yield "# AI图像生成提示词方案\n"
+    if "原始想法" in result:
+        yield f"\n## 原始想法\n{result['原始想法']}\n"
+    if "完整正向提示词" in result or "负向提示词" in result:
+        yield "\n## 完整提示词\n"
+        if "完整正向提示词" in result:
+            yield f"\n### 正向提示词\n```\n{result['完整正向提示词']}\n```\n"
+        if "负向提示词" in result:
+            yield f"\n### 负向提示词\n```\n{result['负向提示词']}\n```\n"
+    yield "\n## 变奏方案\n"
+    for strategy_name, variations in result.get("变奏方案", {}).items():
+        yield f"\n### {strategy_name}\n\n"
+        for idx, var in enumerate(variations, 1):
+            yield f"{idx}. `{var['变奏']}`\n\n"
+
+
+_WRITERS: Dict[str, Callable[[Mapping[str, Any]], Iterator[str]]] = {
+    "json": _iter_json,
+    "jsonl": _iter_jsonl,
+    "markdown": _iter_markdown,
+    "text": _iter_text,
+}
+
+
+def _chunked(pieces: Iterable[str], size: int = CHUNK_CHARS) -> Iterator[str]:
+    """把小片段合并成约 size 个字符的文本块"""
+    pending = []
+    length = 0
+    for piece in pieces:
+        pending.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield "".join(pending)
+            pending.clear()
+            length = 0
+    if pending:
+        yield "".join(pending)
+
+
+def iter_export(result: Mapping[str, Any], fmt: str = "json") -> Iterator[str]:
+    """按格式增量产出导出文本块
+
+    result 为 generate_complete_prompt_set 的结果，或至少包含「变奏方案」（策略 → 变奏序列）的映射；
+    变奏序列可以是惰性迭代器，只会被遍历一次。jsonl 格式只导出变奏，每条一行。
+    """
+    writer = _WRITERS.get(fmt)
+    if writer is None:
+        raise ValueError(f"未知的导出格式：{fmt}")
+    return _chunked(writer(result))
+
+
+def iter_export_bytes(result: Mapping[str, Any], fmt: str = "json",
+                      compress: bool = False) -> Iterator[bytes]:
+    """按格式增量产出 UTF-8 字节块，compress 为 True 时输出 gzip 流（用于下载）"""
+    chunks = (chunk.encode("utf-8") for chunk in iter_export(result, fmt))
+    if not compress:
+        yield from chunks
+        return
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_export(result: Mapping[str, Any], path: str, fmt: Optional[str] = None,
+                 compress: Optional[bool] = None):
+    """把方案导出到文件；fmt 与 compress 缺省时按扩展名推断（如 plan.md.gz）"""
+    if fmt is None:
+        fmt = format_from_path(path)
+    if compress is None:
+        compress = path.lower().endswith(".gz")
+    with open(path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        for data in iter_export_bytes(result, fmt, compress):
+            f.write(data)
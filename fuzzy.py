@@ -0,0 +1,246 @@
+"""
+模糊元素识别
+在全部金字塔元素上建立字符二元组（bigram）倒排索引，由命中的二元组定位候选元素与文本窗口，
+再在窗口内做有界编辑距离校验，识别错别字、大小写 / 空格差异等近似写法并给出置信度。
+全角 / 大小写 / 空格差异对任意长度的元素都先做一次精确比对（如「8k」识别为「8K」）
+"""
+
+import re
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from matcher import AhoCorasick
+from pyramid_index import PyramidIndex
+
+
+# 默认的最低置信度（1 - 编辑距离 / 元素长度）
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+# 分隔符之间的片段（NFKC 之后全角逗号等已转为半角）；近似匹配不跨越分隔符
+_SEGMENT = re.compile(r"[^,、;。!?|:]+")
+
+
+def max_distance(length: int) -> int:
+    """长度为 length 的元素允许的最大编辑距离
+
+    一两个字的元素只容许全角 / 大小写 / 空格差异：错一个字就是另一个词（「春」与「秋」）。
+    三字词错一个字时也可能是另一个词（「暖色调」与「冷色调」），由已识别元素的排除规则兜底。
+    """
+    if length <= 2:
+        return 0
+    if length <= 5:
+        return 1
+    if length <= 9:
+        return 2
+    return 3
+
+
+def fold(text: str) -> str:
+    """模糊比较用的规范形式：NFKC、大小写折叠、去掉空白"""
+    return "".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def _approximate_search(pattern: str, text: str, limit: int) -> Optional[Tuple[int, int, int]]:
+    """在 text 中找与 pattern 编辑距离最小的子串（Sellers 算法）
+
+    返回 (距离, 起点, 终点)，距离超过 limit 时返回 None；
+    距离相同时取长度最接近 pattern 的（「赛博朋客」优于「赛博朋」）。
+    """
+    m = len(pattern)
+    column = list(range(m + 1))
+    starts = [0] * (m + 1)
+    best = None
+    for j, ch in enumerate(text, 1):
+        diagonal, diagonal_start = column[0], starts[0]
+        column[0], starts[0] = 0, j
+        for i in range(1, m + 1):
+            above, above_start = column[i], starts[i]
+            if pattern[i - 1] == ch:
+                value, start = diagonal, diagonal_start
+            else:
+                value, start = diagonal + 1, diagonal_start
+            if above + 1 < value:
+                value, start = above + 1, above_start
+            if column[i - 1] + 1 < value:
+                value, start = column[i - 1] + 1, starts[i - 1]
+            diagonal, diagonal_start = above, above_start
+            column[i], starts[i] = value, start
+        if column[m] <= limit:
+            candidate = (column[m], abs(j - starts[m] - m), starts[m], j)
+            if best is None or candidate < best:
+                best = candidate
+    return (best[0], best[2], best[3]) if best is not None else None
+
+
+class FuzzyMatch:
+    """一条模糊识别结果"""
+
+    __slots__ = ("element", "elem_ids", "fragment", "distance", "confidence")
+
+    def __init__(self, element: str, elem_ids: Tuple[int, ...], fragment: str,
+                 distance: int, confidence: float):
+        self.element = element
+        self.elem_ids = elem_ids
+        self.fragment = fragment
+        self.distance = distance
+        self.confidence = confidence
+
+    def __repr__(self) -> str:
+        return f"FuzzyMatch({self.element!r}, {self.fragment!r}, confidence={self.confidence:.2f})"
+
+
+class FuzzyMatcher:
+    """基于二元组倒排索引的模糊元素匹配器
+
+    先在规范形式上用 Aho-Corasick 找出全部精确出现的元素（任意长度，距离为 0）；
+    允许编辑的元素（三个字及以上）再做近似识别：候选只来自与文本共享二元组的元素，且需满足 q-gram 引理给出的最少共享数
+    （长度 m、允许 k 处编辑的匹配至少保留 m - 1 - 2k 个二元组）；编辑距离只在命中位置附近的
+    短窗口内计算，代价与文本长度和命中数成正比，而不是与元素数成正比。
+    """
+
+    def __init__(self, index: PyramidIndex, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+                 vocabulary: Iterable[str] = ()):
+        self.index = index
+        self.min_confidence = min_confidence
+        # 金字塔之外的已知词（质量词、负面词等）：与已识别元素一样视为已解释的文本，
+        # 避免把「高分辨率」当成「低分辨率」的近似写法
+        self.vocabulary: FrozenSet[str] = frozenset(fold(word) for word in vocabulary)
+
+        element_ids: Dict[str, List[int]] = {}
+        for elem_id, element in enumerate(index.elements):
+            if fold(element):
+                element_ids.setdefault(element, []).append(elem_id)
+
+        self.patterns: Tuple[str, ...] = tuple(element_ids)
+        self._folded_elements: Dict[str, str] = {element: fold(element) for element in index.elements}
+        self.folded: Tuple[str, ...] = tuple(self._folded_elements[p] for p in self.patterns)
+        self.pattern_elements: Tuple[Tuple[int, ...], ...] = tuple(tuple(ids) for ids in element_ids.values())
+        self._limits = tuple(max_distance(len(p)) for p in self.folded)
+        self._required = tuple(max(1, len(p) - 1 - 2 * k) for p, k in zip(self.folded, self._limits))
+        self._exact = AhoCorasick(self.folded)
+
+        # 只容许精确比对的元素不进入二元组索引
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for pattern_id, pattern in enumerate(self.folded):
+            if not self._limits[pattern_id]:
+                continue
+            for offset in range(len(pattern) - 1):
+                postings.setdefault(pattern[offset:offset + 2], []).append((pattern_id, offset))
+        self._postings: Dict[str, Tuple[Tuple[int, int], ...]] = {
+            bigram: tuple(entries) for bigram, entries in postings.items()
+        }
+
+    def match(self, text: str, exclude: Iterable[str] = (),
+              min_confidence: Optional[float] = None) -> List[FuzzyMatch]:
+        """识别 text 中的近似元素，按置信度降序返回
+
+        min_confidence 缺省时使用构建时的 self.min_confidence；共享同一个匹配器的调用方按次传入各自的阈值。
+
+        exclude 为已被精确识别的元素文本：这些元素不再参与模糊识别，恰好等于其中某个元素
+        （或已知词）的分隔片段直接跳过，落在已识别元素内部的近似片段（如「互补色调」中的「补色调」）也不采纳。
+        近似片段不会跨越分隔符。
+        """
+        normalized = unicodedata.normalize("NFKC", text).casefold()
+        # 规范化不改变长度时（绝大多数情况）片段可以映射回原文
+        source = text if len(normalized) == len(text) else normalized
+        folded_text = "".join(normalized.split())
+
+        folded_elements = self._folded_elements
+        excluded: Set[str] = {folded_elements.get(element) or fold(element) for element in exclude}
+        excluded |= self.vocabulary
+        best: Dict[int, Tuple[int, int, int, int]] = {}
+        for segment in _SEGMENT.finditer(folded_text):
+            fragment = segment.group()
+            # 整段恰好是已识别元素的片段已被完全解释，无需再看
+            if fragment not in excluded:
+                self._match_segment(fragment, segment.start(), excluded, best)
+
+        if min_confidence is None:
+            min_confidence = self.min_confidence
+        results = []
+        positions = None
+        if best and len(folded_text) != len(normalized):
+            # 去掉空白后的位置 → 规范化文本中的位置
+            positions = [i for i, ch in enumerate(normalized) if not ch.isspace()]
+        for pattern_id, (distance, _, start, end) in best.items():
+            m = len(self.folded[pattern_id])
+            confidence = 1 - distance / m
+            if confidence < min_confidence:
+                continue
+            if positions is not None:
+                start, end = positions[start], positions[end - 1] + 1
+            fragment = source[start:end]
+            results.append(FuzzyMatch(self.patterns[pattern_id], self.pattern_elements[pattern_id],
+                                      fragment, distance, confidence))
+        results.sort(key=lambda match: (-match.confidence, match.elem_ids[0]))
+        return results
+
+    def _match_segment(self, segment: str, offset: int, excluded: Set[str],
+                       best: Dict[int, Tuple[int, int, int, int]]):
+        """在一个未被解释的片段内识别近似元素，把每个元素的最优匹配记入 best
+
+        best 的值为 (编辑距离, 片段长度与元素长度之差, 起点, 终点)，越小越好。
+        """
+        folded_patterns = self.folded
+        exact = set()
+        for pattern_id in self._exact.find_ids(segment):
+            pattern = folded_patterns[pattern_id]
+            if pattern in excluded:
+                continue
+            exact.add(pattern_id)
+            if pattern_id not in best or best[pattern_id][0]:
+                start = offset + segment.find(pattern)
+                best[pattern_id] = (0, 0, start, start + len(pattern))
+
+        # 每个候选元素在片段中「对齐后的起点」：命中位置减去二元组在元素中的偏移
+        anchors: Dict[int, List[int]] = {}
+        postings = self._postings
+        for p in range(len(segment) - 1):
+            entries = postings.get(segment[p:p + 2])
+            if entries:
+                for pattern_id, bigram_offset in entries:
+                    anchors.setdefault(pattern_id, []).append(p - bigram_offset)
+
+        required = self._required
+        for pattern_id, starts in anchors.items():
+            need = required[pattern_id]
+            if len(starts) < need:
+                continue
+            pattern = folded_patterns[pattern_id]
+            if pattern in excluded or pattern_id in exact:
+                continue
+            limit = self._limits[pattern_id]
+            m = len(pattern)
+            for lo, hi, hits in self._clusters(starts, limit):
+                if hits < need:
+                    continue
+                window_start = max(0, lo - limit)
+                found = _approximate_search(pattern, segment[window_start:hi + m + limit], limit)
+                if found is None:
+                    continue
+                distance, start, end = found
+                start += window_start
+                end += window_start
+                if distance and any(segment[start:end] in element for element in excluded):
+                    continue
+                candidate = (distance, abs(end - start - m), offset + start, offset + end)
+                if pattern_id not in best or candidate < best[pattern_id]:
+                    best[pattern_id] = candidate
+
+    @staticmethod
+    def _clusters(starts: List[int], limit: int) -> List[Tuple[int, int, int]]:
+        """把对齐起点聚成簇：相距不超过 2 × limit 的起点属于同一次出现，返回 (最小起点, 最大起点, 命中数)"""
+        starts.sort()
+        clusters = []
+        lo = hi = starts[0]
+        hits = 1
+        for start in starts[1:]:
+            if start - hi <= 2 * limit:
+                hi = start
+                hits += 1
+            else:
+                clusters.append((lo, hi, hits))
+                lo = hi = start
+                hits = 1
+        clusters.append((lo, hi, hits))
+        return clusters
@@ -0,0 +1,169 @@
+"""
+生成器性能统计
+按需为 PromptGenerator 实例挂载计时包装，统计每个公开方法与变奏策略的调用次数、
+累计耗时和延迟分位数；未启用时实例上没有任何包装，开销为零
+"""
+
+import json
+import random
+import threading
+import time
+from functools import wraps
+from typing import Any, Dict, List
+
+
+# 计时的公开方法
+PUBLIC_METHODS = (
+    "random_element_from_dimension",
+    "generate_random_prompt",
+    "generate_variations",
+    "generate_variations_batch",
+    "regenerate_variation",
+    "analyze_prompt",
+    "get_quality_prompt",
+    "get_negative_prompt",
+    "get_quality_prompts",
+    "get_negative_prompts",
+    "generate_complete_prompt_set",
+    "encode",
+)
+
+# 变奏策略的实现方法 → 统计中显示的名称
+STRATEGY_METHODS = {
+    "_generate_single_dimension_variations": "策略.单维度变奏",
+    "_generate_cross_dimension_variations": "策略.跨维度组合",
+    "_generate_contrast_variations": "策略.对比变奏",
+    "_generate_progressive_variations": "策略.渐进变奏",
+    "_generate_extreme_variations": "策略.极端变奏",
+    "_generate_mixed_variations": "策略.混合实验",
+}
+
+# 每个方法保留的延迟样本数（蓄水池抽样），分位数基于这些样本估计
+RESERVOIR_SIZE = 2048
+
+
+class MethodStats:
+    """单个方法的统计"""
+
+    __slots__ = ("calls", "total_ns", "max_ns", "samples")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.samples: List[int] = []
+
+    def snapshot(self) -> Dict[str, float]:
+        samples = sorted(self.samples)
+
+        def quantile(q: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(q * len(samples)))] / 1000
+
+        return {
+            "调用次数": self.calls,
+            "累计耗时_ms": self.total_ns / 1e6,
+            "平均_us": self.total_ns / self.calls / 1000 if self.calls else 0.0,
+            "p50_us": quantile(0.50),
+            "p90_us": quantile(0.90),
+            "p99_us": quantile(0.99),
+            "最大_us": self.max_ns / 1000,
+        }
+
+
+class Profiler:
+    """方法级计时统计
+
+    ``attach`` 把计时包装写到实例属性上，类本身不受影响；
+    生成器内部经由 ``self.xxx`` 的调用（如 generate_variations → 各策略）同样会被统计，
+    因此嵌套方法的耗时会同时计入外层与内层。
+    """
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self.stats: Dict[str, MethodStats] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def record(self, name: str, elapsed_ns: int):
+        """记录一次调用"""
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = MethodStats()
+            stats.calls += 1
+            stats.total_ns += elapsed_ns
+            if elapsed_ns > stats.max_ns:
+                stats.max_ns = elapsed_ns
+            if len(stats.samples) < self.reservoir_size:
+                stats.samples.append(elapsed_ns)
+            else:
+                slot = self._rng.randrange(stats.calls)
+                if slot < self.reservoir_size:
+                    stats.samples[slot] = elapsed_ns
+
+    def _wrap(self, name: str, method):
+        record = self.record
+        timer = time.perf_counter_ns
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = timer()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(name, timer() - start)
+
+        timed.__profiled__ = True
+        return timed
+
+    def attach(self, generator):
+        """为生成器实例挂载计时包装（重复调用不会重复包装）"""
+        targets = {name: name for name in PUBLIC_METHODS}
+        targets.update(STRATEGY_METHODS)
+        for attr, label in targets.items():
+            method = getattr(generator, attr, None)
+            if method is None or getattr(method, "__profiled__", False):
+                continue
+            setattr(generator, attr, self._wrap(label, method))
+
+    @staticmethod
+    def detach(generator):
+        """移除实例上的计时包装，恢复类方法"""
+        for attr in list(PUBLIC_METHODS) + list(STRATEGY_METHODS):
+            if getattr(generator.__dict__.get(attr), "__profiled__", False):
+                del generator.__dict__[attr]
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self.stats.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前统计的 JSON 友好快照，按累计耗时降序"""
+        with self._lock:
+            methods = {name: stats.snapshot() for name, stats in self.stats.items()}
+        ordered = dict(sorted(methods.items(), key=lambda item: -item[1]["累计耗时_ms"]))
+        return {
+            "开始时间": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "快照时间": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "方法": ordered,
+        }
+
+    def save(self, path: str):
+        """把快照写入 JSON 文件"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def format_table(self) -> str:
+        """格式化为文本表格"""
+        methods = self.snapshot()["方法"]
+        lines = [f"{'方法':<40}{'调用':>10}{'累计ms':>12}{'平均µs':>10}{'p50µs':>10}{'p99µs':>10}"]
+        for name, s in methods.items():
+            lines.append(f"{name:<40}{s['调用次数']:>10}{s['累计耗时_ms']:>12.1f}"
+                         f"{s['平均_us']:>10.1f}{s['p50_us']:>10.1f}{s['p99_us']:>10.1f}")
+        return "\n".join(lines)
+
@@ -0,0 +1,84 @@
+"""
+质量词 / 负面词关键词池
+把 QUALITY_KEYWORDS 与 NEGATIVE_PROMPTS 一次性预处理为扁平的元组池，
+支持可选权重、批量抽取与确定性的穷举枚举
+"""
+
+import random
+from heapq import nlargest
+from itertools import combinations, permutations
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class KeywordPool:
+    """关键词池
+
+    无权重时 ``sample`` 与对原列表调用 ``rng.sample`` 消耗完全相同的随机序列；
+    有权重时按 Efraimidis–Spirakis 加权无放回抽样，权重越大越可能入选且越靠前。
+    """
+
+    def __init__(self, words: Sequence[str], weights: Optional[Sequence[float]] = None):
+        self.words: Tuple[str, ...] = tuple(words)
+        if weights is not None:
+            if len(weights) != len(self.words):
+                raise ValueError("权重数量必须与关键词数量一致")
+            if any(w < 0 for w in weights):
+                raise ValueError("权重不能为负数")
+            self.weights: Optional[Tuple[float, ...]] = tuple(float(w) for w in weights)
+            self._inverse_weights = tuple(1.0 / w if w > 0 else 0.0 for w in self.weights)
+        else:
+            self.weights = None
+            self._inverse_weights = ()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def with_weights(self, weights: Dict[str, float], default: float = 1.0) -> "KeywordPool":
+        """按关键词 → 权重映射返回新的带权关键词池，未列出的关键词使用 default"""
+        return KeywordPool(self.words, [weights.get(word, default) for word in self.words])
+
+    def sample(self, k: int, rng: random.Random) -> List[str]:
+        """无放回抽取 min(k, 池大小) 个关键词"""
+        k = min(k, len(self.words))
+        if self.weights is None:
+            return rng.sample(self.words, k)
+
+        rand = rng.random
+        keyed = [(rand() ** inv, i) for i, inv in enumerate(self._inverse_weights) if inv > 0]
+        words = self.words
+        return [words[i] for _, i in nlargest(k, keyed)]
+
+    def sample_batch(self, count: int, k: int, rng: random.Random,
+                     separator: str = "，") -> List[str]:
+        """一次调用抽取 count 组关键词，每组以 separator 连接为一条提示词"""
+        k = min(k, len(self.words))
+        join = separator.join
+        if self.weights is None:
+            sample = rng.sample
+            words = self.words
+            return [join(sample(words, k)) for _ in range(count)]
+
+        sample = self.sample
+        return [join(sample(k, rng)) for _ in range(count)]
+
+    def enumerate_combinations(self, k: int, ordered: bool = False) -> Iterator[Tuple[str, ...]]:
+        """按池中顺序穷举全部 k 个关键词的组合（ordered 为真时穷举排列），结果确定"""
+        k = min(k, len(self.words))
+        if ordered:
+            return permutations(self.words, k)
+        return combinations(self.words, k)
+
+
+def build_quality_pools(quality_keywords: Dict[str, List[str]]) -> Dict[str, KeywordPool]:
+    """质量词池：通用 / 艺术 / 技术"""
+    return {name[:-len("质量词")]: KeywordPool(words) for name, words in quality_keywords.items()}
+
+
+def build_negative_pools(negative_prompts: Dict[str, List[str]]) -> Dict[str, KeywordPool]:
+    """负面词池：通用 / 技术 / 内容，外加预先拼接好的「全部」"""
+    pools = {name[:-len("负面词")]: KeywordPool(words) for name, words in negative_prompts.items()}
+    all_words = []
+    for words in negative_prompts.values():
+        all_words.extend(words)
+    pools["全部"] = KeywordPool(all_words)
+    return pools
@@ -0,0 +1,111 @@
+"""
+多模式字符串匹配
+基于 Aho-Corasick 自动机，一次扫描即可找出提示词中出现的全部金字塔元素
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+from pyramid_index import PyramidIndex
+
+
+class AhoCorasick:
+    """Aho-Corasick 自动机
+
+    构建代价与模式总长度成正比，匹配代价与文本长度成正比（外加命中数），
+    与模式数量无关。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+
+        goto: List[Dict[str, int]] = [{}]
+        terminal: List[List[int]] = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    terminal.append([])
+                node = nxt
+            terminal[node].append(pattern_id)
+
+        fail = [0] * len(goto)
+        outputs: List[Tuple[int, ...]] = [()] * len(goto)
+
+        # 按 BFS 顺序计算失败指针，父节点的输出总是先于子节点确定
+        queue = deque()
+        for nxt in goto[0].values():
+            queue.append(nxt)
+            outputs[nxt] = tuple(terminal[nxt])
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[nxt] = f
+                outputs[nxt] = tuple(terminal[nxt]) + outputs[f]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def find_ids(self, text: str) -> Set[int]:
+        """返回文本中出现过的模式编号集合"""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+
+        hit_nodes = set()
+        node = 0
+        for ch in text:
+            trans = goto[node]
+            while node and ch not in trans:
+                node = fail[node]
+                trans = goto[node]
+            node = trans.get(ch, 0)
+            if outputs[node]:
+                hit_nodes.add(node)
+
+        found = set()
+        for node in hit_nodes:
+            found.update(outputs[node])
+        return found
+
+
+class ElementMatcher:
+    """金字塔元素匹配器
+
+    同一个元素字符串可能出现在多个维度 / 类别中（如「文艺复兴」），
+    自动机按去重后的字符串构建，命中后再展开为全部元素编号。
+    """
+
+    def __init__(self, index: PyramidIndex):
+        self.index = index
+
+        element_ids: Dict[str, List[int]] = {}
+        for elem_id, element in enumerate(index.elements):
+            element_ids.setdefault(element, []).append(elem_id)
+
+        self._automaton = AhoCorasick(element_ids.keys())
+        self._pattern_elements: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(ids) for ids in element_ids.values()
+        )
+
+    def match(self, text: str) -> List[int]:
+        """返回文本中出现的元素编号，按金字塔顺序排列"""
+        pattern_elements = self._pattern_elements
+        elem_ids = []
+        for pattern_id in self._automaton.find_ids(text):
+            elem_ids.extend(pattern_elements[pattern_id])
+        elem_ids.sort()
+        return elem_ids
@@ -0,0 +1,210 @@
+"""
+多进程并行批量生成
+把总任务切成固定大小的分片，每个分片用由主种子派生的确定性种子重置生成器，
+因此同一主种子在任意进程数下都能得到完全相同的输出
+"""
+
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Mapping, Optional, TextIO, Tuple
+
+from prompt_generator import PromptGenerator
+from bulk import check_stratified_strategy, check_unique_strategy, iter_random_prompts, iter_variations
+
+
+# 每个分片的生成条数；分片划分与进程数无关，这是结果可复现的前提
+SHARD_SIZE = 10000
+
+# 每个进程最多同时排队的分片数，限制主进程中积压的结果
+MAX_PENDING_PER_WORKER = 2
+
+GENERATION_KINDS = ("random", "variations", "complete")
+
+_worker_generator: Optional[PromptGenerator] = None
+
+# 进程内复用的基础生成器；单进程执行时每次任务由它派生并配置工作生成器
+_base_generator: Optional[PromptGenerator] = None
+
+
+def derive_seed(master_seed: int, shard: int) -> int:
+    """由主种子和分片编号派生 64 位分片种子"""
+    digest = hashlib.blake2b(f"{master_seed}:{shard}".encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def new_master_seed() -> int:
+    """生成一个随机主种子"""
+    return int.from_bytes(os.urandom(8), "big")
+
+
+def plan_shards(kind: str, total: int, params: Dict[str, Any],
+                shard_size: int = SHARD_SIZE) -> List[Tuple[int, int, int]]:
+    """把总数切分为 (分片编号, 起始位置, 分片条数) 列表"""
+    if kind == "variations" and params.get("strategy") == "渐进变奏":
+        # 渐进变奏同一批共享一个序列，不能拆分
+        return [(0, 0, total)] if total > 0 else []
+    return [(shard, start, min(shard_size, total - start))
+            for shard, start in enumerate(range(0, total, shard_size))]
+
+
+def configure_generator(generator: PromptGenerator,
+                        fuzzy: bool = False,
+                        cooccurrence: Optional[str] = None,
+                        weights: Optional[Mapping[str, Mapping[str, float]]] = None,
+                        constraints: Optional[Mapping[str, Any]] = None) -> PromptGenerator:
+    """按生成器选项启用模糊识别、共现矩阵（文件路径）、元素权重与兼容性约束（配置）
+
+    并行分片与完整方案流水线的工作进程都经由这里配置，与主进程中的生成器设置一致。
+    """
+    if fuzzy:
+        generator.enable_fuzzy_matching()
+    if cooccurrence:
+        generator.load_cooccurrence(cooccurrence)
+    if weights:
+        generator.set_element_weights(weights)
+    if constraints is not None:
+        generator.enable_constraints(constraints)
+    return generator
+
+
+def _init_worker(options: Mapping[str, Any]):
+    """创建（进程内唯一的）工作生成器并按选项配置；单进程执行时由进程内的基础生成器派生"""
+    global _worker_generator, _base_generator
+    if _base_generator is None:
+        _base_generator = PromptGenerator()
+    _worker_generator = configure_generator(_base_generator.spawn(), **options)
+
+
+def _generate_shard(kind: str, start: int, count: int, seed: int,
+                    params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """在当前进程中按分片种子生成一个分片
+
+    无放回采样时所有分片共用主种子决定的同一个置换，各自取 [start, start + count) 一段，
+    因此跨分片也不会重复。
+    """
+    generator = _worker_generator
+    generator.reseed(seed)
+
+    if params.get("sampling") == "unique":
+        if kind == "random":
+            return list(generator.generate_unique_prompts(
+                count,
+                include_quality=params.get("include_quality", True),
+                dimensions_count=params.get("dimensions_count", 4),
+                seed=params["unique_seed"],
+                start=start
+            ))
+        return list(generator.generate_unique_cross_variations(
+            params["base_prompt"], count, seed=params["unique_seed"], start=start
+        ))
+
+    # 分层采样时每个分片是一条独立的分层序列（由分片种子决定），分片内即可覆盖全部元素
+    sampling = params.get("sampling", "random")
+    if kind == "random":
+        return list(iter_random_prompts(
+            generator, count,
+            include_quality=params.get("include_quality", True),
+            dimensions_count=params.get("dimensions_count", 4),
+            sampling=sampling
+        ))
+    if kind == "variations":
+        return list(iter_variations(
+            generator, params["base_prompt"], params.get("strategy", "单维度变奏"), count, sampling
+        ))
+    return [generator.generate_complete_prompt_set(params["base_idea"]) for _ in range(count)]
+
+
+def _run_shard(task: Tuple[str, int, int, int, Dict[str, Any], bool]):
+    """进程池任务：生成一个分片，encode 为真时直接返回 (行数, 编码好的 JSONL 文本)"""
+    kind, start, count, seed, params, encode = task
+    rows = _generate_shard(kind, start, count, seed, params)
+    if not encode:
+        return rows
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    return len(rows), "".join(dumps(row) + "\n" for row in rows)
+
+
+def _iter_shard_results(kind: str, total: int, workers: int, seed: int,
+                        params: Dict[str, Any], encode: bool,
+                        options: Optional[Mapping[str, Any]] = None) -> Iterator[Any]:
+    """按分片顺序产出各分片结果；进程池中排队的分片数有上限，内存占用恒定"""
+    if kind not in GENERATION_KINDS:
+        raise ValueError(f"未知的生成类型：{kind}")
+    if params.get("sampling") == "unique":
+        if kind == "complete":
+            raise ValueError("完整方案不支持无放回采样")
+        if kind == "variations":
+            check_unique_strategy(params.get("strategy", "单维度变奏"))
+        params = dict(params, unique_seed=seed)
+    elif params.get("sampling") == "stratified":
+        if kind == "complete":
+            raise ValueError("完整方案不支持分层采样")
+        if kind == "variations":
+            check_stratified_strategy(params.get("strategy", "单维度变奏"))
+
+    tasks = ((kind, start, count, derive_seed(seed, shard), params, encode)
+             for shard, start, count in plan_shards(kind, total, params))
+
+    options = dict(options or {})
+    if workers <= 1:
+        _init_worker(options)
+        for task in tasks:
+            yield _run_shard(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_run_shard, task))
+            if len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def generate_parallel(kind: str,
+                      total: int,
+                      workers: int = 1,
+                      seed: Optional[int] = None,
+                      generator_options: Optional[Mapping[str, Any]] = None,
+                      **params) -> Iterator[Dict[str, Any]]:
+    """并行生成，按确定顺序逐条产出结果
+
+    kind 为 random / variations / complete；params 为对应方法的参数：
+    random 接受 include_quality、dimensions_count，
+    variations 需要 base_prompt 并接受 strategy，complete 需要 base_idea。
+    random 与 variations（跨维度组合）可传 sampling="unique" 做全局无放回采样；
+    random 与 variations（单维度变奏、跨维度组合、混合实验）可传 sampling="stratified" 做分层覆盖采样。
+    generator_options 为 configure_generator 的参数（fuzzy、cooccurrence、weights、constraints），
+    每个工作进程的生成器都按它配置。
+    """
+    if seed is None:
+        seed = new_master_seed()
+    for rows in _iter_shard_results(kind, total, workers, seed, params, encode=False,
+                                    options=generator_options):
+        yield from rows
+
+
+def write_parallel_jsonl(out: TextIO,
+                         kind: str,
+                         total: int,
+                         workers: int = 1,
+                         seed: Optional[int] = None,
+                         generator_options: Optional[Mapping[str, Any]] = None,
+                         **params) -> int:
+    """并行生成并写出 JSONL，返回写出的行数
+
+    编码在工作进程中完成，主进程只负责按分片顺序写出。
+    """
+    if seed is None:
+        seed = new_master_seed()
+    written = 0
+    for count, chunk in _iter_shard_results(kind, total, workers, seed, params, encode=True,
+                                            options=generator_options):
+        out.write(chunk)
+        written += count
+    out.flush()
+    return written
@@ -0,0 +1,251 @@
+"""
+批量完整方案流水线
+逐行读取想法文件，按块交给进程池生成完整方案（分析 → 增强 → 质量词 / 负面词 → 六种变奏策略），
+按行序追加写出 JSONL；检查点记录输入与输出的字节偏移，中断后可从断点精确续跑
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from prompt_generator import PromptGenerator
+from parallel import MAX_PENDING_PER_WORKER, configure_generator, derive_seed, new_master_seed
+
+
+# 每个任务块包含的想法数
+CHUNK_LINES = 64
+
+# 两次保存检查点之间的最短间隔（秒）；续跑时输出会截断回检查点位置，间隔只影响需要重做的量
+CHECKPOINT_INTERVAL = 1.0
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+_worker_generator: Optional[PromptGenerator] = None
+
+
+def default_checkpoint_path(output_path: str) -> str:
+    return output_path + CHECKPOINT_SUFFIX
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def option_record(options: Mapping[str, Any]) -> Dict[str, Any]:
+    """生成器选项在检查点中的记录（JSON 形式）
+
+    共现矩阵记录绝对路径与文件内容摘要：同一路径的矩阵被增量更新后，建议也会不同。
+    """
+    record = dict(options)
+    if record.get("cooccurrence"):
+        path = record["cooccurrence"]
+        record["cooccurrence"] = {"路径": os.path.abspath(path), "摘要": _file_digest(path)}
+    return json.loads(json.dumps(record, ensure_ascii=False))
+
+
+def _init_worker(options: Dict[str, Any]):
+    """创建（进程内唯一的）生成器并按选项配置，见 parallel.configure_generator"""
+    global _worker_generator
+    _worker_generator = configure_generator(PromptGenerator(), **options)
+
+
+def _run_chunk(task: Tuple[int, List[Tuple[int, str]]]) -> Tuple[int, bytes]:
+    """生成一块想法的完整方案，返回 (行数, 编码好的 JSONL 字节)
+
+    每个方案的种子由主种子和行号派生，与进程数、分块方式以及是否续跑无关。
+    """
+    master_seed, ideas = task
+    generate = _worker_generator.generate_complete_prompt_set
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    lines = []
+    for line_no, idea in ideas:
+        result = generate(idea, seed=derive_seed(master_seed, line_no))
+        lines.append(dumps({"行号": line_no, **result}) + "\n")
+    return len(lines), "".join(lines).encode("utf-8")
+
+
+def _iter_chunks(f, line_no: int, chunk_lines: int) -> Iterator[Tuple[List[Tuple[int, str]], int, int]]:
+    """从 f 的当前位置逐块读取想法，产出 (想法列表, 块后的下一行号, 块后的输入字节偏移)
+
+    行号从 1 开始计数，空行跳过但占用行号。
+    """
+    ideas = []
+    while True:
+        raw = f.readline()
+        if not raw:
+            break
+        line_no += 1
+        idea = raw.decode("utf-8-sig" if line_no == 1 else "utf-8").strip()
+        if idea:
+            ideas.append((line_no, idea))
+        if len(ideas) >= chunk_lines:
+            yield ideas, line_no, f.tell()
+            ideas = []
+    if ideas:
+        yield ideas, line_no, f.tell()
+
+
+class Checkpoint:
+    """续跑所需的状态：主种子、生成器选项、已处理到的行号，以及输入 / 输出文件中对应的字节偏移"""
+
+    def __init__(self, path: str, input_path: str, seed: int, options: Optional[Dict[str, Any]] = None,
+                 line_no: int = 0, input_offset: int = 0, output_offset: int = 0, rows: int = 0):
+        self.path = path
+        self.input_path = input_path
+        self.seed = seed
+        self.options = options
+        self.line_no = line_no
+        self.input_offset = input_offset
+        self.output_offset = output_offset
+        self.rows = rows
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(path, data["输入"], data["主种子"], data.get("生成选项"), data["行号"],
+                   data["输入偏移"], data["输出偏移"], data["已写出"])
+
+    def save(self):
+        """先写临时文件再原子替换，中断时检查点要么是旧的要么是新的"""
+        data = {
+            "输入": self.input_path,
+            "主种子": self.seed,
+            "生成选项": self.options,
+            "行号": self.line_no,
+            "输入偏移": self.input_offset,
+            "输出偏移": self.output_offset,
+            "已写出": self.rows,
+        }
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+
+
+def _open_run(input_path: str, output_path: str, checkpoint_path: str,
+              seed: Optional[int], options: Mapping[str, Any]) -> Tuple[Checkpoint, bool]:
+    """读取已有检查点（续跑）或新建检查点，返回 (检查点, 是否续跑)
+
+    续跑时主种子与生成器选项都必须与检查点一致，否则续写的行会在另一套设置下生成。
+    """
+    record = option_record(options)
+    if not os.path.exists(checkpoint_path):
+        return Checkpoint(checkpoint_path, os.path.abspath(input_path),
+                          seed if seed is not None else new_master_seed(), record), False
+
+    checkpoint = Checkpoint.load(checkpoint_path)
+    if checkpoint.input_path != os.path.abspath(input_path):
+        raise ValueError(f"检查点属于另一个输入文件：{checkpoint.input_path}")
+    if seed is not None and seed != checkpoint.seed:
+        raise ValueError(f"检查点的主种子为 {checkpoint.seed}，与 --seed {seed} 不一致")
+    if checkpoint.options is None:
+        raise ValueError("检查点没有记录生成器选项，无法确认与本次设置一致")
+    changed = [name for name in sorted(set(record) | set(checkpoint.options))
+               if record.get(name) != checkpoint.options.get(name)]
+    if changed:
+        raise ValueError(f"生成器选项与检查点不一致：{'、'.join('--' + name for name in changed)}")
+    if os.path.getsize(input_path) < checkpoint.input_offset:
+        raise ValueError("输入文件比检查点记录的位置短，可能已被修改")
+    if not os.path.exists(output_path) or os.path.getsize(output_path) < checkpoint.output_offset:
+        raise ValueError(f"输出文件缺失或不完整，无法从检查点续跑：{output_path}")
+    return checkpoint, True
+
+
+def run_complete_file(input_path: str,
+                      output_path: str,
+                      checkpoint_path: Optional[str] = None,
+                      workers: int = 1,
+                      seed: Optional[int] = None,
+                      fuzzy: bool = False,
+                      cooccurrence: Optional[str] = None,
+                      weights: Optional[Mapping[str, Mapping[str, float]]] = None,
+                      constraints: Optional[Mapping[str, Any]] = None,
+                      chunk_lines: int = CHUNK_LINES,
+                      progress: Optional[Callable[[Checkpoint], None]] = None) -> Dict[str, Any]:
+    """为想法文件中的每一行生成完整方案，追加写出 JSONL（每行带「行号」）
+
+    checkpoint_path 缺省为 输出文件 + ".checkpoint"。检查点存在时从其记录的位置续跑：
+    输出文件先截断到检查点记录的偏移（丢弃上次中断时写了一半或未记入检查点的行），
+    输入文件直接定位到对应的字节偏移，因此结果既不重复也不缺失，且与一次跑完完全相同。
+    全部完成后删除检查点。progress 在每次保存检查点后被调用。
+    fuzzy、cooccurrence、weights、constraints 用于配置工作进程的生成器，见 parallel.configure_generator；
+    它们与主种子一起记入检查点，续跑时与检查点不一致则拒绝（ValueError）。
+    """
+    options = {"fuzzy": fuzzy, "cooccurrence": cooccurrence, "weights": weights, "constraints": constraints}
+    if checkpoint_path is None:
+        checkpoint_path = default_checkpoint_path(output_path)
+    checkpoint, resumed = _open_run(input_path, output_path, checkpoint_path, seed, options)
+
+    with open(input_path, "rb") as source, open(output_path, "r+b" if resumed else "wb") as out:
+        source.seek(checkpoint.input_offset)
+        out.truncate(checkpoint.output_offset)
+        out.seek(checkpoint.output_offset)
+        if not resumed:
+            checkpoint.save()
+
+        chunks = _iter_chunks(source, checkpoint.line_no, chunk_lines)
+        last_saved = time.monotonic()
+
+        def commit(rows: int, data: bytes, line_no: int, input_offset: int):
+            nonlocal last_saved
+            out.write(data)
+            checkpoint.rows += rows
+            checkpoint.line_no = line_no
+            checkpoint.input_offset = input_offset
+            now = time.monotonic()
+            if now - last_saved >= CHECKPOINT_INTERVAL:
+                save()
+                last_saved = now
+
+        def save():
+            # 输出先落盘，检查点记录的偏移之前的内容才是完整的
+            out.flush()
+            os.fsync(out.fileno())
+            checkpoint.output_offset = out.tell()
+            checkpoint.save()
+            if progress is not None:
+                progress(checkpoint)
+
+        if workers <= 1:
+            _init_worker(options)
+            for ideas, line_no, input_offset in chunks:
+                commit(*_run_chunk((checkpoint.seed, ideas)), line_no, input_offset)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(options,)) as executor:
+                pending = deque()
+                for ideas, line_no, input_offset in chunks:
+                    pending.append((executor.submit(_run_chunk, (checkpoint.seed, ideas)),
+                                    line_no, input_offset))
+                    if len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                        future, done_line, done_offset = pending.popleft()
+                        commit(*future.result(), done_line, done_offset)
+                while pending:
+                    future, done_line, done_offset = pending.popleft()
+                    commit(*future.result(), done_line, done_offset)
+        save()
+
+    os.remove(checkpoint_path)
+    return {
+        "主种子": checkpoint.seed,
+        "行号": checkpoint.line_no,
+        "已写出": checkpoint.rows,
+        "续跑": resumed,
+    }
+
+
+def print_progress(checkpoint: Checkpoint):
+    """命令行进度：写到标准错误"""
+    print(f"\r已处理 {checkpoint.line_no} 行，写出 {checkpoint.rows} 个方案", end="", file=sys.stderr, flush=True)
@@ -3,24 +3,212 @@ AI图像生成提示词变奏生成器
 基于金字塔结构和MECE法则生成提示词变奏
 """
 
+import copy
 import random
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 from prompt_pyramid import (
     PROMPT_PYRAMID, 
     VARIATION_STRATEGIES, 
     QUALITY_KEYWORDS,
-    NEGATIVE_PROMPTS
+    NEGATIVE_PROMPTS,
+    CONTRAST_PAIRS,
+    PROGRESSIVE_SEQUENCES,
+    EXTREME_MODIFIERS,
+    ELEMENT_CONSTRAINTS
 )
+from pyramid_index import PyramidIndex
+from matcher import ElementMatcher
+from sampler import CombinationSpace, StratifiedSampler, UniqueSampler, mix64, permutation_digits
+from codec import EncodedBatch, PromptCodec, RECORD_WIDTH
+from keyword_pool import KeywordPool, build_negative_pools, build_quality_pools
+from instrumentation import Profiler
+from cache import AnalysisCache, DEFAULT_MAXSIZE, DEFAULT_TTL, matching_text
+from cooccurrence import CooccurrenceMatrix
+from fuzzy import DEFAULT_MIN_CONFIDENCE, FuzzyMatcher
+from weights import ElementWeights, load_weights
+from constraints import ElementConstraints, load_constraints
+from seed_stream import SeedStream
+
+
+# 启用共现矩阵时每个缺失维度给出的推荐数
+SUGGESTION_TOP_K = 3
+
+# 随机提示词中基础提示词的拼接顺序（与 generate_base_prompt 的参数顺序一致）
+BASE_PROMPT_DIMENSIONS = ("1.主体层", "2.风格层", "3.环境层", "4.技术层", "5.氛围层", "6.创新层")
+
+# 变奏策略注册表：策略 → (整批生成, 按种子重建单个变奏, 多个基础提示词的批量编码) 的方法名。
+# 按方法名在实例上查找，性能统计挂载的计时包装同样生效；未知策略按混合实验处理。
+STRATEGY_REGISTRY: Dict[str, Tuple[str, str, str]] = {
+    "单维度变奏": ("_generate_single_dimension_variations", "_single_dimension_variation",
+                "_encode_single_dimension_batch"),
+    "跨维度组合": ("_generate_cross_dimension_variations", "_cross_dimension_variation",
+                "_encode_cross_dimension_batch"),
+    "对比变奏": ("_generate_contrast_variations", "_contrast_variation",
+               "_encode_contrast_batch"),
+    "渐进变奏": ("_generate_progressive_variations", "_progressive_variation",
+               "_encode_progressive_batch"),
+    "极端变奏": ("_generate_extreme_variations", "_extreme_variation",
+               "_encode_extreme_batch"),
+    "混合实验": ("_generate_mixed_variations", "_mixed_variation",
+               "_encode_mixed_batch"),
+}
+
+
+# 分层采样支持的变奏策略：只有从金字塔中选取元素的策略才有覆盖问题
+STRATIFIED_STRATEGIES = ("单维度变奏", "跨维度组合", "混合实验")
+
+
+def check_stratified_strategy(strategy: str):
+    if strategy not in STRATIFIED_STRATEGIES:
+        raise ValueError(f"分层采样（stratified）仅支持：{'、'.join(STRATIFIED_STRATEGIES)}")
 
 
 class PromptGenerator:
-    """提示词生成器"""
+    """提示词生成器
     
-    def __init__(self):
+    每个生成器持有私有的随机数生成器：``seed`` 用于创建 ``random.Random``，
+    也可以直接传入 ``rng``（``random.Random`` 实例）。生成结果中的「种子」字段
+    记录了复现该结果所需的种子，把它传回对应方法的 ``seed`` 参数即可重建结果。
+    """
+    
+    def __init__(self, seed: Optional[int] = None, rng: Optional[random.Random] = None):
+        self.seed = seed
+        self.rng = rng if rng is not None else random.Random(seed)
         self.pyramid = PROMPT_PYRAMID
         self.strategies = VARIATION_STRATEGIES
         self.quality_keywords = QUALITY_KEYWORDS
         self.negative_prompts = NEGATIVE_PROMPTS
+        self.quality_pools: Dict[str, KeywordPool] = build_quality_pools(self.quality_keywords)
+        self.negative_pools: Dict[str, KeywordPool] = build_negative_pools(self.negative_prompts)
+        self.index = PyramidIndex(self.pyramid)
+        self.matcher = ElementMatcher(self.index)
+        self._combination_spaces: Dict[int, CombinationSpace] = {}
+        self.codec = PromptCodec(self.index)
+        self.profiler: Optional[Profiler] = None
+        self.analysis_cache: Optional[AnalysisCache] = None
+        self.cooccurrence: Optional[CooccurrenceMatrix] = None
+        self.fuzzy_matcher: Optional[FuzzyMatcher] = None
+        self.fuzzy_min_confidence = DEFAULT_MIN_CONFIDENCE
+        self._fuzzy_matcher: Optional[FuzzyMatcher] = None
+        self.element_weights: Optional[ElementWeights] = None
+        self.constraints: Optional[ElementConstraints] = None
+    
+    def spawn(self, seed: Optional[int] = None) -> "PromptGenerator":
+        """派生一个共享金字塔索引、元素匹配器、编码器与关键词池的新生成器
+
+        这些只读结构是创建生成器的主要开销；新生成器拥有独立的随机数生成器，
+        性能统计、分析缓存、共现矩阵、模糊识别、元素权重与兼容性约束均处于关闭状态（已构建的模糊匹配器会被复用）。
+        """
+        child = copy.copy(self)
+        Profiler.detach(child)
+        child.seed = seed
+        child.rng = random.Random(seed)
+        child.profiler = None
+        child.analysis_cache = None
+        child.cooccurrence = None
+        child.fuzzy_matcher = None
+        child.fuzzy_min_confidence = DEFAULT_MIN_CONFIDENCE
+        child.element_weights = None
+        child.constraints = None
+        return child
+    
+    def reseed(self, seed: Optional[int]):
+        """重新设置生成器的种子"""
+        self.seed = seed
+        self.rng.seed(seed)
+    
+    def _next_seed(self, rng: Optional[random.Random] = None) -> int:
+        """从随机流中抽取一个子种子"""
+        return (rng or self.rng).getrandbits(63)
+    
+    def enable_profiling(self, profiler: Optional[Profiler] = None) -> Profiler:
+        """启用方法级性能统计；可传入已有的 Profiler 在多个生成器间累计"""
+        if profiler is None and self.profiler is not None:
+            return self.profiler
+        Profiler.detach(self)
+        self.profiler = profiler or Profiler()
+        self.profiler.attach(self)
+        return self.profiler
+    
+    def disable_profiling(self):
+        """关闭性能统计，移除全部计时包装"""
+        Profiler.detach(self)
+        self.profiler = None
+    
+    def enable_analysis_cache(self, cache: Optional[AnalysisCache] = None,
+                              maxsize: int = DEFAULT_MAXSIZE,
+                              ttl: Optional[float] = DEFAULT_TTL) -> AnalysisCache:
+        """启用 analyze_prompt 的匹配结果缓存；可传入已有的缓存在多个生成器间共享"""
+        self.analysis_cache = cache or AnalysisCache(maxsize, ttl)
+        return self.analysis_cache
+    
+    def disable_analysis_cache(self):
+        """关闭匹配结果缓存"""
+        self.analysis_cache = None
+    
+    def build_fuzzy_matcher(self) -> FuzzyMatcher:
+        """构建（首次调用时）并返回模糊匹配器，但不启用；spawn 派生的生成器共享同一个匹配器"""
+        if self._fuzzy_matcher is None:
+            vocabulary = [word for words in self.quality_keywords.values() for word in words]
+            vocabulary += [word for words in self.negative_prompts.values() for word in words]
+            vocabulary += EXTREME_MODIFIERS
+            self._fuzzy_matcher = FuzzyMatcher(self.index, vocabulary=vocabulary)
+        return self._fuzzy_matcher
+    
+    def enable_fuzzy_matching(self, min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> FuzzyMatcher:
+        """启用 analyze_prompt 的模糊识别
+
+        min_confidence 只记在本生成器上、每次识别时传给匹配器，不修改与其他生成器共享的匹配器。
+        """
+        self.fuzzy_matcher = self.build_fuzzy_matcher()
+        self.fuzzy_min_confidence = min_confidence
+        return self.fuzzy_matcher
+    
+    def disable_fuzzy_matching(self):
+        """关闭模糊识别"""
+        self.fuzzy_matcher = None
+    
+    def set_element_weights(self, weights: Optional[Union[ElementWeights, Mapping[str, Mapping[str, float]]]]
+                            ) -> Optional[ElementWeights]:
+        """设置元素抽取权重：{"子维度": {名称: 权重}, "类别": {...}, "元素": {...}}，未列出的为 1
+        
+        随机提示词与单维度 / 跨维度 / 混合变奏、补充建议示例都按权重抽取元素（每次 O(1) 查别名表）；
+        无放回采样与分层采样追求覆盖，不受权重影响。运行中可继续调用 element_weights.set_weight 调整，
+        只有受影响的维度会重建别名表。传入 None 恢复等概率抽取。
+        """
+        if weights is None or isinstance(weights, ElementWeights):
+            self.element_weights = weights
+        else:
+            self.element_weights = ElementWeights(self.index)
+            self.element_weights.update(weights)
+        return self.element_weights
+    
+    def load_element_weights(self, path: str) -> ElementWeights:
+        """从 JSON 文件加载元素权重（也接受语料统计文件，按元素频次换算）"""
+        return self.set_element_weights(load_weights(path))
+    
+    def enable_constraints(self, rules: Optional[Union[ElementConstraints, Mapping[str, Any]]] = None
+                           ) -> ElementConstraints:
+        """启用元素兼容性约束：{"互斥": [[a, b], ...], "依赖": [[a, b], ...]}，缺省使用内置规则 ELEMENT_CONSTRAINTS
+        
+        随机提示词与单维度 / 跨维度 / 混合变奏在抽样时跳过与已选元素（变奏还包括基础提示词中的元素）
+        互斥或依赖未满足的候选；没有被约束排除候选的维度与不设约束时的抽取结果相同。
+        无放回采样与分层采样按组合编号生成，不受约束影响。
+        """
+        if isinstance(rules, ElementConstraints):
+            self.constraints = rules
+        else:
+            self.constraints = ElementConstraints(self.index)
+            self.constraints.update(ELEMENT_CONSTRAINTS if rules is None else rules)
+        return self.constraints
+    
+    def load_constraints(self, path: str) -> ElementConstraints:
+        """从 JSON 文件加载并启用元素兼容性约束"""
+        return self.enable_constraints(load_constraints(path))
+    
+    def disable_constraints(self):
+        """关闭元素兼容性约束"""
+        self.constraints = None
     
     def get_pyramid_structure(self) -> Dict[str, Any]:
         """获取金字塔结构"""
@@ -28,7 +216,7 @@ class PromptGenerator:
     
     def get_all_dimensions(self) -> List[str]:
         """获取所有一级维度"""
-        return list(self.pyramid["结构"]["一级维度"].keys())
+        return list(self.index.dimensions)
     
     def get_dimension_info(self, dimension: str) -> Dict[str, Any]:
         """获取指定维度的详细信息"""
@@ -36,10 +224,10 @@ class PromptGenerator:
     
     def get_subdimensions(self, dimension: str) -> List[str]:
         """获取指定维度的所有子维度"""
-        dim_info = self.get_dimension_info(dimension)
-        if "子维度" in dim_info:
-            return list(dim_info["子维度"].keys())
-        return []
+        dim_id = self.index.dimension_id(dimension)
+        if dim_id is None:
+            return []
+        return list(self.index.subdimension_names(dim_id))
     
     def get_options(self, dimension: str, subdimension: str) -> Dict[str, List[str]]:
         """获取指定子维度的所有选项"""
@@ -48,21 +236,50 @@ class PromptGenerator:
             return dim_info["子维度"].get(subdimension, {})
         return {}
     
-    def random_element_from_dimension(self, dimension: str) -> str:
-        """从指定维度随机选择一个元素"""
-        subdimensions = self.get_subdimensions(dimension)
-        if not subdimensions:
+    def random_element_from_dimension(self, dimension: str,
+                                      rng: Optional[random.Random] = None) -> str:
+        """从指定维度随机选择一个元素（设置了元素权重时按权重抽取）"""
+        dim_id = self.index.dimension_id(dimension)
+        if dim_id is None:
             return ""
         
-        subdim = random.choice(subdimensions)
-        options = self.get_options(dimension, subdim)
-        
-        if options:
-            category = random.choice(list(options.keys()))
-            elements = options[category]
-            if elements:
-                return random.choice(elements)
-        return ""
+        rng = rng or self.rng
+        if self.element_weights is not None:
+            elem_id = self.element_weights.random_element_id(dim_id, rng.random)
+        else:
+            elem_id = self.index.random_element_id(dim_id, rng.randrange)
+        if elem_id < 0:
+            return ""
+        return self.index.elements[elem_id]
+    
+    def _element_drawer(self, rng: random.Random) -> Callable[[int], int]:
+        """维度编号 → 随机元素编号的抽取函数，与 random_element_from_dimension 消耗相同的随机序列"""
+        if self.element_weights is not None:
+            weighted, uniform = self.element_weights.random_element_id, rng.random
+            return lambda dim_id: weighted(dim_id, uniform)
+        draw, randbelow = self.index.random_element_id, rng._randbelow
+        return lambda dim_id: draw(dim_id, randbelow)
+    
+    def _constrained_drawer(self, rng: random.Random) -> Optional[Callable[[List[int], Iterable[int]], List[int]]]:
+        """(维度编号列表, 已有元素编号) → 满足约束的元素编号列表 的抽取函数；未启用约束时返回 None"""
+        if self.constraints is None:
+            return None
+        draw_elements, draw, uniform = self.constraints.draw_elements, self._element_drawer(rng), rng.random
+        return lambda dim_ids, context: draw_elements(dim_ids, draw, uniform, context, self.element_weights)
+    
+    def _random_element_ids(self, dim_ids: List[int], rng: random.Random, base: str = "") -> List[int]:
+        """为每个维度编号各抽一个元素编号（没有可选元素时为 -1）；启用约束时与已选元素及 base 中的元素相容"""
+        if self.constraints is None:
+            draw = self._element_drawer(rng)
+            return [draw(dim_id) for dim_id in dim_ids]
+        context = self.match_elements(base) if base else ()
+        return self._constrained_drawer(rng)(dim_ids, context)
+    
+    def _random_elements(self, dims: List[str], rng: random.Random, base: str = "") -> List[str]:
+        """为每个维度各选一个元素（没有可选元素时为空字符串）；启用约束时与已选元素及 base 中的元素相容"""
+        elements = self.index.elements
+        elem_ids = self._random_element_ids([self.index.dimension_id(dim) for dim in dims], rng, base)
+        return [elements[elem_id] if elem_id >= 0 else "" for elem_id in elem_ids]
     
     def generate_base_prompt(self, 
                            subject: str = "",
@@ -91,279 +308,693 @@ class PromptGenerator:
     
     def generate_random_prompt(self, 
                              include_quality: bool = True,
-                             dimensions_count: int = 6) -> Dict[str, Any]:
-        """生成随机提示词"""
-        dimensions = self.get_all_dimensions()
-        selected_dims = random.sample(dimensions, min(dimensions_count, len(dimensions)))
+                             dimensions_count: int = 6,
+                             seed: Optional[int] = None) -> Dict[str, Any]:
+        """生成随机提示词；传入结果中的「种子」可复现同一条提示词"""
+        if seed is None:
+            seed = self._next_seed()
+        rng = SeedStream(seed)
+        
+        # 抽维度编号与抽维度名称消耗相同的随机序列（sample 只依赖总体大小），省去逐个名称 → 编号的查找
+        dimensions, elements = self.index.dimensions, self.index.elements
+        dim_ids = rng.sample(range(len(dimensions)), min(dimensions_count, len(dimensions)))
         
         prompt_parts = {}
-        for dim in selected_dims:
-            element = self.random_element_from_dimension(dim)
-            if element:
-                prompt_parts[dim] = element
-        
-        base_prompt = self.generate_base_prompt(
-            subject=prompt_parts.get("1.主体层", ""),
-            style=prompt_parts.get("2.风格层", ""),
-            environment=prompt_parts.get("3.环境层", ""),
-            technical=prompt_parts.get("4.技术层", ""),
-            atmosphere=prompt_parts.get("5.氛围层", ""),
-            innovation=prompt_parts.get("6.创新层", "")
-        )
-        
-        full_prompt = base_prompt
+        for dim_id, elem_id in zip(dim_ids, self._random_element_ids(dim_ids, rng)):
+            if elem_id >= 0:
+                prompt_parts[dimensions[dim_id]] = elements[elem_id]
+        
+        # 与 generate_base_prompt 相同：按 主体 → 风格 → 环境 → 技术 → 氛围 → 创新 的顺序拼接
+        full_prompt = "，".join([prompt_parts[dim] for dim in BASE_PROMPT_DIMENSIONS if dim in prompt_parts])
         if include_quality:
-            quality_words = random.sample(
-                self.quality_keywords["通用质量词"], 
-                min(3, len(self.quality_keywords["通用质量词"]))
-            )
+            quality_words = self.quality_pools["通用"].sample(3, rng)
             full_prompt = "，".join(quality_words) + "，" + full_prompt
         
         return {
             "提示词": full_prompt,
             "维度分解": prompt_parts,
-            "包含质量词": include_quality
+            "包含质量词": include_quality,
+            "种子": seed
         }
     
+    def combination_space(self, dimensions_count: int) -> CombinationSpace:
+        """获取（并缓存）指定维度数的组合空间"""
+        space = self._combination_spaces.get(dimensions_count)
+        if space is None:
+            space = self._combination_spaces[dimensions_count] = CombinationSpace(self.index, dimensions_count)
+        return space
+    
+    def generate_unique_prompts(self,
+                                count: int,
+                                include_quality: bool = True,
+                                dimensions_count: int = 6,
+                                seed: Optional[int] = None,
+                                start: int = 0) -> Iterator[Dict[str, Any]]:
+        """无放回地生成互不重复的随机提示词（惰性产出）
+        
+        在组合空间上按 Feistel 置换顺序取样，产出 count 条只需 count 次解码，
+        从不展开整个空间。同一 seed 下第 start 条起的结果固定，便于分段续采。
+        """
+        if seed is None:
+            seed = self._next_seed()
+        space = self.combination_space(dimensions_count)
+        sampler = UniqueSampler(space, seed)
+        for combination in sampler.iter_combinations(count, start):
+            yield self._unique_prompt(space, combination, seed, include_quality)
+    
+    def unique_prompt_from_combination(self,
+                                       combination: int,
+                                       seed: int,
+                                       include_quality: bool = True,
+                                       dimensions_count: int = 6) -> Dict[str, Any]:
+        """根据「组合编号」与「种子」重建 generate_unique_prompts 产出的提示词"""
+        return self._unique_prompt(self.combination_space(dimensions_count),
+                                   combination, seed, include_quality)
+    
+    def _unique_prompt(self, space: CombinationSpace, combination: int,
+                       seed: int, include_quality: bool) -> Dict[str, Any]:
+        index = self.index
+        elem_ids = space.decode(combination)
+        elements = [index.elements[e] for e in elem_ids]
+        prompt_parts = {index.dimensions[index.elem_dimension[e]]: index.elements[e] for e in elem_ids}
+        
+        full_prompt = "，".join(elements)
+        if include_quality:
+            # 质量词由 (组合编号, 种子) 确定，不额外消耗随机流
+            pool = self.quality_pools["通用"].words
+            picks = permutation_digits(mix64(combination, seed), len(pool), 3)
+            full_prompt = "，".join(pool[i] for i in picks) + "，" + full_prompt
+        
+        return {
+            "提示词": full_prompt,
+            "维度分解": prompt_parts,
+            "包含质量词": include_quality,
+            "种子": seed,
+            "组合编号": combination
+        }
+    
+    def generate_unique_cross_variations(self,
+                                         base_prompt: str,
+                                         count: int,
+                                         seed: Optional[int] = None,
+                                         start: int = 0) -> Iterator[Dict[str, Any]]:
+        """无放回地生成互不重复的跨维度组合变奏（惰性产出，每个变奏取 3 个维度）"""
+        if seed is None:
+            seed = self._next_seed()
+        space = self.combination_space(3)
+        index = self.index
+        for combination in UniqueSampler(space, seed).iter_combinations(count, start):
+            elem_ids = space.decode(combination)
+            elements = [index.elements[e] for e in elem_ids]
+            yield {
+                "变奏": f"{base_prompt}，{'，'.join(elements)}",
+                "策略": "跨维度组合",
+                "维度": [index.dimensions[index.elem_dimension[e]] for e in elem_ids],
+                "元素": elements,
+                "种子": seed,
+                "组合编号": combination
+            }
+    
+    def generate_stratified_prompts(self,
+                                    count: int,
+                                    include_quality: bool = True,
+                                    dimensions_count: int = 6,
+                                    seed: Optional[int] = None,
+                                    start: int = 0) -> Iterator[Dict[str, Any]]:
+        """分层覆盖采样生成随机提示词（惰性产出）
+        
+        维度与元素按 StratifiedSampler 的分层顺序轮流发放：约「最大维度的元素数 × 维度数 / dimensions_count」
+        条内覆盖全部元素，前缀在各子维度、类别间均匀。整个序列由 seed 决定，结果中的「序号」为序列中的位置，
+        用同一 seed 与 start=序号 即可重建（从头重放采样器，代价与 start 成正比）。
+        """
+        if seed is None:
+            seed = self._next_seed()
+        rng = SeedStream(seed)
+        sampler = StratifiedSampler(self.index, rng)
+        index = self.index
+        quality_pool = self.quality_pools["通用"]
+        for position in range(start + count):
+            dims = sampler.dimensions(dimensions_count)
+            elem_ids = [sampler.element(dim_id) for dim_id in dims]
+            quality_words = quality_pool.sample(3, rng) if include_quality else None
+            if position < start:
+                continue
+            
+            prompt_parts = {index.dimensions[d]: index.elements[e] for d, e in zip(dims, elem_ids)}
+            # 与 generate_random_prompt 相同：提示词按维度顺序排列
+            full_prompt = "，".join(index.elements[e] for e in sorted(elem_ids))
+            if include_quality:
+                full_prompt = "，".join(quality_words) + "，" + full_prompt
+            yield {
+                "提示词": full_prompt,
+                "维度分解": prompt_parts,
+                "包含质量词": include_quality,
+                "种子": seed,
+                "序号": position
+            }
+    
+    def generate_stratified_variations(self,
+                                       base_prompt: str,
+                                       strategy: str = "混合实验",
+                                       count: int = 5,
+                                       seed: Optional[int] = None,
+                                       start: int = 0) -> Iterator[Dict[str, Any]]:
+        """分层覆盖采样生成变奏（惰性产出），支持单维度变奏、跨维度组合与混合实验
+        
+        维度与元素的选取方式同 generate_stratified_prompts，混合实验的维度数（2–4）与元素顺序仍随机。
+        """
+        check_stratified_strategy(strategy)
+        if seed is None:
+            seed = self._next_seed()
+        rng = SeedStream(seed)
+        sampler = StratifiedSampler(self.index, rng)
+        index = self.index
+        for position in range(start + count):
+            if strategy == "单维度变奏":
+                width = 1
+            elif strategy == "跨维度组合":
+                width = 3
+            else:
+                width = rng.randint(2, 4)
+            dims = sampler.dimensions(width)
+            elements = [index.elements[sampler.element(dim_id)] for dim_id in dims]
+            if strategy == "混合实验":
+                rng.shuffle(elements)
+            if position < start:
+                continue
+            
+            dim_names = [index.dimensions[d] for d in dims]
+            yield {
+                "变奏": f"{base_prompt}，{'，'.join(elements)}",
+                "策略": strategy,
+                # 单维度变奏的维度与元素为单个字符串，与 generate_variations 的结果一致
+                "维度": dim_names[0] if width == 1 else dim_names,
+                "元素": elements[0] if width == 1 else elements,
+                "种子": seed,
+                "序号": position
+            }
+    
     def generate_variations(self, 
                           base_prompt: str,
                           strategy: str = "单维度变奏",
-                          count: int = 5) -> List[Dict[str, Any]]:
-        """基于策略生成变奏"""
-        variations = []
-        
-        if strategy == "单维度变奏":
-            variations = self._generate_single_dimension_variations(base_prompt, count)
-        elif strategy == "跨维度组合":
-            variations = self._generate_cross_dimension_variations(base_prompt, count)
-        elif strategy == "对比变奏":
-            variations = self._generate_contrast_variations(base_prompt, count)
-        elif strategy == "渐进变奏":
-            variations = self._generate_progressive_variations(base_prompt, count)
-        elif strategy == "极端变奏":
-            variations = self._generate_extreme_variations(base_prompt, count)
-        else:  # 混合实验
-            variations = self._generate_mixed_variations(base_prompt, count)
-        
-        return variations
+                          count: int = 5,
+                          seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """基于策略生成变奏
+        
+        每个变奏都带有自己的「种子」，可通过 regenerate_variation 单独重建；
+        传入 seed 则整批变奏可复现。
+        """
+        rng = random.Random(seed) if seed is not None else self.rng
+        generate = getattr(self, self._strategy_methods(strategy)[0])
+        return generate(base_prompt, count, rng)
+    
+    def generate_variations_batch(self,
+                                  base_prompts: Iterable[str],
+                                  strategy: str = "单维度变奏",
+                                  count: int = 5,
+                                  seed: Optional[int] = None,
+                                  columnar: bool = False) -> Union[List[Dict[str, Any]], EncodedBatch]:
+        """为多个基础提示词批量生成变奏，每个基础提示词 count 个，按基础提示词顺序排列
+        
+        结果与依次调用 generate_variations(base, strategy, count) 相同（共享同一随机流），
+        每个变奏同样带有可传给 regenerate_variation 的「种子」。columnar 为 True 时返回列式的
+        EncodedBatch（records / base_ids / seeds）：批量实现只抽取编号，不构造任何字典与字符串，
+        每条变奏占 codec.RECORD_BYTES（46）字节，需要文本时再用 decode 还原。
+        """
+        rng = random.Random(seed) if seed is not None else self.rng
+        generate, _, encode = self._strategy_methods(strategy)
+        if columnar:
+            batch = EncodedBatch()
+            getattr(self, encode)(list(base_prompts), count, rng, batch)
+            return batch
+        generate = getattr(self, generate)
+        return [variation for base in base_prompts for variation in generate(base, count, rng)]
     
-    def _generate_single_dimension_variations(self, base: str, count: int) -> List[Dict[str, Any]]:
+    def regenerate_variation(self,
+                             base_prompt: str,
+                             strategy: str,
+                             seed: int,
+                             stage: int = 1) -> Dict[str, Any]:
+        """根据变奏中记录的「种子」重建单个变奏（渐进变奏还需给出「阶段」）"""
+        rebuild = getattr(self, self._strategy_methods(strategy)[1])
+        if strategy == "渐进变奏":
+            return rebuild(base_prompt, seed, stage)
+        return rebuild(base_prompt, seed)
+    
+    @staticmethod
+    def _strategy_methods(strategy: str) -> Tuple[str, str, str]:
+        return STRATEGY_REGISTRY.get(strategy, STRATEGY_REGISTRY["混合实验"])
+    
+    def _generate_single_dimension_variations(self, base: str, count: int,
+                                              rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
         """单维度变奏"""
-        variations = []
-        dimensions = self.get_all_dimensions()
-        
-        for i in range(count):
-            dim = random.choice(dimensions)
-            element = self.random_element_from_dimension(dim)
-            variation = f"{base}，{element}"
-            variations.append({
-                "变奏": variation,
-                "策略": "单维度变奏",
-                "维度": dim,
-                "元素": element
-            })
-        
-        return variations
+        return [self._single_dimension_variation(base, self._next_seed(rng)) for _ in range(count)]
     
-    def _generate_cross_dimension_variations(self, base: str, count: int) -> List[Dict[str, Any]]:
+    def _single_dimension_variation(self, base: str, seed: int) -> Dict[str, Any]:
+        rng = SeedStream(seed)
+        dim = rng.choice(self.index.dimensions)
+        element, = self._random_elements([dim], rng, base)
+        return {
+            "变奏": f"{base}，{element}",
+            "策略": "单维度变奏",
+            "维度": dim,
+            "元素": element,
+            "种子": seed
+        }
+    
+    def _generate_cross_dimension_variations(self, base: str, count: int,
+                                             rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
         """跨维度组合变奏"""
-        variations = []
-        dimensions = self.get_all_dimensions()
-        
-        for i in range(count):
-            selected_dims = random.sample(dimensions, min(3, len(dimensions)))
-            elements = [self.random_element_from_dimension(dim) for dim in selected_dims]
-            elements = [e for e in elements if e]
-            
-            variation = f"{base}，{'，'.join(elements)}"
-            variations.append({
-                "变奏": variation,
-                "策略": "跨维度组合",
-                "维度": selected_dims,
-                "元素": elements
-            })
+        return [self._cross_dimension_variation(base, self._next_seed(rng)) for _ in range(count)]
+    
+    def _cross_dimension_variation(self, base: str, seed: int) -> Dict[str, Any]:
+        rng = SeedStream(seed)
+        dimensions, names = self.index.dimensions, self.index.elements
+        dim_ids = rng.sample(range(len(dimensions)), min(3, len(dimensions)))
+        selected_dims = [dimensions[dim_id] for dim_id in dim_ids]
+        elements = [names[elem_id] for elem_id in self._random_element_ids(dim_ids, rng, base) if elem_id >= 0]
         
-        return variations
+        return {
+            "变奏": f"{base}，{'，'.join(elements)}",
+            "策略": "跨维度组合",
+            "维度": selected_dims,
+            "元素": elements,
+            "种子": seed
+        }
     
-    def _generate_contrast_variations(self, base: str, count: int) -> List[Dict[str, Any]]:
+    def _generate_contrast_variations(self, base: str, count: int,
+                                      rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
         """对比变奏"""
-        contrast_pairs = [
-            ("古代", "未来"),
-            ("自然", "人造"),
-            ("明亮", "黑暗"),
-            ("写实", "抽象"),
-            ("微观", "宏观"),
-            ("温暖", "冷峻"),
-            ("简约", "华丽"),
-            ("静止", "动态")
-        ]
-        
-        variations = []
-        for i in range(count):
-            pair = random.choice(contrast_pairs)
-            element = random.choice(pair)
-            variation = f"{base}，{element}风格"
-            variations.append({
-                "变奏": variation,
-                "策略": "对比变奏",
-                "对比组": pair,
-                "选择": element
-            })
-        
-        return variations
+        return [self._contrast_variation(base, self._next_seed(rng)) for _ in range(count)]
+    
+    def _contrast_variation(self, base: str, seed: int) -> Dict[str, Any]:
+        rng = SeedStream(seed)
+        pair = rng.choice(CONTRAST_PAIRS)
+        element = rng.choice(pair)
+        return {
+            "变奏": f"{base}，{element}风格",
+            "策略": "对比变奏",
+            "对比组": pair,
+            "选择": element,
+            "种子": seed
+        }
+    
+    def _generate_progressive_variations(self, base: str, count: int,
+                                         rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
+        """渐进变奏（同一批变奏共享一个序列和种子，以「阶段」区分）"""
+        return self._progressive_variation_sequence(base, count, self._next_seed(rng))
+    
+    def _progressive_variation(self, base: str, seed: int, stage: int) -> Dict[str, Any]:
+        return self._progressive_variation_sequence(base, stage, seed)[stage - 1]
     
-    def _generate_progressive_variations(self, base: str, count: int) -> List[Dict[str, Any]]:
-        """渐进变奏"""
-        progressive_sequences = [
-            ["清晨", "上午", "正午", "下午", "黄昏", "夜晚"],
-            ["完整", "轻微破损", "破损", "严重破碎", "废墟"],
-            ["写实", "半写实", "风格化", "抽象", "极简"],
-            ["平静", "微动", "活跃", "激烈", "爆发"],
-            ["微观", "近景", "中景", "远景", "全景"]
-        ]
+    def _progressive_variation_sequence(self, base: str, count: int, seed: int) -> List[Dict[str, Any]]:
+        rng = SeedStream(seed)
+        sequence = rng.choice(PROGRESSIVE_SEQUENCES)
         
         variations = []
-        sequence = random.choice(progressive_sequences)
-        
         for i in range(min(count, len(sequence))):
-            variation = f"{base}，{sequence[i]}"
             variations.append({
-                "变奏": variation,
+                "变奏": f"{base}，{sequence[i]}",
                 "策略": "渐进变奏",
                 "序列": sequence,
                 "阶段": i + 1,
-                "当前": sequence[i]
+                "当前": sequence[i],
+                "种子": seed
             })
         
         return variations
     
-    def _generate_extreme_variations(self, base: str, count: int) -> List[Dict[str, Any]]:
+    def _generate_extreme_variations(self, base: str, count: int,
+                                     rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
         """极端变奏"""
-        extreme_modifiers = [
-            "极度夸张的", "极简主义", "极致细节", "极端对比",
-            "超现实", "极度扭曲", "无限重复", "完全抽象",
-            "纯粹色彩", "纯黑白", "爆炸性", "绝对静止"
-        ]
-        
-        variations = []
-        for i in range(count):
-            modifier = random.choice(extreme_modifiers)
-            variation = f"{modifier}，{base}"
-            variations.append({
-                "变奏": variation,
-                "策略": "极端变奏",
-                "修饰词": modifier
-            })
-        
-        return variations
+        return [self._extreme_variation(base, self._next_seed(rng)) for _ in range(count)]
+    
+    def _extreme_variation(self, base: str, seed: int) -> Dict[str, Any]:
+        modifier = SeedStream(seed).choice(EXTREME_MODIFIERS)
+        return {
+            "变奏": f"{modifier}，{base}",
+            "策略": "极端变奏",
+            "修饰词": modifier,
+            "种子": seed
+        }
     
-    def _generate_mixed_variations(self, base: str, count: int) -> List[Dict[str, Any]]:
+    def _generate_mixed_variations(self, base: str, count: int,
+                                   rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
         """混合实验变奏"""
-        variations = []
+        return [self._mixed_variation(base, self._next_seed(rng)) for _ in range(count)]
+    
+    def _mixed_variation(self, base: str, seed: int) -> Dict[str, Any]:
+        rng = SeedStream(seed)
+        dimensions = rng.sample(self.index.dimensions, rng.randint(2, 4))
         
-        for i in range(count):
-            elements = []
-            dimensions = random.sample(self.get_all_dimensions(), 
-                                     random.randint(2, 4))
-            
-            for dim in dimensions:
-                element = self.random_element_from_dimension(dim)
-                if element:
-                    elements.append(element)
-            
-            random.shuffle(elements)
-            variation = f"{base}，{'，'.join(elements)}"
-            
-            variations.append({
-                "变奏": variation,
-                "策略": "混合实验",
-                "维度": dimensions,
-                "元素": elements
-            })
+        elements = [e for e in self._random_elements(dimensions, rng, base) if e]
         
-        return variations
+        rng.shuffle(elements)
+        return {
+            "变奏": f"{base}，{'，'.join(elements)}",
+            "策略": "混合实验",
+            "维度": dimensions,
+            "元素": elements,
+            "种子": seed
+        }
+    
+    # 批量编码：与对应的单条实现消耗相同的随机序列，但只抽取编号，整批写入 batch。
+    # 每个变奏仍按自己的种子重置同一个 SeedStream 实例，「种子」与单条生成的结果一一对应；
+    # randbelow 即 random.choice / randrange(n) 内部使用的抽取函数，省去参数检查。
+    
+    def _encode_single_dimension_batch(self, bases: List[str], count: int,
+                                       rng: random.Random, batch: EncodedBatch):
+        index = self.index
+        canonical = self.codec.canonical_ids
+        dim_count = len(index.dimensions)
+        code = self.codec.strategy_code("单维度变奏")
+        padding = [-1] * (RECORD_WIDTH - 4)
+        getrandbits = rng.getrandbits
+        r = SeedStream()
+        reseed, randbelow = r.seed, r._randbelow
+        draw = self._element_drawer(r)
+        constrained = self._constrained_drawer(r)
+        records, base_ids, seeds = [], [], []
+        for base in bases:
+            base_ids += [batch.base_id(base)] * count
+            context = tuple(self.match_elements(base)) if constrained else ()
+            for _ in range(count):
+                seed = getrandbits(63)
+                reseed(seed)
+                dim_id = randbelow(dim_count)
+                elem_id = draw(dim_id) if constrained is None else constrained([dim_id], context)[0]
+                records += [code, -1, dim_id, canonical[elem_id] if elem_id >= 0 else -1]
+                records += padding
+                seeds.append(seed)
+        batch.extend(records, base_ids, seeds)
+    
+    def _encode_cross_dimension_batch(self, bases: List[str], count: int,
+                                      rng: random.Random, batch: EncodedBatch):
+        self._encode_multi_dimension_batch(bases, count, rng, batch, "跨维度组合")
+    
+    def _encode_mixed_batch(self, bases: List[str], count: int,
+                            rng: random.Random, batch: EncodedBatch):
+        self._encode_multi_dimension_batch(bases, count, rng, batch, "混合实验")
+    
+    def _encode_multi_dimension_batch(self, bases: List[str], count: int,
+                                      rng: random.Random, batch: EncodedBatch, strategy: str):
+        """跨维度组合（固定 3 个维度）与混合实验（2–4 个维度，元素打乱）"""
+        index = self.index
+        canonical = self.codec.canonical_ids
+        # sample 的抽取只取决于总体长度，对编号区间抽样与对维度名抽样结果一致
+        dim_range = range(len(index.dimensions))
+        mixed = strategy == "混合实验"
+        width = 4 if mixed else 3
+        picks = min(3, len(dim_range))
+        code = self.codec.strategy_code(strategy)
+        getrandbits = rng.getrandbits
+        r = SeedStream()
+        reseed, randbelow, sample, shuffle = r.seed, r._randbelow, r.sample, r.shuffle
+        draw = self._element_drawer(r)
+        constrained = self._constrained_drawer(r)
+        records, base_ids, seeds = [], [], []
+        for base in bases:
+            base_ids += [batch.base_id(base)] * count
+            context = tuple(self.match_elements(base)) if constrained else ()
+            for _ in range(count):
+                seed = getrandbits(63)
+                reseed(seed)
+                # randint(2, 4) 即 2 + randbelow(3)
+                dims = sample(dim_range, 2 + randbelow(3) if mixed else picks)
+                drawn = [draw(d) for d in dims] if constrained is None else constrained(dims, context)
+                elem_ids = [canonical[e] for e in drawn if e >= 0]
+                if mixed:
+                    shuffle(elem_ids)
+                fields = [code, -1] + dims + [-1] * (width - len(dims)) + elem_ids
+                records += fields
+                records += [-1] * (RECORD_WIDTH - len(fields))
+                seeds.append(seed)
+        batch.extend(records, base_ids, seeds)
+    
+    def _encode_contrast_batch(self, bases: List[str], count: int,
+                               rng: random.Random, batch: EncodedBatch):
+        code = self.codec.strategy_code("对比变奏")
+        pair_count = len(CONTRAST_PAIRS)
+        pair_sizes = [len(pair) for pair in CONTRAST_PAIRS]
+        padding = [-1] * (RECORD_WIDTH - 4)
+        getrandbits = rng.getrandbits
+        r = SeedStream()
+        reseed, randbelow = r.seed, r._randbelow
+        records, base_ids, seeds = [], [], []
+        for base in bases:
+            base_ids += [batch.base_id(base)] * count
+            for _ in range(count):
+                seed = getrandbits(63)
+                reseed(seed)
+                pair_id = randbelow(pair_count)
+                records += [code, -1, pair_id, randbelow(pair_sizes[pair_id])]
+                records += padding
+                seeds.append(seed)
+        batch.extend(records, base_ids, seeds)
+    
+    def _encode_progressive_batch(self, bases: List[str], count: int,
+                                  rng: random.Random, batch: EncodedBatch):
+        code = self.codec.strategy_code("渐进变奏")
+        padding = [-1] * (RECORD_WIDTH - 3)
+        r = SeedStream()
+        records, base_ids, seeds = [], [], []
+        for base in bases:
+            base_id = batch.base_id(base)
+            seed = rng.getrandbits(63)
+            r.seed(seed)
+            sequence_id = r._randbelow(len(PROGRESSIVE_SEQUENCES))
+            stages = min(count, len(PROGRESSIVE_SEQUENCES[sequence_id]))
+            for stage in range(1, stages + 1):
+                records += [code, stage, sequence_id]
+                records += padding
+            base_ids += [base_id] * stages
+            seeds += [seed] * stages
+        batch.extend(records, base_ids, seeds)
+    
+    def _encode_extreme_batch(self, bases: List[str], count: int,
+                              rng: random.Random, batch: EncodedBatch):
+        code = self.codec.strategy_code("极端变奏")
+        modifier_count = len(EXTREME_MODIFIERS)
+        padding = [-1] * (RECORD_WIDTH - 3)
+        getrandbits = rng.getrandbits
+        r = SeedStream()
+        reseed, randbelow = r.seed, r._randbelow
+        records, base_ids, seeds = [], [], []
+        for base in bases:
+            base_ids += [batch.base_id(base)] * count
+            for _ in range(count):
+                seed = getrandbits(63)
+                reseed(seed)
+                records += [code, -1, randbelow(modifier_count)]
+                records += padding
+                seeds.append(seed)
+        batch.extend(records, base_ids, seeds)
+    
+    def encode(self,
+               results: Union[Dict[str, Any], Iterable[Dict[str, Any]]],
+               batch: Optional[EncodedBatch] = None) -> EncodedBatch:
+        """把随机提示词 / 变奏编码为紧凑的整数记录，追加到 batch（默认新建）并返回"""
+        if batch is None:
+            batch = EncodedBatch()
+        if isinstance(results, dict):
+            results = [results]
+        encode = self.codec.encode
+        for result in results:
+            encode(result, batch)
+        return batch
     
-    def analyze_prompt(self, prompt: str) -> Dict[str, Any]:
-        """分析提示词，识别其中的维度元素"""
+    def decode(self, batch: EncodedBatch, i: Optional[int] = None):
+        """还原编码结果：给出 i 时返回第 i 条，否则按顺序惰性产出整批"""
+        if i is not None:
+            return self.codec.decode(batch, i)
+        return self.codec.iter_decode(batch)
+    
+    def set_cooccurrence(self, matrix: Optional[CooccurrenceMatrix]):
+        """设置用于排序补充建议的共现矩阵；传入 None 恢复随机示例"""
+        self.cooccurrence = matrix
+    
+    def load_cooccurrence(self, path: str) -> CooccurrenceMatrix:
+        """从文件加载共现矩阵并启用"""
+        self.cooccurrence = CooccurrenceMatrix.load(path, self.index)
+        return self.cooccurrence
+    
+    def match_elements(self, prompt: str) -> Iterable[int]:
+        """提示词中出现的元素编号（升序）
+
+        匹配在规范化文本上进行（全角 / 半角统一、连续空白合并），是否启用缓存结果都相同；
+        启用缓存时按规范化文本查询缓存，空白与标点写法不同的同一提示词共享一条结果。
+        """
+        if self.analysis_cache is not None:
+            return self.analysis_cache.lookup(prompt, self._match_tuple)
+        return self.matcher.match(matching_text(prompt))
+    
+    def _match_tuple(self, text: str) -> tuple:
+        return tuple(self.matcher.match(text))
+    
+    def analyze_prompt(self, prompt: str, seed: Optional[int] = None) -> Dict[str, Any]:
+        """分析提示词，识别其中的维度元素；「种子」决定补充建议中的示例
+
+        识别结果是确定的（可被缓存），补充建议中的示例每次按「种子」重新抽取。
+        设置了共现矩阵时，示例改为已识别元素条件下概率最高的元素，
+        并在「推荐」中给出前 SUGGESTION_TOP_K 个候选及得分。
+        启用模糊识别时，近似写法（错别字、大小写 / 全半角差异）识别出的元素同样计入覆盖维度，
+        在「识别的元素」中带有「原文」与「置信度」，并汇总在「模糊识别」中。
+        """
+        if seed is None:
+            seed = self._next_seed()
+        rng = SeedStream(seed)
+        
         analysis = {
             "原始提示词": prompt,
             "识别的元素": {},
             "覆盖维度": [],
-            "建议补充": []
+            "建议补充": [],
+            "种子": seed
         }
         
-        for dimension in self.get_all_dimensions():
-            subdimensions = self.get_subdimensions(dimension)
-            found_elements = []
-            
-            for subdim in subdimensions:
-                options = self.get_options(dimension, subdim)
-                for category, elements in options.items():
-                    for element in elements:
-                        if element in prompt:
-                            found_elements.append({
-                                "子维度": subdim,
-                                "类别": category,
-                                "元素": element
-                            })
-            
-            if found_elements:
-                analysis["识别的元素"][dimension] = found_elements
+        index = self.index
+        found = self.match_elements(prompt)
+        fuzzy_found = {}
+        if self.fuzzy_matcher is not None:
+            analysis["模糊识别"] = []
+            exact = {index.elements[elem_id] for elem_id in found}
+            for match in self.fuzzy_matcher.match(prompt, exact, self.fuzzy_min_confidence):
+                analysis["模糊识别"].append({
+                    "元素": match.element,
+                    "原文": match.fragment,
+                    "置信度": round(match.confidence, 4)
+                })
+                for elem_id in match.elem_ids:
+                    fuzzy_found[elem_id] = match
+            if fuzzy_found:
+                found = sorted([*found, *fuzzy_found])
+        
+        for elem_id in found:
+            dimension = index.dimensions[index.elem_dimension[elem_id]]
+            found_elements = analysis["识别的元素"].get(dimension)
+            if found_elements is None:
+                found_elements = analysis["识别的元素"][dimension] = []
                 analysis["覆盖维度"].append(dimension)
+            entry = {
+                "子维度": index.subdimensions[index.elem_subdimension[elem_id]],
+                "类别": index.categories[index.elem_category[elem_id]],
+                "元素": index.elements[elem_id]
+            }
+            match = fuzzy_found.get(elem_id)
+            if match is not None:
+                entry["原文"] = match.fragment
+                entry["置信度"] = round(match.confidence, 4)
+            found_elements.append(entry)
         
-        all_dimensions = set(self.get_all_dimensions())
         covered_dimensions = set(analysis["覆盖维度"])
-        missing_dimensions = all_dimensions - covered_dimensions
+        missing_dimensions = [dim for dim in self.get_all_dimensions()
+                              if dim not in covered_dimensions]
         
+        cooccurrence = self.cooccurrence
         for dim in missing_dimensions:
-            analysis["建议补充"].append({
+            suggestion = {
                 "维度": dim,
-                "描述": self.get_dimension_info(dim).get("描述", ""),
-                "示例": self.random_element_from_dimension(dim)
-            })
+                "描述": self.get_dimension_info(dim).get("描述", "")
+            }
+            ranked = (cooccurrence.rank(found, index.dimension_ids[dim], SUGGESTION_TOP_K)
+                      if cooccurrence is not None else [])
+            if ranked:
+                suggestion["示例"] = index.elements[ranked[0][0]]
+                suggestion["推荐"] = [{"元素": index.elements[elem_id], "得分": round(score, 4)}
+                                    for elem_id, score in ranked]
+            else:
+                suggestion["示例"] = self.random_element_from_dimension(dim, rng)
+            analysis["建议补充"].append(suggestion)
         
         return analysis
     
-    def get_quality_prompt(self, level: str = "通用") -> str:
+    def set_keyword_weights(self, weights: Optional[Dict[str, float]] = None):
+        """为质量词 / 负面词设置权重（关键词 → 权重，未列出的为 1）；传入 None 恢复等概率"""
+        self.quality_pools = build_quality_pools(self.quality_keywords)
+        self.negative_pools = build_negative_pools(self.negative_prompts)
+        if weights:
+            for pools in (self.quality_pools, self.negative_pools):
+                for name, pool in pools.items():
+                    pools[name] = pool.with_weights(weights)
+    
+    def _quality_pool(self, level: str) -> KeywordPool:
+        if level in ("通用", "艺术"):
+            return self.quality_pools[level]
+        return self.quality_pools["技术"]
+    
+    def _negative_pool(self, category: str) -> Optional[KeywordPool]:
+        return self.negative_pools.get(category)
+    
+    @staticmethod
+    def _negative_count(category: str) -> int:
+        return 10 if category == "全部" else 5
+    
+    def get_quality_prompt(self, level: str = "通用",
+                           rng: Optional[random.Random] = None) -> str:
         """获取质量提示词"""
-        if level == "通用":
-            keywords = self.quality_keywords.get("通用质量词", [])
-        elif level == "艺术":
-            keywords = self.quality_keywords.get("艺术质量词", [])
-        else:
-            keywords = self.quality_keywords.get("技术质量词", [])
-        
-        selected = random.sample(keywords, min(3, len(keywords)))
+        selected = self._quality_pool(level).sample(3, rng or self.rng)
         return "，".join(selected)
     
-    def get_negative_prompt(self, category: str = "全部") -> str:
+    def get_negative_prompt(self, category: str = "全部",
+                            rng: Optional[random.Random] = None) -> str:
         """获取负面提示词"""
-        if category == "全部":
-            all_negatives = []
-            for neg_list in self.negative_prompts.values():
-                all_negatives.extend(neg_list)
-            selected = random.sample(all_negatives, min(10, len(all_negatives)))
-        else:
-            negatives = self.negative_prompts.get(f"{category}负面词", [])
-            selected = random.sample(negatives, min(5, len(negatives)))
-        
+        pool = self._negative_pool(category)
+        if pool is None:
+            return ""
+        selected = pool.sample(self._negative_count(category), rng or self.rng)
         return "，".join(selected)
     
-    def generate_complete_prompt_set(self, base_idea: str) -> Dict[str, Any]:
-        """生成完整的提示词集合"""
-        analysis = self.analyze_prompt(base_idea)
+    def get_quality_prompts(self, count: int, level: str = "通用",
+                            rng: Optional[random.Random] = None) -> List[str]:
+        """批量获取质量提示词"""
+        return self._quality_pool(level).sample_batch(count, 3, rng or self.rng)
+    
+    def get_negative_prompts(self, count: int, category: str = "全部",
+                             rng: Optional[random.Random] = None) -> List[str]:
+        """批量获取负面提示词，如一次取 10 万条"""
+        pool = self._negative_pool(category)
+        if pool is None:
+            return [""] * count
+        return pool.sample_batch(count, self._negative_count(category), rng or self.rng)
+    
+    def enumerate_quality_prompts(self, level: str = "通用", k: int = 3,
+                                  ordered: bool = False) -> Iterator[str]:
+        """按确定顺序穷举全部质量提示词组合"""
+        for words in self._quality_pool(level).enumerate_combinations(k, ordered):
+            yield "，".join(words)
+    
+    def enumerate_negative_prompts(self, category: str = "全部", k: Optional[int] = None,
+                                   ordered: bool = False) -> Iterator[str]:
+        """按确定顺序穷举全部负面提示词组合，k 默认与 get_negative_prompt 相同"""
+        pool = self._negative_pool(category)
+        if pool is None:
+            return
+        if k is None:
+            k = self._negative_count(category)
+        for words in pool.enumerate_combinations(k, ordered):
+            yield "，".join(words)
+    
+    def generate_complete_prompt_set(self, base_idea: str,
+                                     seed: Optional[int] = None) -> Dict[str, Any]:
+        """生成完整的提示词集合；传入结果中的「种子」可复现整套方案"""
+        if seed is None:
+            seed = self._next_seed()
+        rng = SeedStream(seed)
+        
+        analysis = self.analyze_prompt(base_idea, seed=self._next_seed(rng))
         
         enriched_prompt = base_idea
         if analysis["建议补充"]:
             supplements = [item["示例"] for item in analysis["建议补充"][:3]]
             enriched_prompt = f"{base_idea}，{'，'.join(supplements)}"
         
-        quality = self.get_quality_prompt("通用")
-        negative = self.get_negative_prompt("全部")
+        quality = self.get_quality_prompt("通用", rng)
+        negative = self.get_negative_prompt("全部", rng)
         
         variations = {}
         for strategy in ["单维度变奏", "跨维度组合", "对比变奏", "渐进变奏", "极端变奏", "混合实验"]:
-            variations[strategy] = self.generate_variations(enriched_prompt, strategy, 3)
+            variations[strategy] = self.generate_variations(enriched_prompt, strategy, 3,
+                                                            seed=self._next_seed(rng))
         
         return {
             "原始想法": base_idea,
@@ -376,5 +1007,6 @@ class PromptGenerator:
                 "覆盖维度数": len(analysis["覆盖维度"]),
                 "建议补充数": len(analysis["建议补充"]),
                 "总变奏数": sum(len(v) for v in variations.values())
-            }
+            },
+            "种子": seed
         }
@@ -365,3 +365,54 @@ NEGATIVE_PROMPTS = {
         "边框", "裁切不当", "多余遮挡"
     ]
 }
+
+# 对比变奏使用的对立组
+CONTRAST_PAIRS = [
+    ("古代", "未来"),
+    ("自然", "人造"),
+    ("明亮", "黑暗"),
+    ("写实", "抽象"),
+    ("微观", "宏观"),
+    ("温暖", "冷峻"),
+    ("简约", "华丽"),
+    ("静止", "动态")
+]
+
+# 渐进变奏使用的递进序列
+PROGRESSIVE_SEQUENCES = [
+    ["清晨", "上午", "正午", "下午", "黄昏", "夜晚"],
+    ["完整", "轻微破损", "破损", "严重破碎", "废墟"],
+    ["写实", "半写实", "风格化", "抽象", "极简"],
+    ["平静", "微动", "活跃", "激烈", "爆发"],
+    ["微观", "近景", "中景", "远景", "全景"]
+]
+
+# 极端变奏使用的修饰词
+EXTREME_MODIFIERS = [
+    "极度夸张的", "极简主义", "极致细节", "极端对比",
+    "超现实", "极度扭曲", "无限重复", "完全抽象",
+    "纯粹色彩", "纯黑白", "爆炸性", "绝对静止"
+]
+
+# 元素兼容性约束（启用约束时使用的内置规则）：互斥的两侧不会同时出现，依赖的左侧需要右侧任一元素在场
+ELEMENT_CONSTRAINTS = {
+    "互斥": [
+        ["古代", ["赛博朋克", "蒸汽朋克", "柴油朋克", "科幻", "未来"]],
+        ["原始", ["赛博朋克", "科幻", "未来", "3D渲染", "像素艺术"]],
+        ["静止", ["奔跑", "跳跃", "飞行", "游泳", "舞蹈", "战斗", "运动模糊", "速度线", "残影"]],
+        ["休息", ["奔跑", "战斗", "爆发"]],
+        [["黑白", "单色"], {"类别": "色彩饱和度"}],
+        [["黑白", "单色"], ["暖色调", "冷色调", "互补色", "三角配色", "四角配色"]],
+        ["太空", {"类别": "天气"}],
+        ["太空", {"类别": "季节"}],
+        ["海底", ["火焰", "沙漠", "雨天", "雪天", "风暴", "飞行"]],
+        ["无光源", ["单光源", "双光源", "多光源", "镜头光晕", "光束", "体积光"]],
+        ["无阴影", ["硬阴影", "软阴影", "长阴影", "体积阴影"]],
+        ["深景深", ["浅景深", "焦外虚化"]],
+        [["微观", "分子级", "细胞级"], ["全景", "星球", "宇宙"]],
+    ],
+    "依赖": [
+        ["游泳", ["海洋", "湖泊", "河流", "海底", "水"]],
+        ["移轴效果", ["鸟瞰", "高角度"]],
+    ],
+}
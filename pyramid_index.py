@@ -0,0 +1,144 @@
+"""
+金字塔结构的扁平化索引
+将嵌套的 PROMPT_PYRAMID 一次性编译为元素表 + 偏移数组，供高频随机抽取与查找使用
+"""
+
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class PyramidIndex:
+    """金字塔扁平索引
+
+    所有元素按 维度 → 子维度 → 类别 的顺序平铺在 ``elements`` 中，
+    三级偏移数组描述每一层在下一层中的区间：
+
+    - ``dim_sub_offsets[d] : dim_sub_offsets[d + 1]`` 为维度 d 的子维度编号区间
+    - ``sub_cat_offsets[s] : sub_cat_offsets[s + 1]`` 为子维度 s 的类别编号区间
+    - ``cat_elem_offsets[c] : cat_elem_offsets[c + 1]`` 为类别 c 的元素编号区间
+
+    嵌套字典仍然是唯一的数据来源，索引只是它的只读编译结果。
+    """
+
+    def __init__(self, pyramid: Dict[str, Any]):
+        dimensions: List[str] = []
+        descriptions: List[str] = []
+        subdimensions: List[str] = []
+        categories: List[str] = []
+        elements: List[str] = []
+
+        dim_sub_offsets = array("i", [0])
+        sub_cat_offsets = array("i", [0])
+        cat_elem_offsets = array("i", [0])
+        sub_dimension = array("i")
+        cat_subdimension = array("i")
+        elem_category = array("i")
+
+        for dim, dim_info in pyramid["结构"]["一级维度"].items():
+            dim_id = len(dimensions)
+            dimensions.append(dim)
+            descriptions.append(dim_info.get("描述", ""))
+
+            for subdim, options in dim_info.get("子维度", {}).items():
+                sub_id = len(subdimensions)
+                subdimensions.append(subdim)
+                sub_dimension.append(dim_id)
+
+                for category, items in options.items():
+                    cat_id = len(categories)
+                    categories.append(category)
+                    cat_subdimension.append(sub_id)
+
+                    for element in items:
+                        elements.append(element)
+                        elem_category.append(cat_id)
+                    cat_elem_offsets.append(len(elements))
+                sub_cat_offsets.append(len(categories))
+            dim_sub_offsets.append(len(subdimensions))
+
+        self.dimensions: Tuple[str, ...] = tuple(dimensions)
+        self.descriptions: Tuple[str, ...] = tuple(descriptions)
+        self.subdimensions: Tuple[str, ...] = tuple(subdimensions)
+        self.categories: Tuple[str, ...] = tuple(categories)
+        self.elements: Tuple[str, ...] = tuple(elements)
+
+        self.dim_sub_offsets = dim_sub_offsets
+        self.sub_cat_offsets = sub_cat_offsets
+        self.cat_elem_offsets = cat_elem_offsets
+
+        # 反向映射：子维度 → 维度，类别 → 子维度，元素 → 类别 / 子维度 / 维度
+        self.sub_dimension = sub_dimension
+        self.cat_subdimension = cat_subdimension
+        self.elem_category = elem_category
+        self.elem_subdimension = array("i", (cat_subdimension[c] for c in elem_category))
+        self.elem_dimension = array("i", (sub_dimension[s] for s in self.elem_subdimension))
+
+        self.dimension_ids: Dict[str, int] = {dim: i for i, dim in enumerate(self.dimensions)}
+        self.subdimension_ids: Dict[Tuple[str, str], int] = {
+            (self.dimensions[sub_dimension[s]], subdim): s
+            for s, subdim in enumerate(self.subdimensions)
+        }
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def dimension_id(self, dimension: str) -> Optional[int]:
+        """维度名称 → 维度编号，不存在时返回 None"""
+        return self.dimension_ids.get(dimension)
+
+    def subdimension_range(self, dim_id: int) -> Tuple[int, int]:
+        """维度 → 子维度编号区间"""
+        return self.dim_sub_offsets[dim_id], self.dim_sub_offsets[dim_id + 1]
+
+    def category_range(self, sub_id: int) -> Tuple[int, int]:
+        """子维度 → 类别编号区间"""
+        return self.sub_cat_offsets[sub_id], self.sub_cat_offsets[sub_id + 1]
+
+    def element_range(self, cat_id: int) -> Tuple[int, int]:
+        """类别 → 元素编号区间"""
+        return self.cat_elem_offsets[cat_id], self.cat_elem_offsets[cat_id + 1]
+
+    def dimension_element_range(self, dim_id: int) -> Tuple[int, int]:
+        """维度 → 元素编号区间（同一维度的元素在元素表中连续存放）"""
+        s0, s1 = self.subdimension_range(dim_id)
+        return (self.cat_elem_offsets[self.sub_cat_offsets[s0]],
+                self.cat_elem_offsets[self.sub_cat_offsets[s1]])
+
+    def subdimension_names(self, dim_id: int) -> Tuple[str, ...]:
+        """维度下的子维度名称"""
+        s0, s1 = self.subdimension_range(dim_id)
+        return self.subdimensions[s0:s1]
+
+    def describe_element(self, elem_id: int) -> Dict[str, str]:
+        """元素编号 → 维度 / 子维度 / 类别 / 元素"""
+        cat_id = self.elem_category[elem_id]
+        sub_id = self.cat_subdimension[cat_id]
+        return {
+            "维度": self.dimensions[self.sub_dimension[sub_id]],
+            "子维度": self.subdimensions[sub_id],
+            "类别": self.categories[cat_id],
+            "元素": self.elements[elem_id]
+        }
+
+    def random_element_id(self, dim_id: int, randbelow) -> int:
+        """按 子维度 → 类别 → 元素 逐级等概率抽取，返回元素编号；无可选元素时返回 -1
+
+        ``randbelow(n)`` 返回 [0, n) 内的随机整数，与 ``random.choice`` 消耗相同的随机序列。
+        """
+        s0 = self.dim_sub_offsets[dim_id]
+        s1 = self.dim_sub_offsets[dim_id + 1]
+        if s0 == s1:
+            return -1
+        sub_id = s0 + randbelow(s1 - s0)
+
+        c0 = self.sub_cat_offsets[sub_id]
+        c1 = self.sub_cat_offsets[sub_id + 1]
+        if c0 == c1:
+            return -1
+        cat_id = c0 + randbelow(c1 - c0)
+
+        e0 = self.cat_elem_offsets[cat_id]
+        e1 = self.cat_elem_offsets[cat_id + 1]
+        if e0 == e1:
+            return -1
+        return e0 + randbelow(e1 - e0)
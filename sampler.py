@@ -0,0 +1,229 @@
+"""
+组合空间的无放回采样
+把「选取若干维度、每个维度取一个元素」的全部组合看作一个混合进制整数空间，
+用带密钥的 Feistel 置换按顺序产出互不相同的编号，再按需解码为元素组合；
+以及按 维度 → 子维度 → 类别 分层、保证覆盖全部元素的分层采样
+"""
+
+import random
+from bisect import bisect_right
+from collections import deque
+from itertools import combinations, zip_longest
+from math import prod
+from typing import Deque, Dict, Iterator, List, Sequence, Tuple
+
+from pyramid_index import PyramidIndex
+
+
+_MASK64 = (1 << 64) - 1
+
+
+class FeistelPermutation:
+    """[0, n) 上由密钥决定的伪随机双射
+
+    在不小于 n 的 2 的偶数次幂域上做平衡 Feistel 网络，超出 n 的结果继续迭代
+    （cycle walking），因此无需存储置换表，任意位置都可直接求值。
+    """
+
+    def __init__(self, n: int, seed: int, rounds: int = 4):
+        if n <= 0:
+            raise ValueError("置换空间大小必须为正数")
+        self.n = n
+        half_bits = max(1, ((n - 1).bit_length() + 1) // 2)
+        self._half_bits = half_bits
+        self._half_mask = (1 << half_bits) - 1
+        key_rng = random.Random(seed)
+        self._keys = tuple(key_rng.getrandbits(64) for _ in range(rounds))
+
+    def _round(self, x: int, key: int) -> int:
+        x = ((x ^ key) * 0xBF58476D1CE4E5B9) & _MASK64
+        x ^= x >> 31
+        x = (x * 0x94D049BB133111EB) & _MASK64
+        x ^= x >> 29
+        return x & self._half_mask
+
+    def __call__(self, i: int) -> int:
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        half_bits = self._half_bits
+        half_mask = self._half_mask
+        x = i
+        while True:
+            left = x >> half_bits
+            right = x & half_mask
+            for key in self._keys:
+                left, right = right, left ^ self._round(right, key)
+            x = (left << half_bits) | right
+            if x < self.n:
+                return x
+
+
+class CombinationSpace:
+    """维度组合空间
+
+    空间由全部 ``dimensions_count`` 维度子集（按维度顺序）拼接而成，
+    每个子集内部是各维度元素数的混合进制积。重复的元素字符串只计一次，
+    保证不同编号解码出的文本也不同。
+    """
+
+    def __init__(self, index: PyramidIndex, dimensions_count: int):
+        self.index = index
+        dim_count = len(index.dimensions)
+        self.dimensions_count = max(0, min(dimensions_count, dim_count))
+
+        # 元素字符串只归属它首次出现的维度，文本由此唯一确定维度子集与各维度元素
+        owner = {}
+        for elem_id, element in enumerate(index.elements):
+            owner.setdefault(element, elem_id)
+        unique_elements: List[Tuple[int, ...]] = []
+        for dim_id in range(dim_count):
+            e0, e1 = index.dimension_element_range(dim_id)
+            unique_elements.append(tuple(e for e in range(e0, e1) if owner[index.elements[e]] == e))
+        self.unique_elements: Tuple[Tuple[int, ...], ...] = tuple(unique_elements)
+
+        self.subsets: Tuple[Tuple[int, ...], ...] = tuple(
+            subset for subset in combinations(range(dim_count), self.dimensions_count)
+            if all(unique_elements[d] for d in subset)
+        )
+        offsets = [0]
+        for subset in self.subsets:
+            offsets.append(offsets[-1] + prod(len(unique_elements[d]) for d in subset))
+        self.offsets: Tuple[int, ...] = tuple(offsets)
+
+    @property
+    def size(self) -> int:
+        """组合总数"""
+        return self.offsets[-1]
+
+    def decode(self, combination: int) -> List[int]:
+        """组合编号 → 元素编号列表（按维度顺序）"""
+        if not 0 <= combination < self.offsets[-1]:
+            raise IndexError(combination)
+        pos = bisect_right(self.offsets, combination) - 1
+        rest = combination - self.offsets[pos]
+        elem_ids = []
+        for dim_id in self.subsets[pos]:
+            choices = self.unique_elements[dim_id]
+            rest, digit = divmod(rest, len(choices))
+            elem_ids.append(choices[digit])
+        return elem_ids
+
+
+class UniqueSampler:
+    """按伪随机顺序无放回地遍历组合空间
+
+    第 j 个样本为 ``decode(perm(j))``，只与 (seed, j) 有关，
+    因此可以从任意位置开始续采样，也可以把一次采样切分给多个进程。
+    """
+
+    def __init__(self, space: CombinationSpace, seed: int):
+        self.space = space
+        self.seed = seed
+        self.permutation = FeistelPermutation(space.size, seed) if space.size else None
+
+    def combination_at(self, position: int) -> int:
+        """采样序列中第 position 个组合编号"""
+        if self.permutation is None:
+            raise IndexError(position)
+        return self.permutation(position)
+
+    def iter_combinations(self, count: int, start: int = 0) -> Iterator[int]:
+        """从 start 开始依次产出 count 个互不相同的组合编号"""
+        if start + count > self.space.size:
+            raise ValueError(f"组合空间只有 {self.space.size} 种组合，无法产出第 {start + count} 个不重复样本")
+        for position in range(start, start + count):
+            yield self.permutation(position)
+
+
+def _interleave(groups: Sequence[Sequence[int]]) -> List[int]:
+    """轮流从各组中取一个：每组的第 1 个、第 2 个……，取完的组跳过"""
+    return [x for column in zip_longest(*groups, fillvalue=None) for x in column if x is not None]
+
+
+class StratifiedSampler:
+    """分层覆盖采样
+
+    每个维度维护一副「牌」：元素按 子维度 → 类别 轮流排列（各层顺序随机打乱），一轮发完
+    恰好覆盖该维度的每个元素一次，且任意前缀在各子维度、各类别间尽量均匀；发完后重新洗一副。
+    维度本身也按整副轮流发放，每条结果取若干互不相同的维度。于是任一维度被选中
+    ``其元素数`` 次后必然覆盖了它的全部元素：每条取 k 个维度时，约 元素最多的维度元素数 × 维度数 / k
+    条结果即可覆盖全部元素，而逐条独立抽取需要的数量要大一个数量级以上（小类别中的元素被抽中的概率很低）。
+
+    采样器有状态，同一 rng 下产出的序列固定；从头重放即可定位到任意位置。
+    """
+
+    def __init__(self, index: PyramidIndex, rng: random.Random):
+        self.index = index
+        self.rng = rng
+        self.dimension_ids: Tuple[int, ...] = tuple(
+            dim_id for dim_id in range(len(index.dimensions))
+            if index.dimension_element_range(dim_id)[0] < index.dimension_element_range(dim_id)[1]
+        )
+        self._dimension_deck: Deque[int] = deque()
+        self._element_decks: Dict[int, Deque[int]] = {dim_id: deque() for dim_id in self.dimension_ids}
+
+    def _stratified_order(self, dim_id: int) -> List[int]:
+        """一轮覆盖维度全部元素的发放顺序：子维度间轮流，子维度内按类别轮流"""
+        index = self.index
+        shuffle = self.rng.shuffle
+        strata = []
+        s0, s1 = index.subdimension_range(dim_id)
+        for sub_id in range(s0, s1):
+            c0, c1 = index.category_range(sub_id)
+            categories = []
+            for cat_id in range(c0, c1):
+                elements = list(range(*index.element_range(cat_id)))
+                if elements:
+                    shuffle(elements)
+                    categories.append(elements)
+            if categories:
+                shuffle(categories)
+                strata.append(_interleave(categories))
+        shuffle(strata)
+        return _interleave(strata)
+
+    def dimensions(self, k: int) -> List[int]:
+        """取 k 个互不相同的维度（不超过有元素的维度数）
+
+        整副发完后重新洗牌；跨副时与本条已选维度重复的牌留给下一条，各维度被选中的次数至多相差一轮。
+        """
+        k = min(k, len(self.dimension_ids))
+        deck = self._dimension_deck
+        chosen: List[int] = []
+        deferred: List[int] = []
+        while len(chosen) < k:
+            if not deck:
+                refill = list(self.dimension_ids)
+                self.rng.shuffle(refill)
+                deck.extend(refill)
+            dim_id = deck.popleft()
+            (deferred if dim_id in chosen else chosen).append(dim_id)
+        deck.extendleft(reversed(deferred))
+        return chosen
+
+    def element(self, dim_id: int) -> int:
+        """从维度的牌中发出下一个元素编号"""
+        deck = self._element_decks[dim_id]
+        if not deck:
+            deck.extend(self._stratified_order(dim_id))
+        return deck.popleft()
+
+
+def permutation_digits(value: int, pool_size: int, k: int) -> List[int]:
+    """把整数解码为从 pool_size 个候选中有序选出的 k 个不同下标"""
+    remaining = list(range(pool_size))
+    picked = []
+    for _ in range(min(k, pool_size)):
+        value, digit = divmod(value, len(remaining))
+        picked.append(remaining.pop(digit))
+    return picked
+
+
+def mix64(value: int, seed: int) -> int:
+    """(value, seed) → 64 位伪随机整数"""
+    x = (value * 0x9E3779B97F4A7C15 + seed) & _MASK64
+    x ^= x >> 30
+    x = (x * 0xBF58476D1CE4E5B9) & _MASK64
+    x ^= x >> 27
+    x = (x * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
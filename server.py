@@ -0,0 +1,451 @@
+"""
+本地 HTTP JSON 接口服务
+基于 asyncio 的轻量 HTTP/1.1 服务，常驻一个预热好的 PromptGenerator；
+同一时间窗口内到达的并发请求按接口合并为一批，在生成线程中一次处理完毕
+
+用法：
+  python server.py                           # 监听 127.0.0.1:8765
+  python server.py --port 9000 --seed 42     # 固定生成器种子
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from prompt_generator import PromptGenerator
+from bulk import iter_random_prompts
+from codec import STRATEGY_CODES
+from instrumentation import Profiler
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 攒批时间窗口（秒）：第一个请求到达后最多等待这么久再统一处理
+BATCH_WINDOW = 0.001
+
+# 单批最多合并的请求数，攒够即立即处理
+MAX_BATCH_SIZE = 256
+
+# 单个请求允许的最大生成数量
+MAX_COUNT = 1000
+
+# 请求体大小上限（字节）
+MAX_BODY_SIZE = 1 << 20
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """带状态码的请求错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _sub_seeds(seed: int, count: int) -> List[int]:
+    """由请求种子派生 count 个结果种子，同一请求种子得到相同的结果"""
+    rng = random.Random(seed)
+    return [rng.getrandbits(63) for _ in range(count)]
+
+
+class MicroBatcher:
+    """把并发提交的请求合并成批
+
+    第一个请求到达时开启 ``window`` 秒的时间窗口，窗口结束或攒够 ``max_size`` 个请求时，
+    把整批参数交给 ``run_batch`` 在生成线程中一次处理；``run_batch`` 按顺序返回每个请求的结果。
+    生成线程忙碌期间到达的请求自然累积成下一批。整批处理失败时逐个重试，
+    只有自身出错的请求收到异常，同批的其他请求照常返回。
+    """
+
+    def __init__(self, run_batch: Callable[[List[Dict[str, Any]]], List[Any]],
+                 executor: ThreadPoolExecutor,
+                 window: float = BATCH_WINDOW,
+                 max_size: int = MAX_BATCH_SIZE):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self.items = 0
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, params: Dict[str, Any]) -> Any:
+        """提交一个请求并等待其结果"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((params, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending = self._pending, []
+        if items:
+            asyncio.get_running_loop().create_task(self._run(items))
+
+    async def _run(self, items: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        self.batches += 1
+        self.items += len(items)
+        loop = asyncio.get_running_loop()
+        batch = [params for params, _ in items]
+        try:
+            results = await loop.run_in_executor(self.executor, self.run_batch, batch)
+        except Exception as exc:
+            if len(items) == 1:
+                outcomes = [(None, exc)]
+            else:
+                # 合并的批失败时逐个重试，出错的请求只影响它自己
+                outcomes = await loop.run_in_executor(self.executor, self._run_each, batch)
+        else:
+            outcomes = [(result, None) for result in results]
+        for (_, future), (result, exc) in zip(items, outcomes):
+            if future.done():
+                continue
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+    def _run_each(self, batch: List[Dict[str, Any]]) -> List[Tuple[Any, Optional[Exception]]]:
+        """逐个处理请求，返回每个请求的 (结果, 异常)"""
+        outcomes = []
+        for params in batch:
+            try:
+                outcomes.append((self.run_batch([params])[0], None))
+            except Exception as exc:
+                outcomes.append((None, exc))
+        return outcomes
+
+
+class PromptService:
+    """接口实现：参数校验在事件循环中完成，生成工作按批交给唯一的生成线程
+
+    生成器只在生成线程中被调用，无需加锁。
+    """
+
+    def __init__(self, generator: Optional[PromptGenerator] = None,
+                 window: float = BATCH_WINDOW,
+                 max_batch_size: int = MAX_BATCH_SIZE):
+        self.generator = generator or PromptGenerator()
+        if self.generator.analysis_cache is None:
+            self.generator.enable_analysis_cache()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prompt-generator")
+        self.metrics = Profiler()
+        self.batchers = {
+            "/random": MicroBatcher(self._random_batch, self.executor, window, max_batch_size),
+            "/variations": MicroBatcher(self._variations_batch, self.executor, window, max_batch_size),
+            "/analyze": MicroBatcher(self._analyze_batch, self.executor, window, max_batch_size),
+            "/complete": MicroBatcher(self._complete_batch, self.executor, window, max_batch_size),
+        }
+        self._parsers = {
+            "/random": self._parse_random,
+            "/variations": self._parse_variations,
+            "/analyze": self._parse_analyze,
+            "/complete": self._parse_complete,
+        }
+
+    # ---------- 参数解析 ----------
+
+    @staticmethod
+    def _int_param(params: Dict[str, Any], name: str, default: Optional[int],
+                   low: Optional[int] = None, high: Optional[int] = None) -> Optional[int]:
+        value = params.get(name, default)
+        if value is None:
+            return None
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"参数 {name} 必须是整数")
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise HTTPError(400, f"参数 {name} 超出范围 [{low}, {high}]")
+        return value
+
+    @staticmethod
+    def _bool_param(params: Dict[str, Any], name: str, default: bool) -> bool:
+        value = params.get(name, default)
+        if isinstance(value, str):
+            return value.lower() not in ("0", "false", "no", "")
+        return bool(value)
+
+    @staticmethod
+    def _text_param(params: Dict[str, Any], name: str) -> str:
+        value = params.get(name)
+        if not isinstance(value, str) or not value.strip():
+            raise HTTPError(400, f"缺少参数 {name}")
+        return value
+
+    def _parse_random(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "count": self._int_param(params, "count", 1, 1, MAX_COUNT),
+            "include_quality": self._bool_param(params, "include_quality", True),
+            "dimensions_count": self._int_param(params, "dimensions_count", 4, 1, len(self.generator.index.dimensions)),
+            "seed": self._int_param(params, "seed", None),
+        }
+
+    def _parse_variations(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        strategy = params.get("strategy", "单维度变奏")
+        if strategy not in STRATEGY_CODES:
+            raise HTTPError(400, f"未知的变奏策略：{strategy}")
+        return {
+            "prompt": self._text_param(params, "prompt"),
+            "strategy": strategy,
+            "count": self._int_param(params, "count", 5, 1, MAX_COUNT),
+            "seed": self._int_param(params, "seed", None),
+        }
+
+    def _parse_analyze(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "prompt": self._text_param(params, "prompt"),
+            "seed": self._int_param(params, "seed", None),
+        }
+
+    def _parse_complete(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "idea": self._text_param(params, "idea"),
+            "seed": self._int_param(params, "seed", None),
+        }
+
+    # ---------- 批处理（在生成线程中运行） ----------
+
+    def _random_batch(self, batch: List[Dict[str, Any]]) -> List[Any]:
+        """无种子的请求按 (质量词, 维度数) 合并为一次批量生成，再按请求数量切分"""
+        generator = self.generator
+        results: List[Any] = [None] * len(batch)
+        groups: Dict[Tuple[bool, int], List[int]] = {}
+        for i, params in enumerate(batch):
+            if params["seed"] is None:
+                groups.setdefault((params["include_quality"], params["dimensions_count"]), []).append(i)
+            else:
+                results[i] = [
+                    generator.generate_random_prompt(params["include_quality"], params["dimensions_count"], seed=seed)
+                    for seed in _sub_seeds(params["seed"], params["count"])
+                ]
+
+        for (include_quality, dimensions_count), members in groups.items():
+            total = sum(batch[i]["count"] for i in members)
+            rows = iter_random_prompts(generator, total, include_quality, dimensions_count)
+            for i in members:
+                results[i] = [next(rows) for _ in range(batch[i]["count"])]
+        return results
+
+    def _variations_batch(self, batch: List[Dict[str, Any]]) -> List[Any]:
+        """无种子的请求按 (基础提示词, 策略) 合并为一次 generate_variations 调用
+
+        渐进变奏同一次调用共享一个序列且数量受序列长度限制，因此逐个处理。
+        """
+        generator = self.generator
+        results: List[Any] = [None] * len(batch)
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for i, params in enumerate(batch):
+            if params["seed"] is None and params["strategy"] != "渐进变奏":
+                groups.setdefault((params["prompt"], params["strategy"]), []).append(i)
+            else:
+                results[i] = generator.generate_variations(
+                    params["prompt"], params["strategy"], params["count"], seed=params["seed"]
+                )
+
+        for (prompt, strategy), members in groups.items():
+            variations = generator.generate_variations(prompt, strategy, sum(batch[i]["count"] for i in members))
+            start = 0
+            for i in members:
+                results[i] = variations[start:start + batch[i]["count"]]
+                start += batch[i]["count"]
+        return results
+
+    def _analyze_batch(self, batch: List[Dict[str, Any]]) -> List[Any]:
+        analyze = self.generator.analyze_prompt
+        return [analyze(params["prompt"], seed=params["seed"]) for params in batch]
+
+    def _complete_batch(self, batch: List[Dict[str, Any]]) -> List[Any]:
+        complete = self.generator.generate_complete_prompt_set
+        return [complete(params["idea"], seed=params["seed"]) for params in batch]
+
+    # ---------- 请求分发 ----------
+
+    def stats(self) -> Dict[str, Any]:
+        """请求延迟统计与各接口的攒批情况"""
+        return {
+            "请求": self.metrics.snapshot(),
+            "分析缓存": self.generator.analysis_cache.stats(),
+            "攒批": {
+                path: {
+                    "批数": batcher.batches,
+                    "请求数": batcher.items,
+                    "平均批大小": batcher.items / batcher.batches if batcher.batches else 0.0,
+                }
+                for path, batcher in self.batchers.items()
+            },
+        }
+
+    async def handle(self, method: str, path: str, params: Dict[str, Any]) -> Any:
+        """处理一个请求，返回可 JSON 序列化的结果"""
+        if path == "/health":
+            return {"状态": "ok"}
+        if path == "/stats":
+            return self.stats()
+        parser = self._parsers.get(path)
+        if parser is None:
+            raise HTTPError(404, f"未知的接口：{path}")
+        if method not in ("GET", "POST"):
+            raise HTTPError(405, f"不支持的请求方法：{method}")
+
+        start = time.perf_counter_ns()
+        result = await self.batchers[path].submit(parser(params))
+        self.metrics.record(path, time.perf_counter_ns() - start)
+        return result
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes, str]]:
+    """读取一个 HTTP 请求，连接关闭时返回 None"""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "无效的请求行")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    # Content-Length 只能是十进制数字（int 还会接受正负号、下划线与空白）
+    length = headers.get("content-length", "") or "0"
+    if not length.isdecimal():
+        raise HTTPError(400, "无效的 Content-Length")
+    length = int(length)
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(413, "请求体过大")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body, version
+
+
+def _request_params(target: str, body: bytes) -> Tuple[str, Dict[str, Any]]:
+    """合并查询字符串与 JSON 请求体中的参数（请求体优先）"""
+    url = urlsplit(target)
+    params: Dict[str, Any] = dict(parse_qsl(url.query))
+    if body:
+        try:
+            payload = json.loads(body.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            raise HTTPError(400, "请求体不是有效的 JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "请求体必须是 JSON 对象")
+        params.update(payload)
+    return url.path.rstrip("/") or "/", params
+
+
+def _response(status: int, payload: Any, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                service: Optional[PromptService] = None):
+    """启动服务并一直运行"""
+    service = service or PromptService()
+
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body, version = request
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                    path, params = _request_params(target, body)
+                    status, payload = 200, await service.handle(method, path, params)
+                except HTTPError as exc:
+                    status, payload = exc.status, {"错误": exc.message}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as exc:
+                    status, payload = 500, {"错误": str(exc)}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle_connection, host, port)
+    bound_port = server.sockets[0].getsockname()[1]
+    print(f"🚀 服务已启动：http://{host}:{bound_port}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI图像生成提示词变奏创意助手 - HTTP 接口服务")
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                       help=f'监听地址（默认：{DEFAULT_HOST}）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help=f'监听端口，0 表示随机分配（默认：{DEFAULT_PORT}）')
+    parser.add_argument('--seed', type=int,
+                       help='生成器种子，指定后服务启动后的生成序列可复现')
+    parser.add_argument('--cooccurrence', metavar='FILE',
+                       help='共现矩阵文件，加载后 /analyze 与 /complete 的补充建议按共现概率排序')
+    parser.add_argument('--fuzzy', action='store_true',
+                       help='/analyze 与 /complete 启用模糊识别（错别字、大小写与全半角差异）')
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW * 1000,
+                       help=f'攒批时间窗口（毫秒，默认：{BATCH_WINDOW * 1000:g}）')
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE,
+                       help=f'单批最多合并的请求数（默认：{MAX_BATCH_SIZE}）')
+    args = parser.parse_args()
+
+    generator = PromptGenerator(seed=args.seed)
+    if args.cooccurrence:
+        generator.load_cooccurrence(args.cooccurrence)
+    if args.fuzzy:
+        generator.enable_fuzzy_matching()
+    service = PromptService(generator,
+                            window=args.batch_window / 1000,
+                            max_batch_size=args.max_batch_size)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
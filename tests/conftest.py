@@ -0,0 +1,21 @@
+"""测试公共设置：项目模块位于仓库根目录"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_generator import PromptGenerator  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def base_generator():
+    """构建一次的生成器；测试通过 spawn 派生，互不影响各自的可选功能"""
+    return PromptGenerator(seed=0)
+
+
+@pytest.fixture
+def generator(base_generator):
+    return base_generator.spawn(seed=1)
@@ -0,0 +1,45 @@
+import io
+import json
+
+import pytest
+
+import bulk
+from bulk import WRITE_BATCH_LINES, iter_random_prompts, iter_variations, open_output, write_jsonl
+
+
+@pytest.mark.parametrize("count", [0, 1, WRITE_BATCH_LINES, WRITE_BATCH_LINES + 1, 3 * WRITE_BATCH_LINES - 7])
+def test_write_jsonl_writes_one_line_per_row(count):
+    out = io.StringIO()
+    assert write_jsonl(({"序号": i, "文本": "猫"} for i in range(count)), out) == count
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line)["序号"] for line in lines] == list(range(count))
+    assert out.getvalue().endswith("\n") or count == 0
+
+
+def test_random_prompts_are_seeded(base_generator, tmp_path):
+    paths = [tmp_path / "a.jsonl", tmp_path / "b.jsonl"]
+    for path in paths:
+        generator = base_generator.spawn(seed=12)
+        with open_output(str(path)) as out:
+            assert write_jsonl(iter_random_prompts(generator, 600, dimensions_count=3), out) == 600
+    first = paths[0].read_text(encoding="utf-8")
+    assert first == paths[1].read_text(encoding="utf-8")
+    rows = [json.loads(line) for line in first.splitlines()]
+    assert len(rows) == 600 and all(len(row["维度分解"]) == 3 for row in rows)
+
+    other = list(iter_random_prompts(base_generator.spawn(seed=13), 600, dimensions_count=3))
+    assert other != rows
+
+
+def test_unique_prompts_do_not_repeat(generator):
+    rows = list(iter_random_prompts(generator, 500, dimensions_count=2, sampling="unique"))
+    assert len({tuple(row["维度分解"].items()) for row in rows}) == 500
+
+
+def test_variations_are_chunked_to_the_exact_count(base_generator, monkeypatch):
+    monkeypatch.setattr(bulk, "VARIATION_CHUNK_SIZE", 7)
+    rows = list(iter_variations(base_generator.spawn(seed=3), "未来城市", "跨维度组合", 30))
+    assert len(rows) == 30
+    assert rows == list(iter_variations(base_generator.spawn(seed=3), "未来城市", "跨维度组合", 30))
+    with pytest.raises(ValueError):
+        list(iter_variations(base_generator.spawn(seed=3), "未来城市", "对比变奏", 3, sampling="unique"))
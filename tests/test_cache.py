@@ -0,0 +1,80 @@
+import unicodedata
+
+import pytest
+
+from cache import AnalysisCache, LRUCache, _nfkc, matching_text, normalize_prompt
+
+
+PROMPTS = [
+    "８Ｋ画质的猫",
+    "Ross   Tran风格",
+    "Ross\tTran风格",
+    "Ross\nTran风格",
+    "赛博朋克风格的猫，霓虹灯光，８Ｋ，超精细",
+    "  赛博朋克 ,, 水彩 ；古代  ",
+    "２．５Ｄ效果",
+]
+
+
+def element_names(generator, prompt):
+    return [generator.index.elements[i] for i in generator.match_elements(prompt)]
+
+
+@pytest.mark.parametrize("prompt", PROMPTS)
+def test_cached_and_uncached_match_identical(generator, prompt):
+    uncached = element_names(generator, prompt)
+    generator.enable_analysis_cache()
+    assert element_names(generator, prompt) == uncached
+    # 第二次命中缓存
+    assert element_names(generator, prompt) == uncached
+
+
+def test_fullwidth_and_whitespace_are_folded(generator):
+    assert "8K" in element_names(generator, "８Ｋ画质的猫")
+    assert "Ross Tran" in element_names(generator, "Ross   Tran风格")
+
+
+@pytest.mark.parametrize("prompt", PROMPTS)
+def test_matching_text_equivalent_to_normalized(generator, prompt):
+    match = generator.matcher.match
+    assert list(match(matching_text(prompt))) == list(match(normalize_prompt(prompt)))
+
+
+def test_analyze_prompt_same_with_cache(generator):
+    prompt = "８Ｋ  画质，Ross   Tran风格的古代少女"
+    uncached = generator.analyze_prompt(prompt, seed=3)
+    generator.enable_analysis_cache()
+    assert generator.analyze_prompt(prompt, seed=3) == uncached
+
+
+def test_lookup_shares_normalized_entry():
+    cache = AnalysisCache(maxsize=8, ttl=None)
+    calls = []
+    match = lambda text: calls.append(text) or (len(text),)
+    assert cache.lookup("赛博朋克 ,水彩", match) == cache.lookup("赛博朋克，水彩", match)
+    assert calls == ["赛博朋克，水彩"]
+
+
+def test_lru_eviction_and_ttl():
+    now = [0.0]
+    cache = LRUCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.stats()["过期淘汰"] == 1
+
+
+@pytest.mark.parametrize("text", [
+    "赛博朋克，水彩；古代：猫！狗？｜８Ｋ",
+    "Ａ́，é",
+    "≠，≮",
+    "全角　空格，ﬁ①",
+    "已规范的文本, 8K",
+])
+def test_fast_nfkc_equals_unicodedata(text):
+    assert _nfkc(text) == unicodedata.normalize("NFKC", text)
@@ -0,0 +1,22 @@
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from columnar import write_columnar  # noqa: E402
+
+
+def test_parquet_keeps_seed_and_position(generator, tmp_path):
+    rows = list(generator.generate_stratified_prompts(30, seed=2))
+    rows += generator.generate_variations("古代的少女", "跨维度组合", 10)
+    path = str(tmp_path / "out.parquet")
+    assert write_columnar(rows, path, generator.index, batch_rows=16) == len(rows)
+
+    table = pq.read_table(path).to_pydict()
+    assert table["序号"] == [row.get("序号") for row in rows]
+    assert table["种子"] == [row["种子"] for row in rows]
+    assert table["提示词"] == [row.get("提示词", row.get("变奏")) for row in rows]
+
+    # 任意一行都能由表中的种子与序号重建
+    i = 21
+    rebuilt = next(generator.generate_stratified_prompts(1, seed=table["种子"][i], start=table["序号"][i]))
+    assert rebuilt == rows[i]
@@ -0,0 +1,65 @@
+import pytest
+
+from constraints import ElementConstraints
+
+
+BASE = "一位穿汉服的少女，古代"
+
+
+def _elements(generator, result):
+    if "维度分解" in result:
+        return list(result["维度分解"].values())
+    return result["元素"] if isinstance(result["元素"], list) else [result["元素"]]
+
+
+def _ids(generator, names):
+    return [generator.index.elements.index(name) for name in names]
+
+
+def test_random_prompts_never_violate(generator):
+    constraints = generator.enable_constraints()
+    for _ in range(2000):
+        prompt = generator.generate_random_prompt(dimensions_count=6)
+        assert constraints.violations(_ids(generator, _elements(generator, prompt))) == []
+
+
+@pytest.mark.parametrize("strategy", ["单维度变奏", "跨维度组合", "混合实验"])
+def test_variations_respect_base_prompt(generator, strategy):
+    generator.enable_constraints({"互斥": [["古代", ["赛博朋克", "科幻", "未来"]]]})
+    banned = {"赛博朋克", "科幻", "未来"}
+    for variation in generator.generate_variations(BASE, strategy, 500):
+        assert not banned & set(_elements(generator, variation))
+
+
+def test_requirement_needs_chosen_element(base_generator):
+    index = base_generator.index
+    constraints = ElementConstraints(index)
+    constraints.update({"依赖": [["赛博朋克", "城市"]]})
+    cyber, = _ids(base_generator, ["赛博朋克"])
+    dim_id = index.elem_dimension[cyber]
+    city = index.elements.index("城市")
+    assert not constraints.allowed(dim_id, 0, 0) >> cyber & 1
+    assert constraints.allowed(dim_id, 1 << city, 0) >> cyber & 1
+    assert constraints.violations([cyber]) and not constraints.violations([cyber, city])
+
+
+def test_unconstrained_dimensions_keep_the_same_draws(base_generator):
+    # 约束没有排除任何候选时，抽取结果与不设约束时相同
+    plain = base_generator.spawn(seed=4)
+    constrained = base_generator.spawn(seed=4)
+    constrained.enable_constraints({"互斥": [["古代", "赛博朋克"]]})
+    for _ in range(200):
+        a = plain.generate_random_prompt(dimensions_count=3)
+        b = constrained.generate_random_prompt(dimensions_count=3)
+        names = set(_elements(plain, a))
+        if not names & {"古代", "赛博朋克"}:
+            assert a == b
+
+
+def test_unknown_terms_are_rejected_atomically(base_generator):
+    constraints = ElementConstraints(base_generator.index)
+    with pytest.raises(ValueError):
+        constraints.update({"互斥": [["古代", "赛博朋克"], ["古代", "不存在的元素"]]})
+    assert not any(constraints.conflicts)
+    with pytest.raises(ValueError):
+        constraints.update({"排斥": []})
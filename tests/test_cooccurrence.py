@@ -0,0 +1,70 @@
+import pytest
+
+import cli
+from cooccurrence import CooccurrenceMatrix
+from corpus import analyze_corpus, corpus_index
+
+
+@pytest.fixture
+def matrix_file(base_generator, tmp_path):
+    matrix = CooccurrenceMatrix(base_generator.index)
+    matrix.update([[0, 5, 9], [0, 5], [3]])
+    path = tmp_path / "co.bin"
+    matrix.save(str(path))
+    return path
+
+
+def test_save_load_round_trip(base_generator, matrix_file):
+    loaded = CooccurrenceMatrix.load(str(matrix_file), base_generator.index)
+    assert loaded.prompts == 3
+    assert loaded.element_counts[0] == 2
+
+
+def test_truncated_file_raises_value_error(base_generator, matrix_file, tmp_path):
+    broken = tmp_path / "broken.bin"
+    broken.write_bytes(matrix_file.read_bytes()[:-8])
+    with pytest.raises(ValueError):
+        CooccurrenceMatrix.load(str(broken), base_generator.index)
+    with pytest.raises(ValueError):
+        CooccurrenceMatrix.load(str(_write(tmp_path / "junk.bin", b"not a matrix")), base_generator.index)
+
+
+def test_full_width_variant_counts_like_raw_prompt(generator):
+    raw, wide = "8K画质，Ross Tran风格", "８Ｋ画质，Ross   Tran风格"
+    matrices = []
+    for corpus in ([raw, raw], [raw, wide]):
+        matrix = CooccurrenceMatrix(corpus_index())
+        analyze_corpus(corpus, cooccurrence=matrix)
+        matrices.append(matrix)
+    assert matrices[1].counts == matrices[0].counts
+    assert matrices[1].element_counts == matrices[0].element_counts
+
+    index = generator.index
+    k8, ross = index.elements.index("8K"), index.elements.index("Ross Tran")
+    assert matrices[1].counts[k8 * matrices[1].size + ross] == 2
+
+    # 建议按 analyze_prompt 识别出的元素查询，全角写法与原写法得到相同的推荐
+    generator.set_cooccurrence(matrices[1])
+    assert (generator.analyze_prompt(wide, seed=1)["建议补充"]
+            == generator.analyze_prompt(raw, seed=1)["建议补充"])
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return path
+
+
+def _rejected(argv, capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.run(argv)
+    assert exc.value.code == 2
+    assert "--cooccurrence 无法使用" in capsys.readouterr().err
+
+
+def test_cli_rejects_unusable_file(tmp_path, capsys):
+    junk = str(_write(tmp_path / "junk.bin", b"not a matrix"))
+    _rejected(["--analyze", "猫", "--cooccurrence", str(tmp_path / "absent.bin")], capsys)
+    _rejected(["--analyze", "猫", "--cooccurrence", junk], capsys)
+    # 语料分析时文件不存在表示新建，已有文件损坏仍然报错
+    corpus = _write(tmp_path / "corpus.txt", "猫\n".encode("utf-8"))
+    _rejected(["--analyze-file", str(corpus), "--cooccurrence", junk], capsys)
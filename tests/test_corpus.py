@@ -0,0 +1,61 @@
+import io
+import json
+from collections import Counter
+
+import pytest
+
+from corpus import analyze_corpus, corpus_index, iter_corpus
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = tmp_path / "corpus.txt"
+    path.write_text("赛博朋克城市\n\n   \n水彩风格的猫\n\n古风少女\n", encoding="utf-8")
+    return path
+
+
+def _coverage(prompts, **kwargs):
+    out = io.StringIO()
+    stats = analyze_corpus(prompts, coverage_out=out, **kwargs)
+    return stats, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_numbered_lines_count_blank_lines(corpus_file):
+    assert list(iter_corpus(str(corpus_file), numbered=True)) == [
+        (1, "赛博朋克城市"), (4, "水彩风格的猫"), (6, "古风少女")]
+    assert list(iter_corpus(str(corpus_file))) == ["赛博朋克城市", "水彩风格的猫", "古风少女"]
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(1, 1000), (1, 2), (2, 1)])
+def test_coverage_position_is_file_line_number(corpus_file, workers, chunk_size):
+    stats, rows = _coverage(iter_corpus(str(corpus_file), numbered=True), numbered=True,
+                            workers=workers, chunk_size=chunk_size)
+    assert [row["序号"] for row in rows] == [1, 4, 6]
+    assert stats.prompts == 3
+    _, plain = _coverage(iter_corpus(str(corpus_file)), chunk_size=chunk_size)
+    assert [row["序号"] for row in plain] == [1, 2, 3]
+    assert [row["覆盖维度"] for row in plain] == [row["覆盖维度"] for row in rows]
+
+
+def test_jsonl_line_numbers(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    path.write_text('{"prompt": "猫"}\n\n"狗"\n', encoding="utf-8")
+    assert list(iter_corpus(str(path), numbered=True)) == [(1, "猫"), (3, "狗")]
+
+
+def test_counts_match_analyze_prompt_on_normalized_text(generator):
+    prompts = ["８Ｋ画质，Ross   Tran风格", "赛博朋克　城市，  霓虹灯", "ＣＧ渲染，水彩\t风格的猫", "8K画质，Ross Tran风格"]
+    stats = analyze_corpus(prompts, chunk_size=2)
+    index = corpus_index()
+
+    elements, dimensions = Counter(), Counter()
+    for prompt in prompts:
+        analysis = generator.analyze_prompt(prompt, seed=1)
+        dimensions.update(analysis["覆盖维度"])
+        for dimension, found in analysis["识别的元素"].items():
+            elements.update((dimension, item["元素"]) for item in found)
+    assert elements[("4.技术层", "8K")] == 2 and elements[("2.风格层", "Ross Tran")] == 2
+
+    assert {(index.dimensions[index.elem_dimension[i]], index.elements[i]): n
+            for i, n in enumerate(stats.element_counts) if n} == dict(elements)
+    assert {index.dimensions[i]: n for i, n in enumerate(stats.dimension_counts) if n} == dict(dimensions)
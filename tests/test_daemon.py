@@ -0,0 +1,83 @@
+import io
+import os
+import stat
+
+import pytest
+
+import cli
+import daemon
+
+
+def test_dash_argument_runs_locally():
+    assert daemon.uses_stdin(["--analyze-file", "-"])
+    assert daemon.uses_stdin(["--analyze-file=-"])
+    assert not daemon.uses_stdin(["--random", "--count", "3"])
+
+
+def test_piped_stdin_without_dash_goes_to_daemon(monkeypatch):
+    # shell 循环、xargs、cron、subprocess 调用时标准输入都不是终端
+    sent = []
+    monkeypatch.setattr(daemon, "request", lambda argv: sent.append(argv) or 0)
+    monkeypatch.setattr("sys.stdin", io.StringIO("a\nb\n"))
+    monkeypatch.setattr("sys.argv", ["cli.py", "--random", "--count", "3"])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 0
+    assert sent == [["--random", "--count", "3"]]
+
+
+def _start_daemon(path, handle):
+    import threading
+    import time
+
+    thread = threading.Thread(target=daemon.serve, args=(handle, path), daemon=True)
+    thread.start()
+    for _ in range(200):
+        if os.path.exists(path):
+            return
+        time.sleep(0.01)
+    raise RuntimeError("守护进程未启动")
+
+
+def test_request_round_trip(tmp_path, capfd):
+    path = str(tmp_path / "d.sock")
+
+    def handle(argv):
+        print(" ".join(argv))
+        return 3
+
+    _start_daemon(path, handle)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert daemon.request(["--random", "--count", "2"], path) == 3
+    assert capfd.readouterr().out == "--random --count 2\n"
+
+
+def test_client_refuses_foreign_socket(tmp_path, monkeypatch, capfd):
+    path = str(tmp_path / "d.sock")
+    _start_daemon(path, lambda argv: 0)
+    real_uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: real_uid + 1)
+    assert daemon.request(["--random"], path) is None
+    assert "不属于当前用户" in capfd.readouterr().err
+
+
+def test_default_directory_must_be_private(tmp_path, monkeypatch):
+    monkeypatch.delenv(daemon.SOCKET_ENV, raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    assert daemon.default_socket_path() == f"/tmp/prompt-cli-{os.getuid()}/daemon.sock"
+
+    private = tmp_path / "private"
+    daemon._prepare_directory(str(private / "daemon.sock"))
+    assert stat.S_IMODE(os.lstat(private).st_mode) == 0o700
+
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o755)
+    os.chmod(shared, 0o755)
+    with pytest.raises(RuntimeError):
+        daemon._prepare_directory(str(shared / "daemon.sock"))
+
+
+def test_xdg_runtime_dir_preferred(monkeypatch):
+    monkeypatch.delenv(daemon.SOCKET_ENV, raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert daemon.default_socket_path() == "/run/user/1000/prompt-cli.sock"
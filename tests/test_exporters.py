@@ -0,0 +1,112 @@
+import gzip
+import json
+
+import pytest
+
+from exporters import format_from_path, iter_export, iter_export_bytes, write_export
+
+
+@pytest.fixture
+def result(generator):
+    return generator.generate_complete_prompt_set("赛博朋克风格的猫", seed=5)
+
+
+def _export(result, fmt):
+    return "".join(iter_export(result, fmt))
+
+
+def _baseline_text(result):
+    """原 app.py「纯文本」导出"""
+    text = f"""AI图像生成提示词方案
+========================
+
+原始想法：{result['原始想法']}
+
+完整正向提示词：
+{result['完整正向提示词']}
+
+负向提示词：
+{result['负向提示词']}
+
+变奏方案：
+"""
+    for strategy_name, variations in result["变奏方案"].items():
+        text += f"\n{strategy_name}:\n"
+        for idx, var in enumerate(variations, 1):
+            text += f"  {idx}. {var['变奏']}\n"
+    return text
+
+
+def _baseline_markdown(result):
+    """原 app.py「Markdown」导出"""
+    text = f"""# AI图像生成提示词方案
+
+## 原始想法
+{result['原始想法']}
+
+## 完整提示词
+
+### 正向提示词
+```
+{result['完整正向提示词']}
+```
+
+### 负向提示词
+```
+{result['负向提示词']}
+```
+
+## 变奏方案
+"""
+    for strategy_name, variations in result["变奏方案"].items():
+        text += f"\n### {strategy_name}\n\n"
+        for idx, var in enumerate(variations, 1):
+            text += f"{idx}. `{var['变奏']}`\n\n"
+    return text
+
+
+def test_json_equals_json_dumps(result):
+    assert _export(result, "json") == json.dumps(result, ensure_ascii=False, indent=2)
+
+
+@pytest.mark.parametrize("value", [{}, [], {"a": []}, {"a": {"b": [1, {"c": [2, 3]}]}}, "文本", [None, True, 1.5]])
+def test_json_edge_values(value):
+    assert _export(value, "json") == json.dumps(value, ensure_ascii=False, indent=2)
+
+
+def test_lazy_variations_are_streamed(result):
+    lazy = {**result, "变奏方案": {name: iter(items) for name, items in result["变奏方案"].items()}}
+    assert _export(lazy, "json") == json.dumps(result, ensure_ascii=False, indent=2)
+
+
+def test_text_and_markdown_match_app_layout(result):
+    assert _export(result, "text") == _baseline_text(result)
+    assert _export(result, "markdown") == _baseline_markdown(result)
+
+
+def test_jsonl_has_one_variation_per_line(result):
+    rows = [json.loads(line) for line in _export(result, "jsonl").splitlines()]
+    assert len(rows) == sum(len(items) for items in result["变奏方案"].values())
+    assert {row["策略"] for row in rows} == set(result["变奏方案"])
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "markdown", "text"])
+def test_gzip_round_trip(result, fmt):
+    data = b"".join(iter_export_bytes(result, fmt, compress=True))
+    assert gzip.decompress(data).decode("utf-8") == _export(result, fmt)
+
+
+def test_write_export_infers_format_and_compression(result, tmp_path):
+    path = tmp_path / "plan.md.gz"
+    write_export(result, str(path))
+    assert gzip.decompress(path.read_bytes()).decode("utf-8") == _baseline_markdown(result)
+    plain = tmp_path / "plan.json"
+    write_export(result, str(plain))
+    assert plain.read_text(encoding="utf-8") == json.dumps(result, ensure_ascii=False, indent=2)
+
+
+def test_format_from_path():
+    assert [format_from_path(p) for p in ("a.JSONL", "b.ndjson.gz", "c.markdown", "d.txt", "e.bin")] == [
+        "jsonl", "jsonl", "markdown", "text", "json"]
+    with pytest.raises(ValueError):
+        iter_export({}, "xml")
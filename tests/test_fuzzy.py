@@ -0,0 +1,79 @@
+import pytest
+
+from fuzzy import FuzzyMatcher, fold, max_distance
+
+
+@pytest.fixture(scope="module")
+def matcher(base_generator):
+    return FuzzyMatcher(base_generator.index)
+
+
+def _found(matcher, text, exclude=()):
+    return {match.element: match for match in matcher.match(text, exclude)}
+
+
+@pytest.mark.parametrize("text, fragment", [
+    ("8k画质", "8k"),
+    ("８Ｋ画质", "８Ｋ"),
+    ("超清 8 K，电影感", "8 K"),
+])
+def test_folding_matches_short_elements(matcher, text, fragment):
+    match = _found(matcher, text)["8K"]
+    assert match.distance == 0
+    assert match.confidence == 1.0
+    assert match.fragment == fragment
+
+
+def test_single_character_element_in_own_segment(matcher):
+    assert _found(matcher, "春，樱花")["春"].distance == 0
+
+
+def test_max_distance_by_length():
+    assert [max_distance(n) for n in (1, 2, 3, 5, 6, 9, 10)] == [0, 0, 1, 1, 2, 2, 3]
+
+
+def test_one_edit_in_three_character_element(matcher):
+    match = _found(matcher, "暖色凋的画面")["暖色调"]
+    assert match.distance == 1
+    assert match.fragment == "暖色凋"
+    assert match.confidence == pytest.approx(2 / 3)
+
+
+def test_typo_in_longer_element(matcher):
+    match = _found(matcher, "赛博朋客风格的猫")["赛博朋克"]
+    assert (match.distance, match.fragment) == (1, "赛博朋客")
+
+
+def test_short_elements_need_exact_fold(matcher):
+    # 两个字的元素错一个字即是另一个词，不做近似识别
+    assert "8K" not in _found(matcher, "9K画质")
+
+
+def test_exact_elements_are_not_reinterpreted(matcher):
+    assert "暖色调" not in _found(matcher, "冷色调的春天", exclude=["冷色调", "春"])
+    assert "冷色调" not in _found(matcher, "冷色调的春天", exclude=["冷色调", "春"])
+
+
+def test_min_confidence_filters(base_generator):
+    strict = FuzzyMatcher(base_generator.index, min_confidence=0.7)
+    assert "暖色调" not in _found(strict, "暖色凋的画面")
+    assert "赛博朋克" in _found(strict, "赛博朋客风格的猫")
+
+
+def test_analyze_prompt_reports_folded_element(generator):
+    generator.enable_fuzzy_matching()
+    found = generator.analyze_prompt("8k画质，暖色凋", seed=1)["模糊识别"]
+    assert {item["元素"]: item["原文"] for item in found} == {"8K": "8k", "暖色调": "暖色凋"}
+    assert fold("８Ｋ") == "8k"
+
+
+def test_spawned_generators_keep_their_own_threshold(base_generator):
+    base_generator.build_fuzzy_matcher()
+    assert base_generator.fuzzy_matcher is None
+    strict, loose = base_generator.spawn(seed=1), base_generator.spawn(seed=2)
+    strict.enable_fuzzy_matching(min_confidence=0.7)
+    loose.enable_fuzzy_matching()
+    assert strict.fuzzy_matcher is loose.fuzzy_matcher
+    assert "模糊识别" not in base_generator.analyze_prompt("暖色凋", seed=1)
+    assert strict.analyze_prompt("暖色凋", seed=1)["模糊识别"] == []
+    assert [item["元素"] for item in loose.analyze_prompt("暖色凋", seed=1)["模糊识别"]] == ["暖色调"]
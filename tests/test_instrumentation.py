@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from instrumentation import PUBLIC_METHODS, STRATEGY_METHODS, MethodStats, Profiler
+
+
+SNAPSHOT_KEYS = {"调用次数", "累计耗时_ms", "平均_us", "p50_us", "p90_us", "p99_us", "最大_us"}
+
+
+def test_attach_and_detach_restore_the_methods(generator):
+    originals = {name: getattr(generator, name) for name in PUBLIC_METHODS + tuple(STRATEGY_METHODS)}
+    profiler = generator.enable_profiling()
+    assert all(getattr(generator, name).__profiled__ for name in originals)
+    # 重复挂载不会重复包装
+    profiler.attach(generator)
+    generator.generate_random_prompt(seed=1)
+    assert profiler.stats["generate_random_prompt"].calls == 1
+
+    generator.disable_profiling()
+    assert generator.profiler is None
+    assert {name: getattr(generator, name) for name in originals} == originals
+    assert not any(name in generator.__dict__ for name in originals)
+
+
+def test_profiled_results_are_unchanged(base_generator):
+    plain, profiled = base_generator.spawn(seed=4), base_generator.spawn(seed=4)
+    profiled.enable_profiling()
+    assert profiled.generate_variations("未来城市", "混合实验", 5) == plain.generate_variations("未来城市", "混合实验", 5)
+    assert profiled.profiler.stats["策略.混合实验"].calls == 1
+
+
+def test_snapshot_keys_and_order(generator, tmp_path):
+    profiler = generator.enable_profiling()
+    generator.analyze_prompt("赛博朋克风格的猫", seed=1)
+    generator.generate_variations("未来城市", "单维度变奏", 3)
+    snapshot = profiler.snapshot()
+    assert {"开始时间", "快照时间", "方法"} <= set(snapshot)
+    methods = snapshot["方法"]
+    assert {"analyze_prompt", "generate_variations", "策略.单维度变奏"} <= set(methods)
+    assert all(set(stats) == SNAPSHOT_KEYS for stats in methods.values())
+    totals = [stats["累计耗时_ms"] for stats in methods.values()]
+    assert totals == sorted(totals, reverse=True)
+
+    path = tmp_path / "profile.json"
+    profiler.save(str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["方法"].keys() == methods.keys()
+    assert profiler.format_table().splitlines()[0].startswith("方法")
+
+    profiler.reset()
+    assert profiler.snapshot()["方法"] == {}
+
+
+def test_percentiles_from_recorded_samples():
+    profiler = Profiler()
+    for us in range(1, 101):
+        profiler.record("m", us * 1000)
+    stats = profiler.snapshot()["方法"]["m"]
+    assert stats["调用次数"] == 100
+    assert (stats["p50_us"], stats["p90_us"], stats["p99_us"], stats["最大_us"]) == (51, 91, 100, 100)
+    assert stats["平均_us"] == pytest.approx(50.5)
+    assert MethodStats().snapshot()["p99_us"] == 0.0
+
+
+def test_reservoir_keeps_a_bounded_sample():
+    profiler = Profiler(reservoir_size=16)
+    for ns in range(1000):
+        profiler.record("m", ns)
+    stats = profiler.stats["m"]
+    assert stats.calls == 1000 and len(stats.samples) == 16
+    assert stats.max_ns == 999
@@ -0,0 +1,65 @@
+import random
+from collections import Counter
+
+import pytest
+
+from keyword_pool import KeywordPool, build_negative_pools, build_quality_pools
+from prompt_pyramid import NEGATIVE_PROMPTS, QUALITY_KEYWORDS
+
+
+WORDS = ["杰作", "最佳质量", "高细节", "8K", "锐利"]
+
+
+def test_uniform_sample_equals_random_sample():
+    pool = KeywordPool(WORDS)
+    a, b = random.Random(3), random.Random(3)
+    for k in (1, 3, 5, 9):
+        assert pool.sample(k, a) == b.sample(WORDS, min(k, len(WORDS)))
+    assert pool.sample_batch(4, 2, a) == ["，".join(b.sample(WORDS, 2)) for _ in range(4)]
+
+
+def test_zero_weight_words_are_never_drawn():
+    pool = KeywordPool(WORDS).with_weights({"杰作": 0, "8K": 0})
+    rng = random.Random(0)
+    drawn = Counter(word for _ in range(2000) for word in pool.sample(2, rng))
+    assert set(drawn) == {"最佳质量", "高细节", "锐利"}
+
+
+def test_sample_sizes_weighted_versus_uniform():
+    rng = random.Random(1)
+    uniform = KeywordPool(WORDS)
+    weighted = KeywordPool(WORDS, [5, 0, 1, 0, 2])
+    assert [len(uniform.sample(k, rng)) for k in (0, 2, 5, 8)] == [0, 2, 5, 5]
+    # 带权抽取只从正权重的关键词中选，k 超过其数量时只返回全部正权重关键词
+    assert [len(weighted.sample(k, rng)) for k in (0, 2, 3, 8)] == [0, 2, 3, 3]
+    assert all(len(row.split("，")) == 3 for row in weighted.sample_batch(10, 8, rng))
+    assert len(set(weighted.sample(3, rng))) == 3
+
+
+def test_heavier_words_are_drawn_more_often():
+    pool = KeywordPool(WORDS).with_weights({"杰作": 20})
+    rng = random.Random(2)
+    first = Counter(pool.sample(1, rng)[0] for _ in range(5000))
+    assert first["杰作"] / 5000 == pytest.approx(20 / 24, abs=0.03)
+
+
+def test_invalid_weights_are_rejected():
+    with pytest.raises(ValueError):
+        KeywordPool(WORDS, [1, 2])
+    with pytest.raises(ValueError):
+        KeywordPool(WORDS, [1, 1, -1, 1, 1])
+
+
+def test_enumeration_is_deterministic():
+    pool = KeywordPool(WORDS[:4])
+    assert len(list(pool.enumerate_combinations(2))) == 6
+    assert len(list(pool.enumerate_combinations(2, ordered=True))) == 12
+    assert list(pool.enumerate_combinations(9)) == [tuple(WORDS[:4])]
+
+
+def test_prebuilt_pools_follow_the_keyword_tables():
+    quality = build_quality_pools(QUALITY_KEYWORDS)
+    assert quality["通用"].words == tuple(QUALITY_KEYWORDS["通用质量词"])
+    negative = build_negative_pools(NEGATIVE_PROMPTS)
+    assert negative["全部"].words == tuple(word for words in NEGATIVE_PROMPTS.values() for word in words)
+    assert set(negative) == {name[:-len("负面词")] for name in NEGATIVE_PROMPTS} | {"全部"}
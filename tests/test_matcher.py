@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from cache import matching_text
+from matcher import AhoCorasick, ElementMatcher
+from prompt_pyramid import PROMPT_PYRAMID
+
+
+def _baseline_found(prompt):
+    """原 analyze_prompt 的逐元素扫描：按金字塔顺序检查 element in prompt"""
+    found = {}
+    for dimension, dim_info in PROMPT_PYRAMID["结构"]["一级维度"].items():
+        elements = [
+            {"子维度": subdim, "类别": category, "元素": element}
+            for subdim, options in dim_info.get("子维度", {}).items()
+            for category, items in options.items()
+            for element in items
+            if element in prompt
+        ]
+        if elements:
+            found[dimension] = elements
+    return found
+
+
+def _random_prompts(index, count, seed=0):
+    """随机拼接元素、元素片段与元素中的字符，制造相邻、重叠与嵌套的命中"""
+    rng = random.Random(seed)
+    elements = index.elements
+    chars = sorted(set("".join(elements)))
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 8)):
+            element = rng.choice(elements)
+            kind = rng.random()
+            if kind < 0.5:
+                parts.append(element)
+            elif kind < 0.75:
+                start = rng.randrange(len(element))
+                parts.append(element[start:rng.randint(start + 1, len(element))])
+            else:
+                parts.append("".join(rng.choice(chars) for _ in range(rng.randint(1, 4))))
+            parts.append(rng.choice(["", "", "，", "、", " ", "的"]))
+        yield "".join(parts)
+
+
+def test_automaton_reports_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers", ""])
+    assert automaton.find_ids("ushers") == {0, 1, 3}
+    assert automaton.find_ids("ahishe") == {0, 1, 2}
+    assert automaton.find_ids("") == set()
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("风格化渲染的猫", {"风格化渲染", "风"}),
+    ("冷色调暖色调", {"冷色调", "暖色调"}),
+    ("暖色调", {"暖色调"}),
+    ("风", {"风"}),
+])
+def test_nested_and_adjacent_elements(base_generator, prompt, expected):
+    index = base_generator.index
+    names = {index.elements[i] for i in ElementMatcher(index).match(prompt)}
+    assert expected <= names
+    assert names == {element for element in index.elements if element in prompt}
+
+
+def test_matcher_equals_substring_scan(base_generator):
+    index = base_generator.index
+    matcher = ElementMatcher(index)
+    for prompt in _random_prompts(index, 3000):
+        assert matcher.match(prompt) == [i for i, element in enumerate(index.elements) if element in prompt]
+
+
+def test_analyze_prompt_equals_baseline_scan(generator):
+    for prompt in _random_prompts(generator.index, 3000, seed=1):
+        analysis = generator.analyze_prompt(prompt, seed=1)
+        expected = _baseline_found(matching_text(prompt))
+        assert analysis["识别的元素"] == expected
+        assert analysis["覆盖维度"] == list(expected)
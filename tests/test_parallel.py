@@ -0,0 +1,35 @@
+import pytest
+
+from parallel import SHARD_SIZE, derive_seed, generate_parallel, plan_shards
+
+
+def test_derive_seed_is_stable():
+    assert derive_seed(1, 0) == derive_seed(1, 0)
+    assert derive_seed(1, 0) != derive_seed(1, 1)
+
+
+def test_plan_shards_independent_of_workers():
+    shards = plan_shards("random", SHARD_SIZE + 5, {})
+    assert shards == [(0, 0, SHARD_SIZE), (1, SHARD_SIZE, 5)]
+    assert plan_shards("variations", 30, {"strategy": "渐进变奏"}) == [(0, 0, 30)]
+
+
+@pytest.mark.parametrize("kind, params", [
+    ("random", {"dimensions_count": 4}),
+    ("variations", {"base_prompt": "古代的少女", "strategy": "混合实验"}),
+])
+def test_same_seed_same_rows_for_any_worker_count(kind, params):
+    options = {"constraints": {"互斥": [["古代", "赛博朋克"]]}, "weights": {"元素": {"体积光": 20}}}
+    serial = list(generate_parallel(kind, 50, workers=1, seed=7, generator_options=options, **params))
+    pooled = list(generate_parallel(kind, 50, workers=2, seed=7, generator_options=options, **params))
+    assert serial == pooled
+    assert serial != list(generate_parallel(kind, 50, workers=1, seed=8, generator_options=options, **params))
+
+
+def test_generator_options_reach_workers():
+    options = {"fuzzy": True}
+    rows = list(generate_parallel("complete", 1, workers=2, seed=3, generator_options=options,
+                                  base_idea="赛博蓬克风格的猫"))
+    assert "模糊识别" in rows[0]["分析结果"]
+    plain = list(generate_parallel("complete", 1, workers=1, seed=3, base_idea="赛博蓬克风格的猫"))
+    assert "模糊识别" not in plain[0]["分析结果"]
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+import pipeline
+from cooccurrence import CooccurrenceMatrix
+from pipeline import default_checkpoint_path, run_complete_file
+
+
+IDEAS = ["未来城市", "", "古风少女", "赛博朋克的猫", "  ", "雨夜街道", "海底遗迹", "山间小屋", "星空下的鲸"]
+
+
+class _Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def ideas_file(tmp_path):
+    path = tmp_path / "ideas.txt"
+    path.write_text("\n".join(IDEAS) + "\n", encoding="utf-8")
+    return path
+
+
+def test_resume_writes_the_same_bytes(ideas_file, tmp_path, monkeypatch):
+    expected = tmp_path / "full.jsonl"
+    summary = run_complete_file(str(ideas_file), str(expected), seed=11, chunk_lines=2)
+    assert summary["行号"] == len(IDEAS)
+
+    # 每个分块后都保存检查点，保存第二次后中断，并在输出末尾留下写了一半的行
+    monkeypatch.setattr(pipeline, "CHECKPOINT_INTERVAL", 0)
+    saves = []
+
+    def interrupt(checkpoint):
+        saves.append(checkpoint.line_no)
+        if len(saves) == 2:
+            raise _Interrupted
+
+    output = tmp_path / "resumed.jsonl"
+    with pytest.raises(_Interrupted):
+        run_complete_file(str(ideas_file), str(output), seed=11, chunk_lines=2, progress=interrupt)
+    with open(output, "ab") as f:
+        f.write(b'{"\xe8\xa1\x8c\xe5\x8f\xb7":')
+
+    summary = run_complete_file(str(ideas_file), str(output), chunk_lines=3)
+    assert summary["续跑"] and summary["主种子"] == 11
+    assert output.read_bytes() == expected.read_bytes()
+    assert not os.path.exists(default_checkpoint_path(str(output)))
+
+
+def test_output_is_independent_of_workers(ideas_file, tmp_path):
+    single, pooled = tmp_path / "single.jsonl", tmp_path / "pooled.jsonl"
+    run_complete_file(str(ideas_file), str(single), seed=5, chunk_lines=2)
+    run_complete_file(str(ideas_file), str(pooled), seed=5, chunk_lines=3, workers=2)
+    assert single.read_bytes() == pooled.read_bytes()
+
+
+def test_resume_refuses_a_different_seed(ideas_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "CHECKPOINT_INTERVAL", 0)
+
+    def interrupt(checkpoint):
+        raise _Interrupted
+
+    output = tmp_path / "out.jsonl"
+    with pytest.raises(_Interrupted):
+        run_complete_file(str(ideas_file), str(output), seed=1, chunk_lines=2, progress=interrupt)
+    assert os.path.exists(default_checkpoint_path(str(output)))
+    with pytest.raises(ValueError):
+        run_complete_file(str(ideas_file), str(output), seed=2)
+
+
+@pytest.mark.parametrize("options", [
+    {"fuzzy": True},
+    {"weights": {"元素": {"赛博朋克": 5.0}}},
+    {"constraints": {"互斥": [["古代", "赛博朋克"]]}},
+])
+def test_resume_refuses_different_options(ideas_file, tmp_path, monkeypatch, options):
+    monkeypatch.setattr(pipeline, "CHECKPOINT_INTERVAL", 0)
+
+    def interrupt(checkpoint):
+        raise _Interrupted
+
+    output = tmp_path / "out.jsonl"
+    with pytest.raises(_Interrupted):
+        run_complete_file(str(ideas_file), str(output), seed=1, chunk_lines=2, progress=interrupt)
+    with pytest.raises(ValueError, match="--" + next(iter(options))):
+        run_complete_file(str(ideas_file), str(output), **options)
+
+    # 选项相同（重新读入的权重 / 约束与原值相等）时照常续跑
+    with pytest.raises(_Interrupted):
+        run_complete_file(str(ideas_file), str(tmp_path / "b.jsonl"), seed=1, chunk_lines=2,
+                          progress=interrupt, **options)
+    assert run_complete_file(str(ideas_file), str(tmp_path / "b.jsonl"), **options)["续跑"]
+
+
+def test_resume_refuses_an_updated_cooccurrence_file(base_generator, ideas_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "CHECKPOINT_INTERVAL", 0)
+    matrix = CooccurrenceMatrix(base_generator.index)
+    matrix.update([[0, 5]])
+    matrix_path = str(tmp_path / "co.bin")
+    matrix.save(matrix_path)
+
+    def interrupt(checkpoint):
+        raise _Interrupted
+
+    output = tmp_path / "out.jsonl"
+    with pytest.raises(_Interrupted):
+        run_complete_file(str(ideas_file), str(output), seed=1, chunk_lines=2,
+                          cooccurrence=matrix_path, progress=interrupt)
+    with pytest.raises(ValueError, match="--cooccurrence"):
+        run_complete_file(str(ideas_file), str(output))
+    matrix.update([[0, 9]])
+    matrix.save(matrix_path)
+    with pytest.raises(ValueError, match="--cooccurrence"):
+        run_complete_file(str(ideas_file), str(output), cooccurrence=matrix_path)
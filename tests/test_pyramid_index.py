@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from prompt_pyramid import PROMPT_PYRAMID
+from pyramid_index import PyramidIndex
+
+
+DIMENSIONS = PROMPT_PYRAMID["结构"]["一级维度"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return PyramidIndex(PROMPT_PYRAMID)
+
+
+def _baseline_element(rng, dimension):
+    """原 random_element_from_dimension：逐级 random.choice"""
+    subdimensions = list(DIMENSIONS[dimension].get("子维度", {}).keys())
+    if not subdimensions:
+        return ""
+    options = DIMENSIONS[dimension]["子维度"][rng.choice(subdimensions)]
+    if options:
+        elements = options[rng.choice(list(options.keys()))]
+        if elements:
+            return rng.choice(elements)
+    return ""
+
+
+def test_offsets_follow_the_nested_pyramid(index):
+    assert index.dimensions == tuple(DIMENSIONS)
+    for dim_id, (dimension, dim_info) in enumerate(DIMENSIONS.items()):
+        s0, s1 = index.subdimension_range(dim_id)
+        assert index.subdimension_names(dim_id) == tuple(dim_info.get("子维度", {}))
+        for sub_id, options in zip(range(s0, s1), dim_info.get("子维度", {}).values()):
+            c0, c1 = index.category_range(sub_id)
+            assert index.categories[c0:c1] == tuple(options)
+            for cat_id, items in zip(range(c0, c1), options.values()):
+                e0, e1 = index.element_range(cat_id)
+                assert index.elements[e0:e1] == tuple(items)
+    assert len(index) == sum(len(items) for dim_info in DIMENSIONS.values()
+                             for options in dim_info.get("子维度", {}).values()
+                             for items in options.values())
+
+
+def test_owner_lookup(index):
+    for dim_id in range(len(index.dimensions)):
+        e0, e1 = index.dimension_element_range(dim_id)
+        assert all(index.elem_dimension[e] == dim_id for e in range(e0, e1))
+    for elem_id in range(len(index)):
+        owner = index.describe_element(elem_id)
+        options = DIMENSIONS[owner["维度"]]["子维度"][owner["子维度"]]
+        assert owner["元素"] in options[owner["类别"]]
+        assert index.subdimensions[index.elem_subdimension[elem_id]] == owner["子维度"]
+    assert index.dimension_id(index.dimensions[2]) == 2
+    assert index.dimension_id("不存在") is None
+
+
+def test_draws_match_hierarchical_choice(index):
+    # randbelow 与 random.choice 消耗同一随机序列，同一种子逐条抽出相同的元素
+    ours, theirs = random.Random(7), random.Random(7)
+    for _ in range(3000):
+        dimension = theirs.choice(index.dimensions)
+        dim_id = ours.choice(range(len(index.dimensions)))
+        assert index.elements[index.random_element_id(dim_id, ours._randbelow)] == _baseline_element(theirs, dimension)
+
+
+def test_empty_levels_return_minus_one():
+    index = PyramidIndex({"结构": {"一级维度": {
+        "空维度": {"描述": ""},
+        "空类别": {"子维度": {"子": {}}},
+        "空元素": {"子维度": {"子": {"类": []}}},
+    }}})
+    assert [index.random_element_id(d, random.Random(0)._randbelow) for d in range(3)] == [-1, -1, -1]
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from sampler import FeistelPermutation, StratifiedSampler
+
+
+@pytest.mark.parametrize("n", [1, 7, 100, 1000])
+def test_feistel_is_a_permutation(n):
+    permutation = FeistelPermutation(n, seed=3)
+    assert sorted(permutation(i) for i in range(n)) == list(range(n))
+
+
+def test_stratified_deck_covers_each_dimension_once_per_round(base_generator):
+    index = base_generator.index
+    sampler = StratifiedSampler(index, random.Random(1))
+    for dim_id in sampler.dimension_ids:
+        start, end = index.dimension_element_range(dim_id)
+        dealt = [sampler.element(dim_id) for _ in range(end - start)]
+        assert sorted(dealt) == list(range(start, end))
+
+
+def test_stratified_prompts_cover_all_elements_quickly(generator):
+    index = generator.index
+    widest = max(end - start for start, end in
+                 (index.dimension_element_range(d) for d in range(len(index.dimensions))))
+    bound = -(-widest * len(index.dimensions) // 4) + len(index.dimensions)
+    seen = set()
+    for prompt in generator.generate_stratified_prompts(bound, dimensions_count=4, seed=2):
+        seen.update(prompt["维度分解"].values())
+    assert seen == set(index.elements)
+
+
+def test_stratified_row_rebuilt_from_seed_and_position(generator):
+    rows = list(generator.generate_stratified_prompts(50, seed=8))
+    row = rows[37]
+    rebuilt, = generator.generate_stratified_prompts(1, seed=row["种子"], start=row["序号"])
+    assert rebuilt == row
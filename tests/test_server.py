@@ -0,0 +1,125 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from server import HTTPError, MAX_BODY_SIZE, MAX_COUNT, MicroBatcher, PromptService, _read_request
+
+
+def _read(raw: bytes):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await _read_request(reader)
+    return asyncio.run(read())
+
+
+def test_reads_body_by_content_length():
+    method, target, headers, body, version = _read(
+        b"POST /random HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}extra")
+    assert (method, target, body, version) == ("POST", "/random", b"{}", "HTTP/1.1")
+    assert _read(b"GET /health HTTP/1.1\r\n\r\n")[3] == b""
+
+
+@pytest.mark.parametrize("value", [b"abc", b"-5", b"+5", b"1_0", b"0x10", b"\xb2"])
+def test_invalid_content_length_is_bad_request(value):
+    with pytest.raises(HTTPError) as exc:
+        _read(b"POST /random HTTP/1.1\r\nContent-Length: " + value + b"\r\n\r\n{}")
+    assert exc.value.status == 400
+
+
+def test_oversized_body_is_rejected():
+    with pytest.raises(HTTPError) as exc:
+        _read(b"POST /random HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY_SIZE + 1))
+    assert exc.value.status == 413
+
+
+def test_batcher_merges_and_splits_in_order():
+    calls = []
+
+    def run_batch(batch):
+        calls.append(batch)
+        return [params["n"] * 10 for params in batch]
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = MicroBatcher(run_batch, executor, window=0.05, max_size=3)
+            results = await asyncio.gather(*(batcher.submit({"n": n}) for n in range(5)))
+            return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert results == [0, 10, 20, 30, 40]
+    # 攒够 max_size 立即处理，其余的在时间窗口结束时成批处理
+    assert calls == [[{"n": 0}, {"n": 1}, {"n": 2}], [{"n": 3}, {"n": 4}]]
+    assert (batcher.batches, batcher.items) == (2, 5)
+
+
+def test_batch_failure_only_fails_the_bad_request():
+    def run_batch(batch):
+        if any(params["n"] < 0 for params in batch):
+            raise ValueError("bad")
+        return [params["n"] for params in batch]
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = MicroBatcher(run_batch, executor, window=0.05)
+            return await asyncio.gather(*(batcher.submit({"n": n}) for n in (1, -1, 2)),
+                                        return_exceptions=True)
+
+    first, bad, last = asyncio.run(run())
+    assert (first, last) == (1, 2)
+    assert isinstance(bad, ValueError)
+
+
+@pytest.fixture
+def service(base_generator):
+    service = PromptService(base_generator.spawn(seed=5), window=0.05)
+    yield service
+    service.close()
+
+
+def test_service_splits_merged_requests(service):
+    async def run():
+        return await asyncio.gather(
+            service.handle("GET", "/random", {"count": "2"}),
+            service.handle("POST", "/random", {"count": 3, "dimensions_count": 2}),
+            service.handle("POST", "/random", {"count": 1}),
+            service.handle("POST", "/variations", {"prompt": "未来城市", "count": 2}),
+            service.handle("POST", "/variations", {"prompt": "未来城市", "count": 3}),
+        )
+
+    two, three, one, v2, v3 = asyncio.run(run())
+    assert [len(r) for r in (two, three, one, v2, v3)] == [2, 3, 1, 2, 3]
+    assert all(len(row["维度分解"]) == 2 for row in three)
+    assert len({row["种子"] for row in two + one}) == 3
+    assert len({row["种子"] for row in v2 + v3}) == 5
+    stats = service.stats()["攒批"]
+    assert stats["/random"] == {"批数": 1, "请求数": 3, "平均批大小": 3.0}
+    assert stats["/variations"]["批数"] == 1
+
+
+def test_service_seeded_requests_are_reproducible(service):
+    async def run():
+        return await asyncio.gather(
+            service.handle("POST", "/random", {"count": 3, "seed": 42}),
+            service.handle("POST", "/analyze", {"prompt": "赛博朋克风格的猫", "seed": 7}),
+        )
+
+    first = asyncio.run(run())
+    assert asyncio.run(run()) == first
+    assert first[1] == service.generator.analyze_prompt("赛博朋克风格的猫", seed=7)
+
+
+@pytest.mark.parametrize("method, path, params, status", [
+    ("GET", "/nothing", {}, 404),
+    ("DELETE", "/random", {}, 405),
+    ("POST", "/random", {"count": "many"}, 400),
+    ("POST", "/random", {"count": MAX_COUNT + 1}, 400),
+    ("POST", "/variations", {"prompt": "猫", "strategy": "不存在"}, 400),
+    ("POST", "/analyze", {"prompt": "  "}, 400),
+])
+def test_service_rejects_bad_requests(service, method, path, params, status):
+    with pytest.raises(HTTPError) as exc:
+        asyncio.run(service.handle(method, path, params))
+    assert exc.value.status == status
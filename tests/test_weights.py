@@ -0,0 +1,67 @@
+import random
+from collections import Counter
+
+import pytest
+
+from weights import AliasTable, ElementWeights
+
+
+@pytest.mark.parametrize("weights", [[1, 1, 1, 1], [5, 1, 0, 2], [0.1, 10, 3], [7]])
+def test_alias_table_matches_distribution(weights):
+    table = AliasTable(weights)
+    rng = random.Random(0)
+    draws = 200000
+    counts = Counter(table.sample(rng.random) for _ in range(draws))
+    total = sum(weights)
+    for i, w in enumerate(weights):
+        assert counts[i] / draws == pytest.approx(w / total, abs=0.005)
+        if w == 0:
+            assert counts[i] == 0
+
+
+def test_alias_table_rejects_empty_weights():
+    with pytest.raises(ValueError):
+        AliasTable([])
+    with pytest.raises(ValueError):
+        AliasTable([0, 0])
+
+
+def _uniform_probabilities(index, dim_id):
+    """逐级等概率抽取下各元素的理论概率"""
+    result = {}
+    s0, s1 = index.subdimension_range(dim_id)
+    for sub_id in range(s0, s1):
+        c0, c1 = index.category_range(sub_id)
+        for cat_id in range(c0, c1):
+            e0, e1 = index.element_range(cat_id)
+            for elem_id in range(e0, e1):
+                result[elem_id] = 1 / (s1 - s0) / (c1 - c0) / (e1 - e0)
+    return result
+
+
+def test_unit_weights_equal_hierarchical_uniform(base_generator):
+    index = base_generator.index
+    weights = ElementWeights(index)
+    for dim_id in range(len(index.dimensions)):
+        expected = _uniform_probabilities(index, dim_id)
+        actual = weights.probabilities(dim_id)
+        assert actual.keys() == expected.keys()
+        assert all(actual[e] == pytest.approx(p) for e, p in expected.items())
+
+
+def test_weighted_draws_follow_weights(generator):
+    index = generator.index
+    dim_id = index.elem_dimension[index.elements.index("赛博朋克")]
+    generator.set_element_weights({"元素": {"赛博朋克": 50.0}})
+    probabilities = generator.element_weights.probabilities(dim_id)
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+    draws = 20000
+    hits = sum(generator.random_element_from_dimension(index.dimensions[dim_id]) == "赛博朋克"
+               for _ in range(draws))
+    target = sum(p for e, p in probabilities.items() if index.elements[e] == "赛博朋克")
+    assert hits / draws == pytest.approx(target, abs=0.02)
+
+    # 权重为 0 的元素不会被抽中
+    generator.set_element_weights({"元素": {"赛博朋克": 0}})
+    assert all(generator.random_element_from_dimension(index.dimensions[dim_id]) != "赛博朋克"
+               for _ in range(5000))
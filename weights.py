@@ -0,0 +1,208 @@
+"""
+元素加权抽样
+为子维度、类别与元素设置权重（来自配置或语料中的使用频次），每个维度预先构建 Vose 别名表，
+加权抽取一个元素只需一次随机数与一次查表，与金字塔规模无关；权重变化时只重建受影响维度的表
+"""
+
+import json
+from array import array
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set
+
+from pyramid_index import PyramidIndex
+
+
+# 权重配置的三个层级
+WEIGHT_LEVELS = ("子维度", "类别", "元素")
+
+# 由使用频次得到权重时给每个元素加上的平滑值，未出现过的元素仍可能被抽中
+DEFAULT_SMOOTHING = 1.0
+
+
+class AliasTable:
+    """离散分布的 Vose 别名表：构建 O(n)，抽样 O(1)"""
+
+    __slots__ = ("n", "prob", "alias")
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("别名表需要至少一个正权重")
+        scaled = [w * n / total for w in weights]
+        prob = array("d", bytes(8 * n))
+        alias = array("i", range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 剩下的列（含浮点误差留下的）概率为 1
+        for i in large + small:
+            prob[i] = 1.0
+        self.n = n
+        self.prob = prob
+        self.alias = alias
+
+    def sample(self, random: Callable[[], float]) -> int:
+        """用一个 [0, 1) 均匀随机数抽取下标：整数部分选列，小数部分决定取本列还是别名"""
+        u = random() * self.n
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+
+class ElementWeights:
+    """金字塔元素的分层权重与按维度缓存的别名表
+
+    元素在维度内被抽中的概率为
+    子维度权重 / 同维度子维度权重和 × 类别权重 / 同子维度类别权重和 × 元素权重 / 同类别元素权重和，
+    全部权重为 1 时与 PyramidIndex.random_element_id 的逐级等概率抽取分布相同。
+    权重按名称设置，同名的子维度、类别或元素一起生效。
+    """
+
+    def __init__(self, index: PyramidIndex):
+        self.index = index
+        self.subdimension_weights = array("d", [1.0]) * len(index.subdimensions)
+        self.category_weights = array("d", [1.0]) * len(index.categories)
+        self.element_weights = array("d", [1.0]) * len(index.elements)
+        self._tables: List[Optional[AliasTable]] = [None] * len(index.dimensions)
+        self._empty: Set[int] = set()
+        self._starts = tuple(index.dimension_element_range(dim_id)[0] for dim_id in range(len(index.dimensions)))
+
+        self._ids: Dict[str, Dict[str, List[int]]] = {level: {} for level in WEIGHT_LEVELS}
+        for level, names in zip(WEIGHT_LEVELS, (index.subdimensions, index.categories, index.elements)):
+            for i, name in enumerate(names):
+                self._ids[level].setdefault(name, []).append(i)
+
+    def _dimension_of(self, level: str, i: int) -> int:
+        index = self.index
+        if level == "子维度":
+            return index.sub_dimension[i]
+        if level == "类别":
+            return index.sub_dimension[index.cat_subdimension[i]]
+        return index.elem_dimension[i]
+
+    def set_weight(self, level: str, name: str, weight: float):
+        """设置一个子维度 / 类别 / 元素的权重，受影响维度的别名表在下次抽取时重建"""
+        if level not in WEIGHT_LEVELS:
+            raise ValueError(f"未知的权重层级：{level}（可选：{'、'.join(WEIGHT_LEVELS)}）")
+        ids = self._ids[level].get(name)
+        if ids is None:
+            raise ValueError(f"金字塔中没有该{level}：{name}")
+        if weight < 0:
+            raise ValueError("权重不能为负数")
+        weights = {"子维度": self.subdimension_weights,
+                   "类别": self.category_weights,
+                   "元素": self.element_weights}[level]
+        for i in ids:
+            weights[i] = float(weight)
+            self._invalidate(self._dimension_of(level, i))
+
+    def update(self, config: Mapping[str, Mapping[str, float]]):
+        """批量设置权重：{"子维度": {名称: 权重}, "类别": {...}, "元素": {...}}"""
+        unknown = set(config) - set(WEIGHT_LEVELS)
+        if unknown:
+            raise ValueError(f"未知的权重层级：{'、'.join(sorted(unknown))}")
+        # 先整体校验，配置有误时不留下改了一半的权重
+        for level, weights in config.items():
+            for name, weight in weights.items():
+                if name not in self._ids[level]:
+                    raise ValueError(f"金字塔中没有该{level}：{name}")
+                if weight < 0:
+                    raise ValueError("权重不能为负数")
+        for level, weights in config.items():
+            for name, weight in weights.items():
+                self.set_weight(level, name, weight)
+
+    def set_usage_counts(self, counts: Sequence[int], smoothing: float = DEFAULT_SMOOTHING):
+        """按元素编号的使用次数（如 CooccurrenceMatrix.element_counts）设置元素权重：次数 + smoothing"""
+        if len(counts) != len(self.element_weights):
+            raise ValueError("使用次数的数量必须与元素数量一致")
+        for elem_id, count in enumerate(counts):
+            self.element_weights[elem_id] = count + smoothing
+        for dim_id in range(len(self._tables)):
+            self._invalidate(dim_id)
+
+    def _invalidate(self, dim_id: int):
+        self._tables[dim_id] = None
+        self._empty.discard(dim_id)
+
+    def _build(self, dim_id: int) -> Optional[AliasTable]:
+        """按三级权重计算维度内各元素的概率并构建别名表；没有可抽取的元素时返回 None"""
+        index = self.index
+        e_start, e_end = index.dimension_element_range(dim_id)
+        probabilities = [0.0] * (e_end - e_start)
+
+        s0, s1 = index.subdimension_range(dim_id)
+        sub_masses = []
+        for sub_id in range(s0, s1):
+            c0, c1 = index.category_range(sub_id)
+            categories = []
+            for cat_id in range(c0, c1):
+                e0, e1 = index.element_range(cat_id)
+                total = sum(self.element_weights[e0:e1])
+                if total > 0 and self.category_weights[cat_id] > 0:
+                    categories.append((cat_id, total))
+            if categories and self.subdimension_weights[sub_id] > 0:
+                sub_masses.append((sub_id, categories))
+
+        sub_total = sum(self.subdimension_weights[sub_id] for sub_id, _ in sub_masses)
+        for sub_id, categories in sub_masses:
+            p_sub = self.subdimension_weights[sub_id] / sub_total
+            cat_total = sum(self.category_weights[cat_id] for cat_id, _ in categories)
+            for cat_id, elem_total in categories:
+                p_cat = p_sub * self.category_weights[cat_id] / cat_total
+                e0, e1 = index.element_range(cat_id)
+                for elem_id in range(e0, e1):
+                    probabilities[elem_id - e_start] = p_cat * self.element_weights[elem_id] / elem_total
+
+        if not sub_masses:
+            self._empty.add(dim_id)
+            return None
+        table = self._tables[dim_id] = AliasTable(probabilities)
+        return table
+
+    def random_element_id(self, dim_id: int, random: Callable[[], float]) -> int:
+        """按权重抽取维度中的一个元素编号；没有可抽取的元素时返回 -1"""
+        table = self._tables[dim_id]
+        if table is None:
+            if dim_id in self._empty:
+                return -1
+            table = self._build(dim_id)
+            if table is None:
+                return -1
+        return self._starts[dim_id] + table.sample(random)
+
+    def probabilities(self, dim_id: int) -> Dict[int, float]:
+        """维度内各元素（编号）被抽中的概率，用于检查权重配置"""
+        table = self._tables[dim_id] or self._build(dim_id)
+        if table is None:
+            return {}
+        e_start = self._starts[dim_id]
+        n = table.n
+        result = {e_start + i: table.prob[i] / n for i in range(n)}
+        for i in range(n):
+            result[e_start + table.alias[i]] += (1.0 - table.prob[i]) / n
+        return result
+
+
+def weights_from_usage(summary: Mapping[str, Any],
+                       smoothing: float = DEFAULT_SMOOTHING) -> Dict[str, Dict[str, float]]:
+    """语料分析摘要（corpus.summarize 的结果）中的元素频次 → 元素权重配置（次数 + smoothing）"""
+    counts: Dict[str, int] = {}
+    for item in summary["元素频次"]:
+        # 同名元素出现在多个子维度时各有一条记录，取其中的最大次数
+        counts[item["名称"]] = max(counts.get(item["名称"], 0), item["次数"])
+    return {"元素": {name: count + smoothing for name, count in counts.items()}}
+
+
+def load_weights(path: str) -> Dict[str, Dict[str, float]]:
+    """读取权重配置 JSON；也接受 --analyze-file 保存的语料统计，按元素频次换算为权重"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "元素频次" in data:
+        return weights_from_usage(data)
+    return {level: dict(weights) for level, weights in data.items()}